@@ -14,3 +14,66 @@ export async function postJSON<T>(path: string, body: unknown, base?: string) {
   return (await res.json()) as T
 }
 
+
+// /api/incident: all analyses in one round-trip; each section reports status + timing.
+export type IncidentSection<T> = {
+  status: 'ok' | 'timeout' | 'error' | 'skipped'
+  ms: number
+  data?: T
+  error?: string
+}
+
+export type ScenarioBranch = {
+  description: string
+  probability: number
+  ci_low: number
+  ci_high: number
+}
+
+export type ScenarioSimulation = {
+  score: number
+  cues: Record<string, boolean>
+  n_samples: number
+  branches: ScenarioBranch[]
+  worst_case: string
+}
+
+export type IncidentResponse = {
+  sections: {
+    score: IncidentSection<{ score: number; source: 'cache' | 'model' | 'fallback' }>
+    sensitivity: IncidentSection<{ results: Array<{ Term?: string; term?: string; delta: number }>; mode: string }>
+    sentiment: IncidentSection<{ emotions: Record<string, number> }>
+    recommendations: IncidentSection<{ actions: string[] }>
+    scenarios: IncidentSection<ScenarioSimulation>
+  }
+  total_ms: number
+}
+
+
+export type LiveScoreUpdate = {
+  type: 'score' | 'reset' | 'error'
+  score?: number
+  chunks?: number
+  tokens?: number
+  mode?: 'incremental' | 'full'
+  model_version?: string | null
+  ms?: number
+  detail?: string
+}
+
+// Live 112-call scoring: send transcript deltas, receive an updated score per chunk.
+export function openLiveScore(onUpdate: (u: LiveScoreUpdate) => void, base?: string) {
+  const API_BASE = (import.meta as any).env?.VITE_API_BASE ?? ''
+  const httpBase = base ?? API_BASE ?? ''
+  const wsBase = httpBase
+    ? httpBase.replace(/^http/, 'ws')
+    : `${location.protocol === 'https:' ? 'wss' : 'ws'}://${location.host}`
+  const ws = new WebSocket(`${wsBase}/ws/live-score`)
+  ws.onmessage = (ev) => onUpdate(JSON.parse(ev.data) as LiveScoreUpdate)
+  return {
+    sendDelta: (delta: string) => ws.send(JSON.stringify({ delta })),
+    reset: () => ws.send(JSON.stringify({ reset: true })),
+    close: () => ws.close(),
+    socket: ws,
+  }
+}
@@ -1,6 +1,6 @@
 // src/routes/TranscriptPage.tsx
 import { useState } from 'react'
-import { postJSON } from '../lib/api'
+import { postJSON, type IncidentResponse } from '../lib/api'
 import { useAppStore } from '../state/appStore'
 import GaugeCard from '../components/GaugeCard'
 import SensitivityBar from '../components/SensitivityBar'
@@ -35,6 +35,24 @@ export default function TranscriptPage() {
     setActions([])
 
     try {
+      // 0) One round-trip: the server runs all sections concurrently (fallback: split endpoints)
+      try {
+        const { sections } = await postJSON<IncidentResponse>('/api/incident', { transcript: text, top_n: 12 })
+        if (sections.score.status !== 'ok' || !sections.score.data) throw new Error(sections.score.error ?? 'score')
+        setScore(Number(sections.score.data.score) || 0)
+        setSens(
+          (sections.sensitivity.data?.results || [])
+            .map(r => ({ term: (r.Term ?? r.term ?? '').toString(), delta: Number(r.delta) || 0 }))
+            .filter(x => !!x.term)
+        )
+        setEmotions(sections.sentiment.data?.emotions || {})
+        setActions(sections.recommendations.data?.actions || [])
+        setTranscript(text)
+        return
+      } catch (e: any) {
+        console.warn('Incident-endpoint mislukt, losse endpoints:', e?.message)
+      }
+
       // 1) Combined analyze (fallback to split endpoints if needed)
       let s = 0
       let sensRes: Array<{ Term?: string; term?: string; delta: number }> = []
@@ -6,7 +6,6 @@ Run:
     python scripts/seed_and_retrain.py
 """
 
-import datetime
 import random
 import sys
 
@@ -14,7 +13,8 @@ import sys
 try:
     from model.db import SessionLocal
     from model.models import CallRecord
-except Exception as e:
+    from model.dedup import index_from_db, signature
+except Exception:
     print("❌ Could not import DB models. Are you running from the repo root?")
     print("   Expected: model/db.py and model/models.py to be importable.")
     raise
@@ -85,12 +85,19 @@ def seed_calls():
     session = SessionLocal()
     inserted = 0
     try:
-        # Create a set of existing transcripts to avoid duplicates
-        existing = {t[0] for t in session.query(CallRecord.transcript).all()}
+        # MinHash/LSH index of existing transcripts to skip (near-)duplicates
+        index = index_from_db()
+
+        def is_duplicate(text):
+            sig = signature(text)
+            if index.query(sig):
+                return True
+            index.add(f"new-{text}", sig)
+            return False
 
         # High risk: label ~ 0.80–1.00
         for text in HIGH_RISK:
-            if text in existing:
+            if is_duplicate(text):
                 continue
             rec = CallRecord(
                 transcript=text,
@@ -103,7 +110,7 @@ def seed_calls():
 
         # Low risk: label ~ 0.00–0.30
         for text in LOW_RISK:
-            if text in existing:
+            if is_duplicate(text):
                 continue
             rec = CallRecord(
                 transcript=text,
@@ -146,5 +153,5 @@ if __name__ == "__main__":
     if count > 0:
         retrain_model()
     else:
-        print("ℹ️ No new records to insert (duplicates skipped). Retraining anyway...")
+        print("ℹ️ No new records to insert (near-duplicates skipped). Retraining anyway...")
         retrain_model()
@@ -2,6 +2,7 @@
 from sqlalchemy.orm import Session
 from model.db import SessionLocal, engine
 from model.models import Base, CallRecord
+from model.dedup import index_from_db, signature
 
 Base.metadata.create_all(bind=engine)
 
@@ -48,10 +49,18 @@ dutch_calls = [
     }
 ]
 
+# Bijna-duplicaten van bestaande (of zojuist toegevoegde) calls overslaan
+index = index_from_db()
 db: Session = SessionLocal()
-for call in dutch_calls:
+skipped = 0
+for i, call in enumerate(dutch_calls):
+    sig = signature(call["transcript"])
+    if index.query(sig):
+        skipped += 1
+        continue
     db.add(CallRecord(**call))
+    index.add(f"new-{i}", sig)
 
 db.commit()
 db.close()
-print("Seeded Dutch 112 calls successfully.")
\ No newline at end of file
+print(f"Seeded Dutch 112 calls successfully ({len(dutch_calls) - skipped} added, {skipped} near-duplicates skipped).")
\ No newline at end of file
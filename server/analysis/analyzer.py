@@ -1,64 +1,24 @@
 # analysis/analyzer.py
 
 import re
-import matplotlib.pyplot as plt
-import seaborn as sns
-import pandas as pd
-
-from model.scoring import score_transcript
-
-# --- Stopwords: try NLTK Dutch stopwords, else fallback ---
-try:
-    import nltk
-    from nltk.corpus import stopwords
-    try:
-        DUTCH_STOP_WORDS = set(stopwords.words('dutch'))
-    except Exception:
-        # Fallback if stopwords resource not available
-        DUTCH_STOP_WORDS = set()
-except Exception:
-    DUTCH_STOP_WORDS = set()
-
-# Minimal fallback list if above failed or is empty
-if not DUTCH_STOP_WORDS:
-    DUTCH_STOP_WORDS = {
-        'de','het','een','en','of','maar','ik','jij','je','u','hij','zij','ze','wij','we','jullie',
-        'mijn','jouw','zijn','haar','ons','onze','hun','dit','dat','die','deze','er','hier','daar',
-        'niet','geen','wel','al','ook','nog','dan','als','om','te','van','voor','met','aan','op',
-        'in','uit','bij','naar','over','onder','boven','tussen','tegen','tot','door','heen',
-        'is','ben','zijn','was','waren','wordt','worden','heb','hebt','heeft','hebben','had','hadden',
-        'kan','kunnen','kon','konden','zal','zullen','zou','zouden','moet','moeten'
-    }
-
-# Fallback danger lexicon to ensure critical terms are evaluated
-DANGER_LEXICON = [
-    "mes","bijl","pistool","wapen","schieten","schoten",
-    "snijdt","snijden","snede","bloed","bloedend",
-    "bedreigt","bedreigen","vermoorden","doden",
-    "brand","aansteken","steken",
-    "zelfmoord","zichzelf pijn","zichzelf snijden",
-    "springen","springt","vluchten","gevlucht","gevaar"
-]
-
-# --- Regex-based tokenizer (no NLTK dependency) ---
-# Matches words incl. accented letters (Dutch)
-_WORD_RE = re.compile(r"[A-Za-zÀ-ÖØ-öø-ÿ]+", re.UNICODE)
+
+from model.scoring import score_with
+from analysis.document import (  # stopwords + tokenizer are shared with TranscriptDoc
+    TranscriptDoc,
+    as_doc,
+    candidate_bigrams,
+    clean_tokens,
+)
+from analysis.lexicon import DANGER_TERMS
+
+# Fallback danger lexicon to ensure critical terms are evaluated (analysis/lexicon.py)
+DANGER_LEXICON = DANGER_TERMS
 
 def _clean_tokens(text: str):
-    tokens = _WORD_RE.findall(text.lower())
-    return [t for t in tokens if t not in DUTCH_STOP_WORDS]
+    return clean_tokens(text.lower())
 
 def _candidate_bigrams(tokens, max_n=20):
-    seen = set()
-    out = []
-    for i in range(len(tokens) - 1):
-        bg = f"{tokens[i]} {tokens[i+1]}"
-        if bg not in seen:
-            seen.add(bg)
-            out.append(bg)
-            if len(out) >= max_n:
-                break
-    return out
+    return candidate_bigrams(tokens, max_n)
 
 def _regex_remove(text: str, term: str) -> str:
     """
@@ -67,38 +27,51 @@ def _regex_remove(text: str, term: str) -> str:
     pattern = re.compile(rf"(?i)\b{re.escape(term)}\b")
     return re.sub(pattern, " ", text)
 
-def run_sensitivity_analysis(transcript: str, top_n: int = 10, min_impact: float = 0.00005):
+def _sensitivity_candidates(doc: TranscriptDoc):
     """
-    Impact-based sensitivity:
-    - Candidates = unigrams + bigrams from transcript
-    - Plus danger-lexicon terms that appear in transcript
-    - Remove each candidate and measure Δ score
+    Candidates = unique unigrams + bigrams present in the text
+    + danger-lexicon terms that appear in the transcript.
     """
-    base = score_transcript(transcript)
-    tokens = _clean_tokens(transcript)
-
-    if not tokens:
-        return []
-
-    # Build candidates from this transcript
-    unigram_candidates = list(dict.fromkeys(tokens))        # unique, keep order
-    bigram_candidates  = _candidate_bigrams(tokens)
+    unigram_candidates = list(dict.fromkeys(doc.tokens))    # unique, keep order
 
     # Filter bigrams to those actually present in the text
-    lower_txt = transcript.lower()
-    bigram_candidates = [bg for bg in bigram_candidates if bg in lower_txt]
+    lower_txt = doc.lower
+    bigram_candidates = [bg for bg in doc.bigrams if bg in lower_txt]
 
     candidates = unigram_candidates + bigram_candidates
 
     # Add danger lexicon terms present in transcript (avoid dupes)
+    present = doc.lexicon_hits["danger"]
     for lex in DANGER_LEXICON:
-        if lex in lower_txt and lex not in candidates:
+        if lex in present and lex not in candidates:
             candidates.append(lex)
+    return candidates
+
+def run_sensitivity_analysis(transcript, top_n: int = 10, min_impact: float = 0.00005,
+                             model_version=None):
+    """
+    Impact-based sensitivity:
+    - Candidates = unigrams + bigrams from transcript
+    - Plus danger-lexicon terms that appear in transcript
+    - Remove each candidate and measure Δ score
+
+    All perturbed variants are scored together in a single
+    transform/predict (see score_transcripts); the base score comes from
+    the TranscriptDoc, so an endpoint that already scored it doesn't
+    score it again. transcript: str or TranscriptDoc.
+    """
+    doc = as_doc(transcript, model_version)
+
+    if not doc.tokens:
+        return []
+
+    candidates = _sensitivity_candidates(doc)
+    variants = [_regex_remove(doc.text, term) for term in candidates]
+    scores = score_with(doc.model, variants)
+    base = doc.score
 
     results = []
-    for term in candidates:
-        modified = _regex_remove(transcript, term)
-        new_score = score_transcript(modified)
+    for term, new_score in zip(candidates, scores):
         delta = float(new_score - base)
         if abs(delta) >= min_impact:
             results.append({
@@ -111,18 +84,52 @@ def run_sensitivity_analysis(transcript: str, top_n: int = 10, min_impact: float
     results.sort(key=lambda r: abs(r["Δ Change"]), reverse=True)
     return results[:top_n]
 
+def run_exact_attribution(transcript, top_n: int = 10, min_impact: float = 0.00005,
+                          model_version=None):
+    """
+    Closed-form attribution for linear TF-IDF models (Ridge pipeline):
+    score = intercept + Σ x_j · coef_j over the normalized row x. Dropping
+    term j also re-normalizes the row (every other x_i grows), so its Δ is
+    (Σ x_i · coef_i - x_j · coef_j) / sqrt(1 - x_j²) - Σ x_i · coef_i for
+    L2, not just -x_j · coef_j. Exact per feature, no re-scoring needed.
+    Returns None when the loaded model is not linear.
+    """
+    parts = as_doc(transcript, model_version).removal_deltas()
+    if parts is None:
+        return None
+    terms, deltas = parts
+
+    results = []
+    for term, raw_delta in zip(terms, deltas):
+        delta = float(raw_delta)
+        if abs(delta) >= min_impact:
+            results.append({
+                "Term": term,
+                "Δ Change": round(delta, 4),
+                "Color": "green" if delta < 0 else "red"
+            })
+
+    results.sort(key=lambda r: abs(r["Δ Change"]), reverse=True)
+    return results[:top_n]
+
+def run_attribution(transcript, top_n: int = 10, mode: str = "perturbation", model_version=None):
+    """
+    Dispatch between attribution methods. mode="exact" uses the closed-form
+    path when the model is linear and falls back to perturbation otherwise.
+    transcript: str or TranscriptDoc; model_version pins a registry version
+    (None = active model) when a str is passed.
+    Returns (rows, mode_used).
+    """
+    doc = as_doc(transcript, model_version)
+    if mode == "exact":
+        rows = run_exact_attribution(doc, top_n)
+        if rows is not None:
+            return rows, "exact"
+    return run_sensitivity_analysis(doc, top_n), "perturbation"
+
 def plot_sensitivity_chart(results):
     if not results:
         return None
-
-    df = pd.DataFrame(results)
-    fig = plt.figure(figsize=(10, 6))
-    sns.barplot(data=df, x='Δ Change', y='Term', hue='Color', dodge=False,
-                palette={"red": "red", "green": "green"})
-    plt.axvline(0, color='gray', linestyle='--', linewidth=0.8)
-    plt.title('Gevoeligheidsanalyse: Impact van termen op gevaarscore')
-    plt.xlabel('Verandering in gevaarscore (Δ)')
-    plt.ylabel('Term')
-    plt.legend(title='Effect')
-    plt.tight_layout()
-    return fig
+    # Standalone Agg figure (no pyplot state); matplotlib loads on first use
+    from analysis.charts import sensitivity_figure
+    return sensitivity_figure(results)
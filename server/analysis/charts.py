@@ -0,0 +1,115 @@
+# analysis/charts.py
+"""
+Server-side chart rendering without pyplot.
+
+pyplot keeps every figure in a global registry (not thread-safe, and
+figures live until plt.close()). Here each chart is a standalone
+matplotlib.figure.Figure drawn by its own FigureCanvasAgg, rendered to
+SVG/PNG bytes and cleared right away, so concurrent renders share no
+state and nothing outlives the call. matplotlib is imported on first use.
+
+The *_figure() builders also back the Streamlit/notebook plot_* helpers.
+"""
+import io
+from collections import Counter
+from typing import Any, Dict, Sequence
+
+CHART_TYPES = ("sensitivity", "sentiment", "risk_factors")
+FORMATS = {"svg": "image/svg+xml", "png": "image/png"}
+PNG_DPI = 100
+
+
+def _label_margin(labels: Sequence[str], width: float) -> float:
+    """Left margin (figure fraction) for y tick labels; cheaper than tight_layout()."""
+    chars = max((len(label) for label in labels), default=0)
+    return min(0.5, (0.75 + 0.075 * chars) / width)
+
+
+def _figure(width: float, height: float):
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    fig = Figure(figsize=(width, height))
+    FigureCanvasAgg(fig)
+    return fig
+
+
+def sensitivity_figure(rows: Sequence[Dict[str, Any]]):
+    """Horizontal Δ bars per term (red = raises the danger score, green = lowers it)."""
+    rows = list(rows)
+    height = max(3.0, 0.4 * len(rows) + 1.5)
+    fig = _figure(10, height)
+    ax = fig.add_subplot()
+    terms = [str(r.get("Term", "")) for r in rows][::-1]
+    deltas = [float(r.get("Δ Change", 0.0)) for r in rows][::-1]
+    colors = [r.get("Color") or ("red" if d > 0 else "green") for r, d in zip(rows[::-1], deltas)]
+    ax.barh(terms, deltas, color=colors)
+    ax.axvline(0, color="gray", linestyle="--", linewidth=0.8)
+    ax.set_title("Gevoeligheidsanalyse: Impact van termen op gevaarscore")
+    ax.set_xlabel("Verandering in gevaarscore (Δ)")
+    ax.set_ylabel("Term")
+    fig.subplots_adjust(left=_label_margin(terms, 10) + 0.04, right=0.97,
+                        top=1 - 0.4 / height, bottom=0.65 / height)
+    return fig
+
+
+def sentiment_figure(polarity: Sequence[float]):
+    """Polarity per sentence (analysis.sentiment_module)."""
+    fig = _figure(10, 4)
+    ax = fig.add_subplot()
+    ax.plot(range(len(polarity)), list(polarity), marker="o", linestyle="-")
+    ax.set_ylim(-1.05, 1.05)
+    ax.xaxis.get_major_locator().set_params(integer=True)
+    ax.set_title("Emotionele Polariteit per Zin")
+    ax.set_xlabel("Zin Index")
+    ax.set_ylabel("Polariteit (-1 tot 1)")
+    ax.grid(True)
+    fig.subplots_adjust(left=0.09, right=0.97, top=0.9, bottom=0.16)
+    return fig
+
+
+def risk_factors_figure(tokens: Sequence[str], top: int = 10):
+    """The most frequent words; None when there are none."""
+    common = Counter(tokens).most_common(top)
+    if not common:
+        return None
+    words, freqs = zip(*common)
+    fig = _figure(8, 4)
+    ax = fig.add_subplot()
+    ax.barh(words[::-1], freqs[::-1])
+    ax.set_title("Meest Voorkomende Woorden in Transcript")
+    ax.set_xlabel("Frequentie")
+    fig.subplots_adjust(left=_label_margin(words, 8), right=0.97, top=0.9, bottom=0.16)
+    return fig
+
+
+def render_figure(fig, fmt: str = "svg") -> bytes:
+    """Figure -> SVG/PNG bytes; the figure is cleared afterwards."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown chart format: {fmt!r}")
+    buf = io.BytesIO()
+    try:
+        fig.savefig(buf, format=fmt, dpi=PNG_DPI)
+    finally:
+        fig.clear()
+    return buf.getvalue()
+
+
+def render_chart(chart: str, data: Any, fmt: str = "svg") -> bytes:
+    """
+    chart: one of CHART_TYPES; data: attribution rows (sensitivity), sentence
+    polarities (sentiment) or tokens (risk_factors). Process-pool safe.
+    """
+    builders = {
+        "sensitivity": sensitivity_figure,
+        "sentiment": sentiment_figure,
+        "risk_factors": risk_factors_figure,
+    }
+    if chart not in builders:
+        raise ValueError(f"Unknown chart type: {chart!r}")
+    fig = builders[chart](data)
+    if fig is None:
+        fig = _figure(6, 1.5)
+        fig.text(0.5, 0.5, "Geen gegevens", ha="center", va="center")
+    return render_figure(fig, fmt)
+
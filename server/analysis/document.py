@@ -0,0 +1,161 @@
+# analysis/document.py
+"""
+TranscriptDoc: one transcript, pre-processed once per request.
+
+Endpoints build a TranscriptDoc and pass it to every analysis instead of
+the raw string. Each derived view (lower-cased/normalized text, cache
+hash, analysis tokens, candidate bigrams, lexicon hits, the model's
+feature vector and the base score) is computed on first use and then
+reused by all consumers.
+
+The model snapshot is bound on first use, so the feature vector, base
+score and attribution of one document always come from the same version
+even if a hot reload happens halfway through.
+"""
+import re
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from analysis.lexicon import INDEX
+from model.cache import normalized_hash
+from model.scoring import get_model
+
+# --- Stopwords: NLTK Dutch stopwords from the bundled .nltk_data, else fallback ---
+from analysis.nltk_data import stopwords as nltk_stopwords
+
+DUTCH_STOP_WORDS = set(nltk_stopwords('dutch'))
+
+# Minimal fallback list if above failed or is empty
+if not DUTCH_STOP_WORDS:
+    DUTCH_STOP_WORDS = {
+        'de','het','een','en','of','maar','ik','jij','je','u','hij','zij','ze','wij','we','jullie',
+        'mijn','jouw','zijn','haar','ons','onze','hun','dit','dat','die','deze','er','hier','daar',
+        'niet','geen','wel','al','ook','nog','dan','als','om','te','van','voor','met','aan','op',
+        'in','uit','bij','naar','over','onder','boven','tussen','tegen','tot','door','heen',
+        'is','ben','zijn','was','waren','wordt','worden','heb','hebt','heeft','hebben','had','hadden',
+        'kan','kunnen','kon','konden','zal','zullen','zou','zouden','moet','moeten'
+    }
+
+# --- Regex-based tokenizer (no NLTK dependency) ---
+# Matches words incl. accented letters (Dutch)
+_WORD_RE = re.compile(r"[A-Za-zÀ-ÖØ-öø-ÿ]+", re.UNICODE)
+
+
+def clean_tokens(lower: str) -> List[str]:
+    """Stop-word-filtered word tokens of already lower-cased text."""
+    return [t for t in _WORD_RE.findall(lower) if t not in DUTCH_STOP_WORDS]
+
+
+def candidate_bigrams(tokens: List[str], max_n: int = 20) -> List[str]:
+    seen = set()
+    out = []
+    for i in range(len(tokens) - 1):
+        bg = f"{tokens[i]} {tokens[i+1]}"
+        if bg not in seen:
+            seen.add(bg)
+            out.append(bg)
+            if len(out) >= max_n:
+                break
+    return out
+
+
+class _lazy:
+    """
+    Per-instance lazy attribute: computed on first access and stored in the
+    instance __dict__, which then shadows this (non-data) descriptor.
+
+    Unlike functools.cached_property (Python < 3.12) there is no lock shared
+    by every instance, so concurrent requests never wait on each other's
+    transform/predict. Two threads racing on one doc may both compute a
+    value; setdefault keeps the first, so every consumer sees the same one.
+    """
+
+    def __init__(self, func):
+        self.func = func
+        self.name = func.__name__
+        self.__doc__ = func.__doc__
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        cached = instance.__dict__.get(self.name, _MISSING)
+        if cached is _MISSING:
+            cached = instance.__dict__.setdefault(self.name, self.func(instance))
+        return cached
+
+
+_MISSING = object()
+
+
+class TranscriptDoc:
+    def __init__(self, text: str, model_version: Optional[str] = None):
+        self.text = text
+        self.model_version = model_version
+
+    def __getstate__(self):
+        # Process-pool hand-off: ship the text, not the model or its features
+        return {"text": self.text, "model_version": self.model_version}
+
+    # ---- text views -----------------------------------------------------------
+    @_lazy
+    def lower(self) -> str:
+        return self.text.lower()
+
+    @_lazy
+    def normalized(self) -> str:
+        """Same form as model.cache.normalize_transcript (lower-cased only)."""
+        return self.lower
+
+    @_lazy
+    def hash(self) -> str:
+        return normalized_hash(self.normalized)
+
+    @_lazy
+    def text_hash(self) -> str:
+        """Hash of the unmodified text, for results that echo it verbatim."""
+        return normalized_hash(self.text)
+
+    @_lazy
+    def tokens(self) -> List[str]:
+        return clean_tokens(self.lower)
+
+    @_lazy
+    def bigrams(self) -> List[str]:
+        return candidate_bigrams(self.tokens)
+
+    @_lazy
+    def lexicon_hits(self) -> Dict[str, Dict[str, int]]:
+        return INDEX.scan(self.lower, lowered=True)
+
+    # ---- model views ----------------------------------------------------------
+    @_lazy
+    def model(self):
+        return get_model(self.model_version)
+
+    @_lazy
+    def features(self):
+        return self.model.featurize([self.text])
+
+    @_lazy
+    def raw_score(self) -> float:
+        return float(self.model.predict_features(self.features)[0])
+
+    @property
+    def score(self) -> float:
+        """Base score, rounded like model.scoring.score_transcript."""
+        return round(self.raw_score, 2)
+
+    def contributions(self) -> Optional[Tuple[List[str], np.ndarray]]:
+        """Per-term x_j · coef_j of the base text (None for non-linear models)."""
+        return self.model.contributions(self.features)
+
+    def removal_deltas(self) -> Optional[Tuple[List[str], np.ndarray]]:
+        """Per-term score change of dropping that feature (None for non-linear models)."""
+        return self.model.removal_deltas(self.features)
+
+
+def as_doc(transcript: Union[str, TranscriptDoc], model_version: Optional[str] = None) -> TranscriptDoc:
+    if isinstance(transcript, TranscriptDoc):
+        return transcript
+    return TranscriptDoc(transcript, model_version)
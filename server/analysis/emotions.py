@@ -0,0 +1,21 @@
+# analysis/emotions.py
+from typing import Dict
+
+from analysis.lexicon import EMOTION_LEXICON, lexicon_hits
+
+EMO_LEX = EMOTION_LEXICON
+
+def score_emotions_nl(text) -> Dict[str, float]:
+    """text: str or TranscriptDoc (reuses its lexicon scan)."""
+    hits = lexicon_hits(text)
+    out: Dict[str, float] = {}
+    total_hits = 0
+    raw: Dict[str, int] = {}
+    for emo in EMO_LEX:
+        c = sum(hits[f"emotion:{emo}"].values())
+        raw[emo] = c
+        total_hits += c
+    denom = max(1, total_hits)
+    for emo, c in raw.items():
+        out[emo] = round(c / denom, 4)
+    return out
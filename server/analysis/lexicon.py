@@ -0,0 +1,294 @@
+# analysis/lexicon.py
+"""
+Shared keyword lexicons + a compiled multi-pattern matcher.
+
+All keyword lists used by the API (emotions, recommendation cues, the
+heuristic fallback score, scenario cues, sensitivity danger terms, the
+categorical-model cues and the sentence polarity lexicon) live here and are compiled into one
+Aho-Corasick automaton over word tokens. scan() tokenizes a transcript
+once and returns the hits for every lexicon in a single linear pass.
+
+Matching has the same semantics as re.findall(r"\\b<keyword>\\b") on the
+lower-cased text: keywords match whole words only, and multi-word
+keywords match single-space-separated words.
+"""
+import re
+from collections import deque
+from functools import lru_cache
+from typing import Dict, Iterable, List, Mapping, Tuple
+
+# =============================================================================
+# Lexicons
+# =============================================================================
+EMOTION_LEXICON = {
+    "angst": ["bang", "angstig", "vrees", "paniek", "gevaar", "ik moet vluchten", "help", "hulp"],
+    "boosheid": ["boos", "woedend", "schreeuwt", "bedreigt", "agressief", "aanvalt", "geweld"],
+    "verdriet": ["huilen", "verdriet", "pijn", "gewond", "gewond geraakt"],
+    "urgentie": ["nu", "meteen", "dringend", "spoed", "snel", "direct"],
+    "wanhoop": ["ik kan niet", "het gaat mis", "red me", "wanhopig", "ik ben bang", "ik moet weg"],
+}
+
+# /api/recommend (whole-word matching: list inflections and compounds explicitly)
+WEAPON_TERMS = [
+    "mes", "messen", "mesje", "mesjes", "keukenmes", "steekmes", "zakmes",
+    "pistool", "pistolen", "pistooltje", "geweer", "geweren", "jachtgeweer", "vuurwapen", "vuurwapens",
+    "hamer", "hamers", "fles", "flessen", "machete", "machetes", "bijl", "bijlen",
+]
+SELF_HARM_TERMS = [
+    "snijdt zichzelf", "zelfmoord", "zelfmoordpoging", "zelfmoordgedachten", "zelfmoordneigingen",
+    "ik doe mezelf pijn", "ik ga mezelf pijn doen", "ik ga mezelf iets aandoen",
+]
+
+# Sensitivity analysis: critical terms that are always evaluated when present
+DANGER_TERMS = [
+    "mes","bijl","pistool","wapen","schieten","schoten",
+    "snijdt","snijden","snede","bloed","bloedend",
+    "bedreigt","bedreigen","vermoorden","doden",
+    "brand","aansteken","steken",
+    "zelfmoord","zichzelf pijn","zichzelf snijden",
+    "springen","springt","vluchten","gevlucht","gevaar"
+]
+
+# model/fallback.py: keyword -> weight (English + Dutch)
+FALLBACK_WEIGHTS = {
+    'knife': 0.2,
+    'cutting herself': 0.2,
+    'stab': 0.2,
+    'flee': 0.15,
+    'run': 0.1,
+    'police': 0.05,
+    'abused': 0.05,
+    'crazy': 0.05,
+    'dangerous': 0.05,
+    # Dutch
+    'mes': 0.2,
+    'pistool': 0.2,
+    'wapen': 0.2,
+    'steekt': 0.2,
+    'gestoken': 0.2,
+    'snijdt': 0.2,
+    'gesneden': 0.2,
+    'bedreigt': 0.15,
+    'schiet': 0.15,
+    'brand': 0.15,
+    'bloed': 0.1,
+    'slaat': 0.1,
+    'vlucht': 0.1,
+    'bang': 0.05,
+    'politie': 0.05,
+    'gevaarlijk': 0.05
+}
+
+# Whole-word matching: inflected forms that count as their FALLBACK_WEIGHTS
+# keyword (each keyword still adds its weight once)
+FALLBACK_INFLECTIONS = {
+    'knife': ['knives', 'knifed'],
+    'cutting herself': ['cuts herself', 'cut herself', 'cutting himself', 'cutting themselves'],
+    'stab': ['stabs', 'stabbed', 'stabbing'],
+    'flee': ['flees', 'fled', 'fleeing'],
+    'run': ['runs', 'ran', 'running'],
+    'police': ['policeman', 'policemen', 'policewoman'],
+    'mes': ['messen', 'mesje', 'mesjes', 'keukenmes', 'steekmes', 'zakmes'],
+    'pistool': ['pistolen', 'pistooltje'],
+    'wapen': ['wapens', 'vuurwapen', 'vuurwapens'],
+    'steekt': ['steken', 'stak', 'staken', 'neergestoken'],
+    'snijdt': ['snijden', 'sneed'],
+    'bedreigt': ['bedreigd', 'bedreigen', 'bedreigde'],
+    'schiet': ['schieten', 'schoot', 'geschoten', 'schoten'],
+    'brand': ['brandt', 'branden', 'brandend'],
+    'bloed': ['bloedt', 'bloeden', 'bloedend', 'bloedde', 'bebloed', 'bebloede'],
+    'slaat': ['slaan', 'sloeg', 'geslagen'],
+    'vlucht': ['vluchten', 'vluchtte', 'gevlucht'],
+    'politie': ['politieagent', 'politieagenten'],
+    'gevaarlijk': ['gevaarlijke'],
+}
+# matched form -> FALLBACK_WEIGHTS keyword
+FALLBACK_FORMS = {kw: kw for kw in FALLBACK_WEIGHTS}
+FALLBACK_FORMS.update((form, kw) for kw, forms in FALLBACK_INFLECTIONS.items() for form in forms)
+
+# model/scenario_planner.py
+SCENARIO_CUES = {
+    "weapon": ["knife", "knives", "stab", "stabs", "stabbed", "stabbing"],
+    "self_harm": ["cutting herself"],
+    "history": ["police", "policeman", "abused"],
+}
+
+# model/registry.py: free text -> categorical model columns (first matching value wins)
+CATEGORICAL_CUES = {
+    "weapon": [("gun", ("gun", "pistool", "geweer", "vuurwapen")),
+               ("knife", ("knife", "mes", "messen", "bijl", "machete"))],
+    "action": [("cutting", ("cutting", "snijdt", "snijden", "gesneden")),
+               ("fleeing", ("fleeing", "flee", "vlucht", "vluchten", "gevlucht")),
+               ("yelling", ("yelling", "schreeuwt", "schreeuwen"))],
+    "mental_state": [("panicked", ("panic", "paniek", "panikeert")),
+                     ("agitated", ("agitated", "agressief", "woedend", "boos")),
+                     ("crying", ("crying", "huilt", "huilen"))],
+    "past_violence": [("yes", ("again", "weer", "opnieuw", "eerder"))],
+    "police_history": [("frequent", ("police again", "politie weer", "vaker politie"))],
+    "threat": [("physical", ("hit", "slaat", "sloeg", "steekt", "aanvalt")),
+               ("verbal", ("threat", "bedreigt", "dreigt")),
+               ("online", ("online", "berichten", "messages"))],
+}
+
+# analysis/sentiment_module.py: Dutch polarity lexicon (-1 = very negative, 1 = very positive)
+POLARITY_LEXICON = {
+    # negative
+    "bang": -0.6, "angstig": -0.6, "paniek": -0.7, "schrik": -0.5, "gevaar": -0.6, "gevaarlijk": -0.6,
+    "boos": -0.6, "woedend": -0.8, "agressief": -0.7, "ruzie": -0.5, "schreeuwt": -0.5, "bedreigt": -0.7,
+    "geweld": -0.8, "slaat": -0.6, "steekt": -0.8, "gestoken": -0.8, "aanvalt": -0.7,
+    "pijn": -0.6, "gewond": -0.6, "bloed": -0.5, "bloedt": -0.6, "bewusteloos": -0.6,
+    "huilen": -0.5, "huilt": -0.5, "verdriet": -0.6, "wanhopig": -0.8, "eenzaam": -0.5,
+    "dood": -0.9, "doden": -0.9, "vermoorden": -1.0, "zelfmoord": -1.0,
+    "mes": -0.4, "wapen": -0.5, "pistool": -0.6, "brand": -0.5, "dronken": -0.3,
+    "slecht": -0.6, "vreselijk": -0.8, "verschrikkelijk": -0.8, "kapot": -0.5, "ongeluk": -0.5,
+    "mis": -0.4, "help": -0.3, "hulp": -0.2,
+    # positive
+    "goed": 0.5, "beter": 0.4, "rustig": 0.5, "kalm": 0.5, "veilig": 0.6, "stabiel": 0.4,
+    "oké": 0.3, "oke": 0.3, "ok": 0.3, "prima": 0.5, "fijn": 0.5, "blij": 0.6, "gelukkig": 0.6,
+    "dank": 0.4, "bedankt": 0.4, "gered": 0.6, "opgelost": 0.5, "aanspreekbaar": 0.3, "gerustgesteld": 0.5,
+}
+# Flip (x -0.5) a polarity term up to NEGATION_WINDOW words after a negator
+NEGATORS = ["niet", "geen", "nooit", "niets", "niks"]
+# Scale (x 1.5) a polarity term directly after an intensifier
+INTENSIFIERS = ["heel", "erg", "zeer", "echt", "ontzettend", "enorm", "super"]
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+# =============================================================================
+# Matcher
+# =============================================================================
+class LexiconIndex:
+    """Aho-Corasick automaton over word tokens for several named lexicons."""
+
+    def __init__(self, lexicons: Mapping[str, Iterable[str]]):
+        self.names = list(lexicons)
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]
+        # phrase id -> (phrase, token count, [(lexicon, term), ...])
+        self._phrases: List[Tuple[str, int, List[Tuple[str, str]]]] = []
+        phrase_ids: Dict[str, int] = {}
+
+        for name, terms in lexicons.items():
+            for term in terms:
+                tokens = term.lower().split()
+                if not tokens or any(not _TOKEN_RE.fullmatch(t) for t in tokens):
+                    raise ValueError(f"Lexicon {name!r}: unsupported keyword {term!r}")
+                phrase = " ".join(tokens)
+                pid = phrase_ids.get(phrase)
+                if pid is None:
+                    pid = phrase_ids[phrase] = len(self._phrases)
+                    self._phrases.append((phrase, len(tokens), []))
+                    self._out[self._insert(tokens)].append(pid)
+                self._phrases[pid][2].append((name, term))
+        self._link()
+
+    def _insert(self, tokens: List[str]) -> int:
+        node = 0
+        for tok in tokens:
+            nxt = self._goto[node].get(tok)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][tok] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        return node
+
+    def _link(self):
+        """Failure links (BFS); each node also emits its fail chain's phrases."""
+        todo = deque(self._goto[0].values())
+        while todo:
+            node = todo.popleft()
+            for tok, child in self._goto[node].items():
+                f = self._fail[node]
+                while f and tok not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[child] = self._goto[f].get(tok, 0)
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+                todo.append(child)
+
+    def scan(self, text: str, lowered: bool = False) -> Dict[str, Dict[str, int]]:
+        """{lexicon: {term: count}} for every lexicon (empty dict = no hits)."""
+        hits: Dict[str, Dict[str, int]] = {name: {} for name in self.names}
+        lower = text if lowered else text.lower()
+        goto, fail, out, phrases = self._goto, self._fail, self._out, self._phrases
+        starts: List[int] = []
+        node = 0
+        for i, m in enumerate(_TOKEN_RE.finditer(lower)):
+            tok = m.group()
+            starts.append(m.start())
+            while node and tok not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(tok, 0)
+            for pid in out[node]:
+                phrase, n, owners = phrases[pid]
+                # Multi-word keywords: words must be separated by exactly one space
+                if n > 1 and lower[starts[i - n + 1]:m.end()] != phrase:
+                    continue
+                for name, term in owners:
+                    hits[name][term] = hits[name].get(term, 0) + 1
+        return hits
+
+
+    def matches(self, text: str, lowered: bool = False) -> Tuple[List[int], List[Tuple[int, int, str, str]]]:
+        """
+        Positional variant of scan(): (token start offsets, [(first token,
+        last token, lexicon, term), ...]) in text order.
+        """
+        lower = text if lowered else text.lower()
+        goto, fail, out, phrases = self._goto, self._fail, self._out, self._phrases
+        starts: List[int] = []
+        found: List[Tuple[int, int, str, str]] = []
+        node = 0
+        for i, m in enumerate(_TOKEN_RE.finditer(lower)):
+            tok = m.group()
+            starts.append(m.start())
+            while node and tok not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(tok, 0)
+            for pid in out[node]:
+                phrase, n, owners = phrases[pid]
+                if n > 1 and lower[starts[i - n + 1]:m.end()] != phrase:
+                    continue
+                for name, term in owners:
+                    found.append((i - n + 1, i, name, term))
+        return starts, found
+
+
+def _all_lexicons() -> Dict[str, List[str]]:
+    lexicons: Dict[str, List[str]] = {}
+    for emo, terms in EMOTION_LEXICON.items():
+        lexicons[f"emotion:{emo}"] = terms
+    lexicons["weapon"] = WEAPON_TERMS
+    lexicons["self_harm"] = SELF_HARM_TERMS
+    lexicons["danger"] = DANGER_TERMS
+    lexicons["fallback"] = list(FALLBACK_FORMS)
+    for cue, terms in SCENARIO_CUES.items():
+        lexicons[f"scenario:{cue}"] = terms
+    for column, options in CATEGORICAL_CUES.items():
+        for value, cues in options:
+            lexicons[f"categorical:{column}={value}"] = list(cues)
+    return lexicons
+
+
+INDEX = LexiconIndex(_all_lexicons())
+
+
+@lru_cache(maxsize=256)
+def scan(text: str) -> Dict[str, Dict[str, int]]:
+    """
+    Hits of all shared lexicons in text. Cached, so the endpoints that
+    look at the same transcript share one pass; treat the result as
+    read-only.
+    """
+    return INDEX.scan(text)
+
+
+def lexicon_hits(transcript) -> Dict[str, Dict[str, int]]:
+    """scan() for a str, or the already computed hits of a TranscriptDoc."""
+    if isinstance(transcript, str):
+        return scan(transcript)
+    return transcript.lexicon_hits
@@ -0,0 +1,45 @@
+# analysis/nltk_data.py
+"""
+Offline NLTK resources.
+
+The server only reads NLTK data from the bundled `.nltk_data` folder
+(filled by render-build.sh, or NLTK_DATA) and never downloads at runtime.
+Importing nltk itself costs ~2 s (it pulls in scipy.stats), so:
+  * stopwords() reads the corpus file directly, without importing nltk;
+  * load_nltk() imports nltk on first use and restricts its search path
+    to the bundled folder.
+"""
+import os
+import zipfile
+from functools import lru_cache
+from typing import FrozenSet
+
+NLTK_DIR = os.getenv("NLTK_DATA", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".nltk_data"))
+
+
+@lru_cache(maxsize=None)
+def load_nltk():
+    """The nltk module, searching only NLTK_DIR for resources."""
+    import nltk
+    nltk.data.path[:] = [NLTK_DIR]
+    return nltk
+
+
+def has_resource(name: str) -> bool:
+    """e.g. has_resource('tokenizers/punkt') — checks NLTK_DIR only."""
+    return os.path.exists(os.path.join(NLTK_DIR, name)) or os.path.exists(os.path.join(NLTK_DIR, name + ".zip"))
+
+
+@lru_cache(maxsize=None)
+def stopwords(language: str) -> FrozenSet[str]:
+    """NLTK stopword list for `language` from NLTK_DIR (empty set if not bundled)."""
+    path = os.path.join(NLTK_DIR, "corpora", "stopwords", language)
+    try:
+        if os.path.isfile(path):
+            with open(path, encoding="utf-8") as fh:
+                return frozenset(w.strip() for w in fh if w.strip())
+        with zipfile.ZipFile(os.path.join(NLTK_DIR, "corpora", "stopwords.zip")) as zf:
+            data = zf.read(f"stopwords/{language}").decode("utf-8")
+            return frozenset(w.strip() for w in data.splitlines() if w.strip())
+    except (OSError, KeyError, zipfile.BadZipFile):
+        return frozenset()
@@ -1,41 +1,109 @@
 # analysis/sentiment_module.py
-import nltk
-from nltk.tokenize import sent_tokenize
-from textblob import TextBlob
-import matplotlib.pyplot as plt
-import pandas as pd
-
-nltk.download('punkt')
-
-def safe_sent_tokenize(text: str, lang='dutch'):
-    try:
-        return sent_tokenize(text, language=lang)
-    except LookupError:
-        # Fallback: split by period
-        return text.split('.')
-
-def sentiment_analysis(transcript: str):
-    sentences = safe_sent_tokenize(transcript)
-    emotions = []
-    for sentence in sentences:
-        blob = TextBlob(sentence)
-        polarity = blob.sentiment.polarity
-        emotions.append({
-            "Sentence": sentence.strip(),
-            "Polarity": round(polarity, 2)
-        })
-    df = pd.DataFrame(emotions)
-    return df, None
-
-def plot_sentiment_chart(sentiment_df: pd.DataFrame):
-    if sentiment_df is None or sentiment_df.empty:
-        return None
+"""
+Batched Dutch sentence sentiment.
+
+One Aho-Corasick pass over the transcript (analysis/lexicon.py) finds the
+polarity terms, negators, intensifiers and EMO_LEX emotion terms; token
+offsets map each hit to its sentence and the per-sentence polarity is
+aggregated with array operations (mean of the hit polarities, clipped to
+[-1, 1]; 0 for sentences without hits).
+"""
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from analysis.emotions import EMO_LEX
+from analysis.lexicon import INTENSIFIERS, NEGATORS, POLARITY_LEXICON, LexiconIndex
+
+NEGATION_WINDOW = 3     # words after a negator that get flipped
+NEGATION_FACTOR = -0.5
+INTENSIFIER_FACTOR = 1.5
+
+_SENTENCE_END_RE = re.compile(r"[.!?]+|\n+")
+
+_TERMS = list(POLARITY_LEXICON)
+_TERM_ID = {t: i for i, t in enumerate(_TERMS)}
+POLARITY = np.array([POLARITY_LEXICON[t] for t in _TERMS], dtype=float)
+_EMOTIONS = list(EMO_LEX)
+
+_INDEX = LexiconIndex({
+    "polarity": _TERMS,
+    "negator": NEGATORS,
+    "intensifier": INTENSIFIERS,
+    **{f"emotion:{emo}": terms for emo, terms in EMO_LEX.items()},
+})
+
+
+def _sentence_spans(text: str) -> List[Tuple[int, int]]:
+    """(start, end) of the non-empty sentences."""
+    spans, pos = [], 0
+    for m in _SENTENCE_END_RE.finditer(text):
+        spans.append((pos, m.start()))
+        pos = m.end()
+    spans.append((pos, len(text)))
+    return [(a, b) for a, b in spans if text[a:b].strip()]
 
-    fig, ax = plt.subplots(figsize=(10, 4))
-    ax.plot(sentiment_df.index, sentiment_df["Polarity"], marker="o", linestyle="-")
-    ax.set_title("📈 Emotionele Polariteit per Zin")
-    ax.set_xlabel("Zin Index")
-    ax.set_ylabel("Polariteit (-1 tot 1)")
-    ax.grid(True)
-    plt.tight_layout()
-    return fig
\ No newline at end of file
+
+def score_sentences(transcript, emotions: bool = False) -> Tuple[List[str], np.ndarray, Optional[Dict[str, float]]]:
+    """
+    (sentences, polarity per sentence, emotion shares or None).
+    transcript: str or TranscriptDoc. The emotion shares are those of
+    analysis.emotions.score_emotions_nl, taken from the same scan.
+    """
+    text = getattr(transcript, "text", transcript)
+    lower = text.lower()
+    source = text if len(lower) == len(text) else lower
+    spans = _sentence_spans(lower)
+    sentences = [source[a:b].strip() for a, b in spans]
+    n = len(spans)
+
+    starts, found = _INDEX.matches(lower, lowered=True)
+    tok_sent = np.searchsorted(np.array([b for _, b in spans], dtype=np.int64),
+                               np.array(starts, dtype=np.int64), side="right")
+
+    first = np.array([f for f, _, name, _ in found if name == "polarity"], dtype=np.int64)
+    value = POLARITY[np.array([_TERM_ID[t] for _, _, name, t in found if name == "polarity"], dtype=np.int64)]
+    negators = np.array([f for f, _, name, _ in found if name == "negator"], dtype=np.int64)
+    intensifiers = np.array([f for f, _, name, _ in found if name == "intensifier"], dtype=np.int64)
+
+    if first.size:
+        sent = tok_sent[first]
+        if negators.size:
+            prev = np.searchsorted(negators, first) - 1
+            neg = negators[np.maximum(prev, 0)]
+            negated = (prev >= 0) & (first - neg <= NEGATION_WINDOW) & (tok_sent[neg] == sent)
+            value = np.where(negated, value * NEGATION_FACTOR, value)
+        if intensifiers.size:
+            boosted = np.isin(first - 1, intensifiers) & (tok_sent[np.maximum(first - 1, 0)] == sent)
+            value = np.where(boosted, value * INTENSIFIER_FACTOR, value)
+        sums = np.bincount(sent, weights=value, minlength=n)
+        counts = np.bincount(sent, minlength=n)
+        polarity = np.clip(np.divide(sums, counts, out=np.zeros(n), where=counts > 0), -1.0, 1.0).round(2)
+    else:
+        polarity = np.zeros(n)
+
+    emo_shares = None
+    if emotions:
+        raw = dict.fromkeys(_EMOTIONS, 0)
+        for _, _, name, _ in found:
+            if name.startswith("emotion:"):
+                raw[name[len("emotion:"):]] += 1
+        denom = max(1, sum(raw.values()))
+        emo_shares = {emo: round(c / denom, 4) for emo, c in raw.items()}
+    return sentences, polarity, emo_shares
+
+
+def sentiment_analysis(transcript: str, emotions: bool = False):
+    """([{"Sentence", "Polarity"}, ...], emotion shares or None)."""
+    sentences, polarity, emo_shares = score_sentences(transcript, emotions)
+    rows: List[Dict[str, Any]] = [
+        {"Sentence": s, "Polarity": float(p)} for s, p in zip(sentences, polarity.tolist())
+    ]
+    return rows, emo_shares
+
+def plot_sentiment_chart(rows):
+    if not rows:
+        return None
+    from analysis.charts import sentiment_figure
+    return sentiment_figure([r["Polarity"] for r in rows])
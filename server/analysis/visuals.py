@@ -1,14 +1,9 @@
 # analysis/visuals.py
 
-import matplotlib.pyplot as plt
-import nltk
-from nltk.tokenize import word_tokenize
-from nltk.data import find
+from analysis.nltk_data import has_resource, load_nltk
 
 def plot_risk_factors(transcript: str):
-    try:
-        find('tokenizers/punkt')
-    except LookupError:
+    if not has_resource('tokenizers/punkt'):
         print("❌ NLTK 'punkt' tokenizer not found. Risk factor chart will be skipped.")
         return None
 
@@ -16,21 +11,10 @@ def plot_risk_factors(transcript: str):
         return None
 
     try:
-        tokens = [word for word in word_tokenize(transcript.lower()) if word.isalpha()]
-        word_freq = nltk.FreqDist(tokens)
-        common_words = word_freq.most_common(10)
-
-        if not common_words:
-            return None
-
-        words, freqs = zip(*common_words)
-
-        fig, ax = plt.subplots(figsize=(8, 4))
-        ax.barh(words[::-1], freqs[::-1])
-        ax.set_title("🔍 Meest Voorkomende Woorden in Transcript")
-        ax.set_xlabel("Frequentie")
-        plt.tight_layout()
-        return fig
+        from analysis.charts import risk_factors_figure
+        nltk = load_nltk()
+        tokens = [word for word in nltk.word_tokenize(transcript.lower()) if word.isalpha()]
+        return risk_factors_figure(tokens)
 
     except Exception as e:
         print(f"⚠️ Fout bij het plotten van risicofactoren: {e}")
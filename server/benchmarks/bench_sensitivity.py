@@ -0,0 +1,92 @@
+# benchmarks/bench_sensitivity.py
+"""
+Benchmark: gebatchte gevoeligheidsanalyse vs. één modelaanroep per kandidaat.
+
+Bouwt transcripts van oplopende lengte, draait beide varianten en
+controleert dat de Term/Δ Change/Color-rijen identiek zijn.
+
+Run (vanuit server/):
+    python -m benchmarks.bench_sensitivity
+    python -m benchmarks.bench_sensitivity --repeats 10 --sizes 1 2 4 8 16
+"""
+
+import argparse
+import os
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+from analysis.analyzer import (  # noqa: E402
+    _regex_remove,
+    _sensitivity_candidates,
+    run_sensitivity_analysis,
+)
+from analysis.document import TranscriptDoc  # noqa: E402
+from model.scoring import score_transcript  # noqa: E402
+
+SENTENCES = [
+    "Mijn partner bedreigt mij met een mes.",
+    "Ik ben bang voor mijn leven en de kinderen huilen.",
+    "Hij schreeuwt en slaat dingen stuk in de keuken.",
+    "Er is bloed op de vloer, ze snijdt zichzelf.",
+    "De buren horen geschreeuw en iemand probeert te vluchten.",
+    "Hij zegt dat hij het huis gaat aansteken.",
+    "Ik heb me opgesloten in de badkamer, kom snel.",
+    "Er ligt een pistool op tafel en hij is dronken.",
+]
+
+
+def _legacy_sensitivity(transcript: str, top_n: int = 10, min_impact: float = 0.00005):
+    """Referentie: de oude lus met een aparte score_transcript per kandidaat."""
+    base = score_transcript(transcript)
+    doc = TranscriptDoc(transcript)
+    if not doc.tokens:
+        return []
+    results = []
+    for term in _sensitivity_candidates(doc):
+        delta = float(score_transcript(_regex_remove(transcript, term)) - base)
+        if abs(delta) >= min_impact:
+            results.append({
+                "Term": term,
+                "Δ Change": round(delta, 4),
+                "Color": "green" if delta < 0 else "red"
+            })
+    results.sort(key=lambda r: abs(r["Δ Change"]), reverse=True)
+    return results[:top_n]
+
+
+def _time(fn, transcript: str, repeats: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(repeats):
+        fn(transcript)
+    return (time.perf_counter() - t0) * 1000 / repeats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 2, 4, 8, 16],
+                        help="Transcriptlengte in blokken van %d zinnen" % len(SENTENCES))
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'zinnen':>7} {'tokens':>7} {'kandidaten':>11} {'legacy ms':>10} {'batched ms':>11} {'speedup':>8}")
+    for size in args.sizes:
+        transcript = " ".join(SENTENCES * size)
+        doc = TranscriptDoc(transcript)
+        tokens = doc.tokens
+        n_candidates = len(_sensitivity_candidates(doc))
+
+        if run_sensitivity_analysis(transcript) != _legacy_sensitivity(transcript):
+            raise SystemExit(f"❌ Resultaten wijken af bij {size * len(SENTENCES)} zinnen")
+
+        legacy_ms = _time(_legacy_sensitivity, transcript, args.repeats)
+        batched_ms = _time(run_sensitivity_analysis, transcript, args.repeats)
+        print(f"{size * len(SENTENCES):>7} {len(tokens):>7} {n_candidates:>11} "
+              f"{legacy_ms:>10.1f} {batched_ms:>11.1f} {legacy_ms / batched_ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
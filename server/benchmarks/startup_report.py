@@ -0,0 +1,99 @@
+# benchmarks/startup_report.py
+"""
+Koude-start rapport van de API-server.
+
+Start een verse interpreter met `python -X importtime -c "import main"`
+en toont de importtijd per module (cumulatief, inclusief sub-imports) en
+per top-level package (eigen tijd opgeteld). Daarna meet een tweede
+verse interpreter de fasen tot het eerste request: import, lifespan
+(model laden, executor) en de eerste GET /health.
+
+Run (vanuit server/):
+    python -m benchmarks.startup_report
+    python -m benchmarks.startup_report --top 30 --no-request
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FIRST_REQUEST_SNIPPET = r"""
+import json, time
+t0 = time.perf_counter()
+import main
+t1 = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(main.app) as c:
+    t2 = time.perf_counter()
+    status = c.get("/health").status_code
+    t3 = time.perf_counter()
+print("@@" + json.dumps({"import": t1 - t0, "lifespan": t2 - t1, "first_request": t3 - t2, "status": status}))
+"""
+
+
+def _run(args: List[str]) -> subprocess.CompletedProcess:
+    env = dict(os.environ, PYTHONPATH=BASE_DIR, PYTHONDONTWRITEBYTECODE="1")
+    return subprocess.run([sys.executable, *args], cwd=BASE_DIR, env=env, capture_output=True, text=True)
+
+
+def import_times() -> List[Tuple[str, int, int, int]]:
+    """[(module, depth, self_us, cumulative_us)] in import order."""
+    proc = _run(["-X", "importtime", "-c", "import main"])
+    if proc.returncode != 0:
+        raise SystemExit(f"import main mislukt:\n{proc.stderr[-2000:]}")
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cum_us, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), depth, int(self_us), int(cum_us)))
+    return rows
+
+
+def report(top: int, first_request: bool):
+    rows = import_times()
+    total = next((cum for name, _, _, cum in rows if name == "main"), sum(s for _, _, s, _ in rows))
+
+    per_package: Dict[str, int] = defaultdict(int)
+    for name, _, self_us, _ in rows:
+        per_package[name.split(".")[0]] += self_us
+
+    print(f"import main: {total / 1e6:.2f} s ({len(rows)} modules)\n")
+    print(f"Top {top} modules (cumulatief):")
+    for name, depth, _, cum in sorted(rows, key=lambda r: r[3], reverse=True)[:top]:
+        print(f"  {cum / 1e3:9.1f} ms  {'  ' * min(depth, 8)}{name}")
+    print(f"\nTop {top} packages (eigen tijd):")
+    for pkg, self_us in sorted(per_package.items(), key=lambda kv: kv[1], reverse=True)[:top]:
+        print(f"  {self_us / 1e3:9.1f} ms  {pkg:<24} {100 * self_us / total:5.1f}%")
+
+    if first_request:
+        proc = _run(["-c", FIRST_REQUEST_SNIPPET])
+        line = next((l for l in proc.stdout.splitlines() if l.startswith("@@")), None)
+        if line is None:
+            print(f"\nEerste request meting mislukt:\n{proc.stderr[-2000:]}")
+            return
+        t = json.loads(line[2:])
+        print("\nTijd tot eerste request (verse interpreter):")
+        print(f"  import main       {t['import'] * 1e3:9.1f} ms")
+        print(f"  lifespan startup  {t['lifespan'] * 1e3:9.1f} ms")
+        print(f"  GET /health       {t['first_request'] * 1e3:9.1f} ms  (status {t['status']})")
+        print(f"  totaal            {sum(t[k] for k in ('import', 'lifespan', 'first_request')) * 1e3:9.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Koude-start rapport (importtijd per module)")
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--no-request", action="store_true", help="sla de meting tot het eerste request over")
+    args = parser.parse_args()
+    report(args.top, not args.no_request)
+
+
+if __name__ == "__main__":
+    main()
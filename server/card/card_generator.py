@@ -1,36 +1,90 @@
 # card/card_generator.py
+"""
+Incident cards: precompiled string.Template markup + a worker function
+that computes only the analysis parts the caller doesn't already have.
 
-from analysis.analyzer import run_sensitivity_analysis
+build_card() is what the bulk export runs on the executor (one call per
+card, process-pool safe); render_card() is pure string substitution.
+"""
+import html
+from string import Template
+from typing import Any, Dict, List, Optional, Tuple
+
+from analysis.analyzer import run_attribution
+from analysis.document import as_doc
 from analysis.sentiment_module import sentiment_analysis
-from model.scoring import score_transcript
 
-def generate_incident_card(transcript: str) -> str:
-    score = score_transcript(transcript)
-    analysis = run_sensitivity_analysis(transcript)
-    sentiment_df, _ = sentiment_analysis(transcript)
-
-    bullet_points = ""
-    if analysis:
-        bullet_points = "".join(
-            f"<li>{item['Scenario']}: Δ {item['Δ Change']}</li>"
-            for item in analysis
-        )
-
-    sentiment_table = ""
-    if not sentiment_df.empty:
-        sentiment_table = sentiment_df.to_html(index=False)
-
-    html = f"""
-    <div style="border:1px solid #ccc; padding:20px; border-radius:10px;">
-        <h3>📝 Incidentkaart</h3>
-        <p><strong>🔥 Gevaar Score:</strong> {score:.2f} (0 = Laag, 1 = Hoog)</p>
+CARD_TEMPLATE = Template("""
+    <div style="border:1px solid #ccc; padding:20px; border-radius:10px; margin-bottom:16px;">
+        <h3>📝 Incidentkaart$title</h3>
+        <p><strong>🔥 Gevaar Score:</strong> $score (0 = Laag, 1 = Hoog)</p>
 
         <p><strong>🧠 Gevoelige termen:</strong></p>
-        <ul>{bullet_points}</ul>
+        <ul>$terms</ul>
 
         <p><strong>😊 Sentiment Analyse:</strong></p>
-        {sentiment_table}
+        $sentences
     </div>
+    """)
+TERM_TEMPLATE = Template("<li>$term: Δ $delta</li>")
+# Same per-sentence table the pandas DataFrame.to_html() of sentiment_analysis used to give
+SENTENCE_TABLE_TEMPLATE = Template(
+    '<table border="1" class="dataframe"><thead><tr style="text-align: right;">'
+    "<th>Sentence</th><th>Polarity</th></tr></thead><tbody>$rows</tbody></table>"
+)
+SENTENCE_TEMPLATE = Template("<tr><td>$sentence</td><td>$polarity</td></tr>")
+
+DOCUMENT_HEAD = """<!DOCTYPE html>
+<html lang="nl">
+<head><meta charset="utf-8"><title>Incidentkaarten</title></head>
+<body style="font-family:sans-serif; max-width:900px; margin:auto;">
+"""
+DOCUMENT_TAIL = "</body>\n</html>\n"
+
+
+def render_card(score: float, rows, sentences: List[Dict[str, Any]],
+                call_id: Optional[int] = None, timestamp: Optional[str] = None) -> str:
+    """Card HTML from already computed results (attribution rows + per-sentence polarity rows)."""
+    title = ""
+    if call_id is not None:
+        title = f" — melding #{call_id}" + (f" ({html.escape(timestamp)})" if timestamp else "")
+    terms = "".join(
+        TERM_TEMPLATE.substitute(term=html.escape(str(item.get("Term", ""))), delta=item.get("Δ Change", 0.0))
+        for item in rows or []
+    )
+    sentence_table = ""
+    if sentences:
+        sentence_table = SENTENCE_TABLE_TEMPLATE.substitute(rows="".join(
+            SENTENCE_TEMPLATE.substitute(sentence=html.escape(r["Sentence"]), polarity=round(r["Polarity"], 2))
+            for r in sentences
+        ))
+    return CARD_TEMPLATE.substitute(title=title, score=f"{score:.2f}", terms=terms, sentences=sentence_table)
+
+
+def build_card(transcript: str, top_n: int = 10, mode: str = "perturbation",
+               model_version: Optional[str] = None, known: Optional[Dict[str, Any]] = None,
+               call_id: Optional[int] = None, timestamp: Optional[str] = None) -> Tuple[str, Dict[str, Any]]:
+    """
+    Render one card. `known` holds results the caller already has
+    ("score", "attribution" = (rows, mode_used), "sentences" = (rows, emotion
+    shares) as cached by /api/sentiment); only the rest
+    is computed, on one shared TranscriptDoc. Returns (html, parts) so the
+    caller can cache what was computed here.
     """
+    parts = dict(known or {})
+    doc = as_doc(transcript, model_version)
+    if "score" not in parts:
+        parts["score"] = doc.score
+    if "attribution" not in parts:
+        parts["attribution"] = run_attribution(doc, top_n, mode)
+    if "sentences" not in parts:
+        parts["sentences"] = sentiment_analysis(doc, True)
+    parts["model_version"] = doc.model.version
+    rows, _ = parts["attribution"]
+    sentences, _ = parts["sentences"]
+    card = render_card(float(parts["score"]), rows, sentences, call_id, timestamp)
+    return card, parts
 
-    return html
+
+def generate_incident_card(transcript: str) -> str:
+    return build_card(transcript)[0]
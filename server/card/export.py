@@ -0,0 +1,74 @@
+# card/export.py
+"""
+Streaming writers for bulk card exports: one multi-card HTML document or
+a ZIP with one .html file per card. Both consume an async iterator of
+(call_id, card_html, error) and yield bytes as soon as each card is ready, so a
+shift-end export of hundreds of cards starts downloading right away and
+never has to be held in memory as a whole. A card that failed (card_html
+None) becomes an error entry for its call_id instead of ending the stream.
+"""
+import html
+import zipfile
+from datetime import datetime
+from typing import AsyncIterator, List, Optional, Sequence, Tuple
+
+from card.card_generator import DOCUMENT_HEAD, DOCUMENT_TAIL
+
+
+class _ChunkSink:
+    """Write-only, non-seekable file object; ZipFile then uses data descriptors."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data, self._chunks = b"".join(self._chunks), []
+        return data
+
+
+Cards = AsyncIterator[Tuple[int, Optional[str], Optional[str]]]
+
+
+def _missing_note(missing: Sequence[int]) -> str:
+    return "Niet gevonden meldingen: " + ", ".join(str(i) for i in missing) + "\n"
+
+
+def _error_note(call_id: int, error: Optional[str]) -> str:
+    return f"Incidentkaart voor melding {call_id} kon niet worden gemaakt: {error}\n"
+
+
+async def html_stream(cards: Cards, missing: Sequence[int] = ()) -> AsyncIterator[bytes]:
+    yield DOCUMENT_HEAD.encode("utf-8")
+    if missing:
+        yield f"<p><em>{_missing_note(missing)}</em></p>\n".encode("utf-8")
+    async for call_id, card, error in cards:
+        if card is None:
+            card = f"<p><em>{html.escape(_error_note(call_id, error))}</em></p>\n"
+        yield card.encode("utf-8")
+    yield DOCUMENT_TAIL.encode("utf-8")
+
+
+async def zip_stream(cards: Cards, missing: Sequence[int] = ()) -> AsyncIterator[bytes]:
+    sink = _ChunkSink()
+    stamp = datetime.now().timetuple()[:6]
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_DEFLATED) as zf:
+        if missing:
+            zf.writestr(zipfile.ZipInfo("niet_gevonden.txt", stamp), _missing_note(missing))
+        async for call_id, card, error in cards:
+            if card is None:
+                info = zipfile.ZipInfo(f"incidentkaart_{call_id}_fout.txt", stamp)
+                body = _error_note(call_id, error)
+            else:
+                info = zipfile.ZipInfo(f"incidentkaart_{call_id}.html", stamp)
+                body = DOCUMENT_HEAD + card + DOCUMENT_TAIL
+            info.compress_type = zipfile.ZIP_DEFLATED
+            zf.writestr(info, body)
+            yield sink.drain()
+    yield sink.drain()  # central directory
@@ -12,23 +12,23 @@ if BASE_DIR not in sys.path:
 # --- Stdlib / typing / utils -------------------------------------------------
 import time
 import json
+import importlib.util
 import asyncio
 import logging
-import re
+import secrets
 from collections import defaultdict, deque
-from typing import Deque, Tuple, List, Dict, Any, Optional
+from contextlib import asynccontextmanager
+from typing import Deque, Tuple, List, Dict, Any, Optional, Literal
 
 # --- Third-party / framework -------------------------------------------------
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException, Body, Request
+from fastapi import BackgroundTasks, Depends, FastAPI, HTTPException, Body, Header, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
+from fastapi.responses import HTMLResponse, Response, StreamingResponse
+from pydantic import BaseModel, ConfigDict, Field
 
-# --- NLTK data path (works on Render) ---------------------------------------
-import nltk
-NLTK_DIR = os.getenv("NLTK_DATA", os.path.join(os.path.dirname(__file__), ".nltk_data"))
-if NLTK_DIR not in nltk.data.path:
-    nltk.data.path.append(NLTK_DIR)
+# NLTK data: only the bundled .nltk_data is used, and nltk itself is imported
+# lazily by the modules that need it (analysis/nltk_data.py).
 
 # ---- Load env early ----
 load_dotenv()
@@ -41,37 +41,226 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("server.main")
 
 # ---- OpenAI client (SDK 1.x) -----------------------------------------------
-try:
-    from openai import OpenAI
-except Exception as e:
-    OpenAI = None
-    logger.error("OpenAI SDK not available: %s", e)
+# Created on the first MCP call: importing the SDK costs ~0.5 s of cold start.
+_openai_client = None
 
-client = OpenAI(api_key=OPENAI_API_KEY) if (OpenAI and OPENAI_API_KEY) else None
+def get_openai_client():
+    global _openai_client
+    if _openai_client is None and OPENAI_API_KEY:
+        try:
+            from openai import OpenAI
+        except Exception as e:
+            logger.error("OpenAI SDK not available: %s", e)
+            return None
+        _openai_client = OpenAI(api_key=OPENAI_API_KEY)
+    return _openai_client
 
 # ---- Local ML imports -------------------------------------------------------
 # model/scoring.py: def score_transcript(text:str) -> float in [0,1]
 try:
-    from model.scoring import score_transcript
+    from model.registry import ModelVersionNotFound
+    from model.scoring import (
+        score_transcript,
+        score_transcripts,
+        score_requests,
+        get_active_model,
+        get_model,
+        resident_versions,
+        start_model_watcher,
+        stop_model_watcher,
+    )
 except Exception as e:
     logger.exception("Failed to import model.scoring.score_transcript: %s", e)
 
-    def score_transcript(text: str) -> float:  # type: ignore[no-redef]
+    class ModelVersionNotFound(KeyError):  # type: ignore[no-redef]
+        pass
+
+    def score_transcript(text: str, version: Optional[str] = None) -> float:  # type: ignore[no-redef]
         raise RuntimeError("score_transcript import failed; check server logs.")
 
-# analysis/analyzer.py: def run_sensitivity_analysis(text:str, top_n:int=10) -> List[Dict]
+    def score_transcripts(texts: List[str], version: Optional[str] = None) -> List[float]:  # type: ignore[no-redef]
+        raise RuntimeError("score_transcripts import failed; check server logs.")
+
+    def score_requests(items):  # type: ignore[no-redef]
+        raise RuntimeError("score_requests import failed; check server logs.")
+
+    def get_active_model():  # type: ignore[no-redef]
+        return None
+
+    def get_model(version: Optional[str] = None):  # type: ignore[no-redef]
+        raise RuntimeError("get_model import failed; check server logs.")
+
+    def resident_versions() -> List[str]:  # type: ignore[no-redef]
+        return []
+
+    def start_model_watcher(interval_s: float = 5.0):  # type: ignore[no-redef]
+        pass
+
+    def stop_model_watcher():  # type: ignore[no-redef]
+        pass
+
+# analysis/analyzer.py: def run_attribution(text|TranscriptDoc, top_n:int=10, mode:str, model_version) -> (List[Dict], mode_used)
+# analysis/document.py: TranscriptDoc = transcript pre-processed once, shared by all analyses of a request
 try:
-    from analysis.analyzer import run_sensitivity_analysis
+    from analysis.analyzer import run_attribution
+    from analysis.document import TranscriptDoc
 except Exception as e:
-    logger.exception("Failed to import analysis.analyzer.run_sensitivity_analysis: %s", e)
+    logger.exception("Failed to import analysis.analyzer.run_attribution: %s", e)
+
+    class TranscriptDoc:  # type: ignore[no-redef]
+        def __init__(self, text: str, model_version: Optional[str] = None):
+            raise RuntimeError("TranscriptDoc import failed; check server logs.")
+
+    def run_attribution(text: str, top_n: int = 10, mode: str = "perturbation", model_version: Optional[str] = None) -> Tuple[List[Dict[str, Any]], str]:  # type: ignore[no-redef]
+        raise RuntimeError("run_attribution import failed; check server logs.")
+
+# ---- Micro-batching for /api/score -----------------------------------------
+from model.batching import MicroBatcher
+
+SCORE_BATCH_MAX_SIZE = int(os.getenv("SCORE_BATCH_MAX_SIZE", "32"))
+SCORE_BATCH_WINDOW_MS = float(os.getenv("SCORE_BATCH_WINDOW_MS", "5"))
+# Items are (transcript, pinned model version or None)
+score_batcher = MicroBatcher(
+    score_requests,
+    max_batch_size=SCORE_BATCH_MAX_SIZE,
+    max_wait_ms=SCORE_BATCH_WINDOW_MS,
+)
+
+# Seconds between checks for a newly published model artifact (0 = off)
+MODEL_RELOAD_INTERVAL_S = float(os.getenv("MODEL_RELOAD_INTERVAL_S", "5"))
+
+# ---- CPU-bound work: thread pool or process pool, routed by cost ------------
+from model.executor import CpuExecutor, HEAVY, LIGHT
+
+cpu_executor = CpuExecutor(
+    backend=os.getenv("ML_EXECUTOR", "thread").lower(),
+    workers=int(os.getenv("ML_PROCESS_WORKERS", "0")) or None,
+    reload_interval_s=MODEL_RELOAD_INTERVAL_S,
+)
+
+def _attribution_cost(mode: str) -> str:
+    # Perturbation re-scores dozens of variants; exact attribution is one transform
+    return LIGHT if mode == "exact" else HEAVY
+
+# ---- Shared result cache (score / attribution / emotions) -------------------
+from model.cache import ResultCache, normalized_hash
+
+result_cache = ResultCache(
+    max_entries=int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "2048")),
+    ttl_s=float(os.getenv("RESULT_CACHE_TTL_S", "900")),
+)
+# Rendered SVG/PNG charts: larger values, so a smaller cache of their own
+chart_cache = ResultCache(
+    max_entries=int(os.getenv("CHART_CACHE_MAX_ENTRIES", "256")),
+    ttl_s=float(os.getenv("RESULT_CACHE_TTL_S", "900")),
+)
+
+def _model_version(pinned: Optional[str] = None) -> Optional[str]:
+    if pinned:
+        return pinned
+    active = get_active_model()
+    return active.version if active else None
+
+async def _cached(namespace: str, transcript, compute, *params, pinned: Optional[str] = None,
+                  cache: Optional[ResultCache] = None, exact: bool = False):
+    """
+    Return the cached result for (namespace, transcript, params, model version) or compute it.
+    transcript: str or TranscriptDoc (reuses its hash). cache: default result_cache.
+    exact: key on the unmodified text, for results that echo it (e.g. sentence rows).
+    """
+    cache = cache or result_cache
+    version = _model_version(pinned)
+    if not pinned:
+        cache.observe_version(version)
+    if isinstance(transcript, str):
+        digest = normalized_hash(transcript) if exact else None
+        key = cache.make_key(namespace, transcript, version, *params, digest=digest)
+    else:
+        digest = transcript.text_hash if exact else transcript.hash
+        key = cache.make_key(namespace, transcript.text, version, *params, digest=digest)
+    value = cache.get(key)
+    if value is None:
+        value = await compute()
+        cache.put(key, value)
+    return value
+
+# ---- Scoring cascade for /api/score: cache -> model (deadline) -> heuristic --
+from model.fallback import danger_score as fallback_score
+
+SCORE_DEADLINE_MS = float(os.getenv("SCORE_DEADLINE_MS", "250"))
+score_sources: Dict[str, int] = defaultdict(int)
+
+async def _score_cascade(transcript, pinned: Optional[str], deadline_ms: float) -> Tuple[float, str]:
+    """
+    (score, source): cached result, else the model within deadline_ms, else the keyword fallback.
+    transcript: str (scored via the micro-batcher) or TranscriptDoc (scored on the doc, so
+    later analyses reuse its features and base score).
+    """
+    version = _model_version(pinned)
+    if not pinned:
+        result_cache.observe_version(version)
+    if isinstance(transcript, str):
+        key = result_cache.make_key("score", transcript, version)
+        compute = lambda: score_batcher.submit((transcript, pinned))
+    else:
+        key = result_cache.make_key("score", transcript.text, version, digest=transcript.hash)
+        compute = lambda: asyncio.to_thread(lambda: transcript.score)
+    value = result_cache.get(key)
+    if value is not None:
+        return value, "cache"
+    if version is None:
+        return fallback_score(transcript), "fallback"
 
-    def run_sensitivity_analysis(text: str, top_n: int = 10) -> List[Dict[str, Any]]:  # type: ignore[no-redef]
-        raise RuntimeError("run_sensitivity_analysis import failed; check server logs.")
+    def _store(task: asyncio.Future):
+        # A late model result still fills the cache for the next request
+        if not task.cancelled() and task.exception() is None:
+            result_cache.put(key, task.result())
+
+    task = asyncio.ensure_future(compute())
+    task.add_done_callback(_store)
+    try:
+        return await asyncio.wait_for(asyncio.shield(task), deadline_ms / 1000), "model"
+    except asyncio.TimeoutError:
+        logger.warning("Model missed the %.0f ms scoring deadline; using fallback", deadline_ms)
+    except ModelVersionNotFound:
+        raise
+    except Exception as e:
+        logger.warning("Model scoring failed; using fallback: %s", e)
+    return fallback_score(transcript), "fallback"
+
+# ---- Admin retraining: queued jobs in a separate, lower-priority process -----
+from model.jobs import TERMINAL as RETRAIN_TERMINAL, RetrainQueue
+
+retrain_queue = RetrainQueue()
+
+# ---- Shadow scoring of a candidate model (after the response is sent) --------
+from model.shadow import ShadowScorer
+
+shadow_scorer = ShadowScorer(
+    score_transcript,
+    candidate=os.getenv("SHADOW_MODEL_VERSION") or None,
+    max_queue=int(os.getenv("SHADOW_QUEUE_MAX", "256")),
+)
 
 # =============================================================================
 # FastAPI app
 # =============================================================================
-app = FastAPI(title="112 Analyzer API", version="2.1.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    start_model_watcher(MODEL_RELOAD_INTERVAL_S)
+    await asyncio.to_thread(cpu_executor.start)
+    shadow_scorer.start()
+    retrain_queue.start()
+    try:
+        yield
+    finally:
+        await score_batcher.stop()
+        shadow_scorer.stop()
+        await asyncio.to_thread(retrain_queue.stop)
+        cpu_executor.shutdown()
+        stop_model_watcher()
+
+app = FastAPI(title="112 Analyzer API", version="2.1.0", lifespan=lifespan)
 
 # Single CORS block (avoid duplicates)
 app.add_middleware(
@@ -94,76 +283,188 @@ async def log_requests(request: Request, call_next):
 # =============================================================================
 # Schemas
 # =============================================================================
-class ScoreRequest(BaseModel):
+# model_version: pin a registry version (see /api/models); default = active model
+class VersionedRequest(BaseModel):
+    model_config = ConfigDict(protected_namespaces=())
+    model_version: Optional[str] = None
+
+class ScoreRequest(VersionedRequest):
     transcript: str = Field(..., min_length=3)
+    deadline_ms: Optional[float] = Field(None, gt=0, le=10000)  # default SCORE_DEADLINE_MS
 
 class ScoreResponse(BaseModel):
     score: float
+    source: Literal["cache", "model", "fallback"] = "model"
+
+class BatchScoreRequest(VersionedRequest):
+    transcripts: List[str] = Field(..., min_length=1, max_length=512)
+
+class BatchScoreResponse(BaseModel):
+    scores: List[float]
+
+# "exact" = closed-form attribution for linear models (falls back to perturbation)
+AttributionMode = Literal["perturbation", "exact"]
 
-class SensitivityRequest(BaseModel):
+class SensitivityRequest(VersionedRequest):
     transcript: str = Field(..., min_length=3)
     top_n: int = Field(10, ge=1, le=30)
+    mode: AttributionMode = "perturbation"
 
 class SensitivityResponse(BaseModel):
     results: List[Dict[str, Any]]
+    mode: str = "perturbation"
 
-class AnalyzeRequest(BaseModel):
+class AnalyzeRequest(VersionedRequest):
     transcript: str = Field(..., min_length=3)
     top_n: int = Field(10, ge=1, le=30)
+    mode: AttributionMode = "perturbation"
 
 class AnalyzeResponse(BaseModel):
     score: float
     results: List[Dict[str, Any]]
+    mode: str = "perturbation"
 
 # =============================================================================
 # Health
 # =============================================================================
 @app.get("/health")
 def health():
+    active = get_active_model()
     return {
         "status": "ok",
-        "openai_client": bool(client),
+        "openai_client": bool(OPENAI_API_KEY) and importlib.util.find_spec("openai") is not None,
         "model": OPENAI_MODEL,
         "ml_imports_ok": score_transcript is not None,
+        "danger_model": active.info() if active else None,
     }
 
 # =============================================================================
 # ML endpoints
 # =============================================================================
 @app.post("/api/score", response_model=ScoreResponse)
-async def api_score(req: ScoreRequest):
+async def api_score(req: ScoreRequest, background_tasks: BackgroundTasks):
     t0 = time.perf_counter()
     try:
-        s = await asyncio.to_thread(score_transcript, req.transcript)
+        s, source = await _score_cascade(req.transcript, req.model_version,
+                                         req.deadline_ms or SCORE_DEADLINE_MS)
+        score_sources[source] += 1
+        if not req.model_version and source != "fallback":
+            background_tasks.add_task(shadow_scorer.submit, req.transcript, float(s),
+                                      (time.perf_counter() - t0) * 1000, "score")
         s = max(0.0, min(1.0, float(s)))
-        return {"score": round(s, 4)}
+        return {"score": round(s, 4), "source": source}
+    except ModelVersionNotFound as e:
+        raise HTTPException(status_code=404, detail=f"unknown model version: {e}")
     except Exception as e:
         logger.exception("/api/score failed: %s", e)
         raise HTTPException(status_code=500, detail=f"scoring failed: {e}")
     finally:
         logger.info("/api/score completed in %.1f ms", (time.perf_counter() - t0) * 1000)
 
+@app.post("/api/score/batch", response_model=BatchScoreResponse)
+async def api_score_batch(req: BatchScoreRequest):
+    t0 = time.perf_counter()
+    try:
+        version = _model_version(req.model_version)
+        if not req.model_version:
+            result_cache.observe_version(version)
+        keys = [result_cache.make_key("score", t, version) for t in req.transcripts]
+        scores = [result_cache.get(k) for k in keys]
+        missing = [i for i, v in enumerate(scores) if v is None]
+        if missing:
+            fresh = await asyncio.to_thread(score_transcripts, [req.transcripts[i] for i in missing],
+                                            req.model_version)
+            for i, v in zip(missing, fresh):
+                scores[i] = v
+                result_cache.put(keys[i], v)
+        return {"scores": [round(max(0.0, min(1.0, float(s))), 4) for s in scores]}
+    except ModelVersionNotFound as e:
+        raise HTTPException(status_code=404, detail=f"unknown model version: {e}")
+    except Exception as e:
+        logger.exception("/api/score/batch failed: %s", e)
+        raise HTTPException(status_code=500, detail=f"batch scoring failed: {e}")
+    finally:
+        logger.info("/api/score/batch (%d) completed in %.1f ms",
+                    len(req.transcripts), (time.perf_counter() - t0) * 1000)
+
+@app.get("/api/metrics")
+def api_metrics():
+    return {
+        "score_batcher": score_batcher.metrics(),
+        "score_sources": dict(score_sources),
+        "result_cache": result_cache.metrics(),
+        "chart_cache": chart_cache.metrics(),
+        "executor": cpu_executor.metrics(),
+        "shadow": shadow_scorer.metrics(recent=0),
+        "retrain": retrain_queue.metrics(),
+    }
+
+class ShadowConfig(VersionedRequest):
+    pass
+
+@app.get("/api/shadow")
+def api_shadow(recent: int = 10):
+    return shadow_scorer.metrics(recent=max(0, min(recent, 100)))
+
+@app.put("/api/shadow")
+async def api_shadow_config(cfg: ShadowConfig):
+    """Set the candidate version (null disables shadow mode); resets the statistics."""
+    if cfg.model_version:
+        try:
+            # Load it now so the worker doesn't pay the load on its first comparison
+            await asyncio.to_thread(get_model, cfg.model_version)
+        except ModelVersionNotFound as e:
+            raise HTTPException(status_code=404, detail=f"unknown model version: {e}")
+    shadow_scorer.set_candidate(cfg.model_version)
+    return shadow_scorer.metrics(recent=0)
+
+@app.get("/api/models")
+def api_models():
+    try:
+        from model.registry import list_versions
+        versions = list_versions()
+    except Exception as e:
+        logger.exception("/api/models failed: %s", e)
+        raise HTTPException(status_code=500, detail=f"model registry unavailable: {e}")
+    active = get_active_model()
+    return {
+        "active": active.version if active else None,
+        "resident": resident_versions(),
+        "versions": versions,
+    }
+
+def _sensitivity_rows(rows) -> List[Dict[str, Any]]:
+    out: List[Dict[str, Any]] = []
+    for r in rows or []:
+        term = r.get("Term") or r.get("term") or r.get("Scenario") or ""
+        delta = r.get("Δ Change", r.get("delta", 0.0))
+        try:
+            delta = float(delta)
+        except Exception:
+            delta = 0.0
+        out.append({
+            "Term": term,
+            "delta": round(delta, 6),
+            "Δ Change": round(delta, 6),
+            "Color": r.get("Color", "green"),
+        })
+    return out
+
 @app.post("/api/sensitivity", response_model=SensitivityResponse)
 async def api_sensitivity(req: SensitivityRequest):
     t0 = time.perf_counter()
     try:
         top = min(req.top_n, 20)
-        rows = await asyncio.to_thread(run_sensitivity_analysis, req.transcript, top)
-        out: List[Dict[str, Any]] = []
-        for r in rows or []:
-            term = r.get("Term") or r.get("term") or r.get("Scenario") or ""
-            delta = r.get("Δ Change", r.get("delta", 0.0))
-            try:
-                delta = float(delta)
-            except Exception:
-                delta = 0.0
-            out.append({
-                "Term": term,
-                "delta": round(delta, 6),
-                "Δ Change": round(delta, 6),
-                "Color": r.get("Color", "green"),
-            })
-        return {"results": out}
+        doc = TranscriptDoc(req.transcript, req.model_version)
+        rows, mode = await _cached(
+            "attribution", doc,
+            lambda: cpu_executor.run(run_attribution, doc, top, req.mode,
+                                     cost=_attribution_cost(req.mode)),
+            top, req.mode, pinned=req.model_version,
+        )
+        return {"results": _sensitivity_rows(rows), "mode": mode}
+    except ModelVersionNotFound as e:
+        raise HTTPException(status_code=404, detail=f"unknown model version: {e}")
     except Exception as e:
         logger.exception("/api/sensitivity failed: %s", e)
         raise HTTPException(status_code=500, detail=f"sensitivity failed: {e}")
@@ -171,13 +472,24 @@ async def api_sensitivity(req: SensitivityRequest):
         logger.info("/api/sensitivity completed in %.1f ms", (time.perf_counter() - t0) * 1000)
 
 @app.post("/api/analyze", response_model=AnalyzeResponse)
-async def api_analyze(req: AnalyzeRequest):
+async def api_analyze(req: AnalyzeRequest, background_tasks: BackgroundTasks):
     t0 = time.perf_counter()
     try:
-        s = await asyncio.to_thread(score_transcript, req.transcript)
+        # One TranscriptDoc: the base score computed here is reused by the attribution
+        doc = TranscriptDoc(req.transcript, req.model_version)
+        s = await _cached("score", doc, lambda: asyncio.to_thread(lambda: doc.score),
+                          pinned=req.model_version)
+        if not req.model_version:
+            background_tasks.add_task(shadow_scorer.submit, req.transcript, float(s),
+                                      (time.perf_counter() - t0) * 1000, "analyze")
         s = max(0.0, min(1.0, float(s)))
         top = min(req.top_n, 20)
-        rows = await asyncio.to_thread(run_sensitivity_analysis, req.transcript, top)
+        rows, mode = await _cached(
+            "attribution", doc,
+            lambda: cpu_executor.run(run_attribution, doc, top, req.mode,
+                                     cost=_attribution_cost(req.mode)),
+            top, req.mode, pinned=req.model_version,
+        )
         norm: List[Dict[str, Any]] = []
         for r in rows or []:
             term = r.get("Term") or r.get("term") or r.get("Scenario") or ""
@@ -187,50 +499,108 @@ async def api_analyze(req: AnalyzeRequest):
             except Exception:
                 delta = 0.0
             norm.append({"Term": term, "delta": round(delta, 6)})
-        return {"score": round(s, 4), "results": norm}
+        return {"score": round(s, 4), "results": norm, "mode": mode}
+    except ModelVersionNotFound as e:
+        raise HTTPException(status_code=404, detail=f"unknown model version: {e}")
     except Exception as e:
         logger.exception("/api/analyze failed: %s", e)
         raise HTTPException(status_code=500, detail=f"analyze failed: {e}")
     finally:
         logger.info("/api/analyze completed in %.1f ms", (time.perf_counter() - t0) * 1000)
 
+# =============================================================================
+# Live scoring (WebSocket): transcript deltas in, updated score out
+# =============================================================================
+# Client -> server: {"delta": "<new text>"} (appended verbatim) or {"reset": true};
+# a plain text frame is treated as a delta.
+# Server -> client: {"type": "score", "score", "chunks", "tokens", "mode", "model_version", "ms"}
+from model.incremental import IncrementalScorer
+
+LIVE_MAX_TRANSCRIPT_CHARS = int(os.getenv("LIVE_MAX_TRANSCRIPT_CHARS", "200000"))
+
+@app.websocket("/ws/live-score")
+async def ws_live_score(ws: WebSocket):
+    await ws.accept()
+    scorer = IncrementalScorer()
+    size = 0
+    try:
+        while True:
+            raw = await ws.receive_text()
+            try:
+                msg = json.loads(raw)
+            except ValueError:
+                msg = {"delta": raw}
+            if not isinstance(msg, dict):
+                msg = {"delta": str(msg)}
+
+            if msg.get("reset"):
+                scorer.reset()
+                size = 0
+                await ws.send_json({"type": "reset"})
+                continue
+
+            delta = msg.get("delta") or ""
+            if not isinstance(delta, str) or not delta:
+                await ws.send_json({"type": "error", "detail": "delta must be a non-empty string"})
+                continue
+            size += len(delta)
+            if size > LIVE_MAX_TRANSCRIPT_CHARS:
+                await ws.send_json({"type": "error", "detail": "transcript too long"})
+                await ws.close(code=1009)
+                return
+
+            t0 = time.perf_counter()
+            try:
+                # Off the event loop: without a linear view (e.g. the hashed online
+                # model) append re-predicts the whole text. Per connection the calls
+                # stay sequential because each one is awaited.
+                s = await asyncio.to_thread(scorer.append, delta)
+            except Exception as e:
+                logger.exception("/ws/live-score failed: %s", e)
+                await ws.send_json({"type": "error", "detail": f"scoring failed: {e}"})
+                continue
+            await ws.send_json({
+                "type": "score",
+                "score": round(max(0.0, min(1.0, float(s))), 4),
+                "chunks": scorer.chunks,
+                "tokens": scorer.tokens,
+                "mode": scorer.mode,
+                "model_version": scorer.model_version,
+                "ms": round((time.perf_counter() - t0) * 1000, 3),
+            })
+    except WebSocketDisconnect:
+        pass
+
 # =============================================================================
 # Sentiment & Recommendations (Nederlands)
 # =============================================================================
 class SentimentRequest(BaseModel):
     transcript: str = Field(..., min_length=3)
+    sentences: bool = False  # also return the polarity per sentence
+
+class SentenceSentiment(BaseModel):
+    sentence: str
+    polarity: float  # -1 (negatief) .. 1 (positief)
 
 class SentimentResponse(BaseModel):
     emotions: Dict[str, float]  # bv {"angst":0.7, "boosheid":0.6, ...}
+    sentences: Optional[List[SentenceSentiment]] = None
 
-EMO_LEX = {
-    "angst": ["bang", "angstig", "vrees", "paniek", "gevaar", "ik moet vluchten", "help", "hulp"],
-    "boosheid": ["boos", "woedend", "schreeuwt", "bedreigt", "agressief", "aanvalt", "geweld"],
-    "verdriet": ["huilen", "verdriet", "pijn", "gewond", "gewond geraakt"],
-    "urgentie": ["nu", "meteen", "dringend", "spoed", "snel", "direct"],
-    "wanhoop": ["ik kan niet", "het gaat mis", "red me", "wanhopig", "ik ben bang", "ik moet weg"],
-}
-
-def _score_emotions_nl(text: str) -> Dict[str, float]:
-    t = text.lower()
-    out: Dict[str, float] = {}
-    total_hits = 0
-    raw: Dict[str, int] = {}
-    for emo, terms in EMO_LEX.items():
-        c = 0
-        for kw in terms:
-            c += len(re.findall(r"\b" + re.escape(kw) + r"\b", t))
-        raw[emo] = c
-        total_hits += c
-    denom = max(1, total_hits)
-    for emo, c in raw.items():
-        out[emo] = round(c / denom, 4)
-    return out
+# Emotion lexicon + scorer live in analysis/emotions.py (importable by pool workers)
+from analysis.emotions import score_emotions_nl as _score_emotions_nl
+from analysis.sentiment_module import sentiment_analysis
 
 @app.post("/api/sentiment", response_model=SentimentResponse)
 async def api_sentiment(req: SentimentRequest):
     try:
-        emo = await asyncio.to_thread(_score_emotions_nl, req.transcript)
+        doc = TranscriptDoc(req.transcript)
+        if req.sentences:
+            # Sentence polarity + emotion shares from one lexicon pass
+            rows, emo = await _cached("sentences", doc, lambda: cpu_executor.run(sentiment_analysis, doc, True),
+                                      exact=True)
+            return {"emotions": emo,
+                    "sentences": [{"sentence": r["Sentence"], "polarity": r["Polarity"]} for r in rows]}
+        emo = await _cached("emotions", doc, lambda: cpu_executor.run(_score_emotions_nl, doc))
         return {"emotions": emo}
     except Exception as e:
         logger.exception("/api/sentiment failed: %s", e)
@@ -243,13 +613,12 @@ class RecommendRequest(BaseModel):
 class RecommendResponse(BaseModel):
     actions: List[str]
 
-WEAPON_TERMS = ["mes", "pistool", "geweer", "hamer", "fles", "machete", "bijl"]
-SELF_HARM_TERMS = ["snijdt zichzelf", "zelfmoord", "ik doe mezelf pijn", "ik ga mezelf pijn doen", "ik ga mezelf iets aandoen"]
+from analysis.lexicon import lexicon_hits
 
-def _recommend_actions(text: str, score: float) -> List[str]:
-    t = text.lower()
-    has_weapon = any(w in t for w in WEAPON_TERMS)
-    self_harm = any(s in t for s in SELF_HARM_TERMS)
+def _recommend_actions(text, score: float) -> List[str]:
+    hits = lexicon_hits(text)  # str or TranscriptDoc
+    has_weapon = bool(hits["weapon"])
+    self_harm = bool(hits["self_harm"])
     high = score >= 0.7
     med = 0.4 <= score < 0.7
 
@@ -287,6 +656,417 @@ async def api_recommend(req: RecommendRequest):
         logger.exception("/api/recommend failed: %s", e)
         raise HTTPException(status_code=500, detail=f"recommend failed: {e}")
 
+# =============================================================================
+# Scenarios (Monte Carlo outcome branches)
+# =============================================================================
+from model.scenario_planner import (
+    DEFAULT_SAMPLES, FALLBACK_CONCENTRATION, MODEL_CONCENTRATION,
+    generate_worst_case_scenario, risk_cues, simulate_scenarios,
+)
+
+class ScenarioRequest(VersionedRequest):
+    transcript: str = Field(..., min_length=3)
+    score: Optional[float] = Field(None, ge=0.0, le=1.0)  # reuse the caller's score; scored here if omitted
+    n_samples: int = Field(DEFAULT_SAMPLES, ge=100, le=100_000)
+    seed: Optional[int] = 0                                # None = fresh randomness
+
+class ScenarioBranch(BaseModel):
+    description: str
+    probability: float
+    ci_low: float
+    ci_high: float
+
+class ScenarioResponse(BaseModel):
+    score: float
+    source: str  # "caller" | "model" | "cache" | "fallback"
+    cues: Dict[str, bool]
+    n_samples: int
+    branches: List[ScenarioBranch]
+    worst_case: str
+    ms: float
+
+def _scenarios(doc, score: float, source: str, n_samples: int = DEFAULT_SAMPLES,
+               seed: Optional[int] = 0) -> Dict[str, Any]:
+    concentration = FALLBACK_CONCENTRATION if source == "fallback" else MODEL_CONCENTRATION
+    sim = simulate_scenarios(score, risk_cues(doc), n_samples, seed, concentration)
+    sim["worst_case"] = generate_worst_case_scenario(doc, score)
+    return sim
+
+@app.post("/api/scenarios", response_model=ScenarioResponse)
+async def api_scenarios(req: ScenarioRequest):
+    t0 = time.perf_counter()
+    try:
+        doc = TranscriptDoc(req.transcript, req.model_version)
+        if req.score is not None:
+            s, source = req.score, "caller"
+        else:
+            s, source = await _score_cascade(doc, req.model_version, SCORE_DEADLINE_MS)
+            score_sources[source] += 1
+        s = max(0.0, min(1.0, float(s)))
+        t_sim = time.perf_counter()
+        out = await asyncio.to_thread(_scenarios, doc, s, source, req.n_samples, req.seed)
+        out.update(source=source, ms=round((time.perf_counter() - t_sim) * 1000, 2))
+        return out
+    except ModelVersionNotFound as e:
+        raise HTTPException(status_code=404, detail=f"unknown model version: {e}")
+    except Exception as e:
+        logger.exception("/api/scenarios failed: %s", e)
+        raise HTTPException(status_code=500, detail=f"scenarios failed: {e}")
+    finally:
+        logger.info("/api/scenarios completed in %.1f ms", (time.perf_counter() - t0) * 1000)
+
+# =============================================================================
+# Charts (server-side SVG/PNG, object-oriented Agg; analysis/charts.py)
+# =============================================================================
+from analysis.charts import FORMATS as CHART_FORMATS, render_chart
+
+ChartType = Literal["sensitivity", "sentiment", "risk_factors"]
+
+class ChartRequest(VersionedRequest):
+    transcript: str = Field(..., min_length=3)
+    format: Literal["svg", "png"] = "svg"
+    top_n: int = Field(10, ge=1, le=30)           # sensitivity only
+    mode: AttributionMode = "perturbation"        # sensitivity only
+
+async def _chart_data(chart: str, doc, req: ChartRequest):
+    """Chart input, from the shared result cache where the analysis is cached."""
+    if chart == "sensitivity":
+        top = min(req.top_n, 20)
+        rows, _ = await _cached(
+            "attribution", doc,
+            lambda: cpu_executor.run(run_attribution, doc, top, req.mode,
+                                     cost=_attribution_cost(req.mode)),
+            top, req.mode, pinned=req.model_version,
+        )
+        return rows
+    if chart == "sentiment":
+        rows, _ = await _cached("sentences", doc, lambda: cpu_executor.run(sentiment_analysis, doc, True),
+                                exact=True)
+        return [r["Polarity"] for r in rows]
+    return doc.tokens
+
+@app.post("/api/charts/{chart}")
+async def api_chart(chart: ChartType, req: ChartRequest):
+    """Rendered chart; cached by (transcript hash, chart type, format[, top_n, mode])."""
+    t0 = time.perf_counter()
+    try:
+        doc = TranscriptDoc(req.transcript, req.model_version)
+        params = (req.format, req.top_n, req.mode) if chart == "sensitivity" else (req.format,)
+
+        async def compute():
+            data = await _chart_data(chart, doc, req)
+            return await cpu_executor.run(render_chart, chart, data, req.format, cost=HEAVY)
+
+        body = await _cached(f"chart:{chart}", doc, compute, *params,
+                             pinned=req.model_version, cache=chart_cache)
+        return Response(content=body, media_type=CHART_FORMATS[req.format])
+    except ModelVersionNotFound as e:
+        raise HTTPException(status_code=404, detail=f"unknown model version: {e}")
+    except Exception as e:
+        logger.exception("/api/charts/%s failed: %s", chart, e)
+        raise HTTPException(status_code=500, detail=f"chart failed: {e}")
+    finally:
+        logger.info("/api/charts/%s completed in %.1f ms", chart, (time.perf_counter() - t0) * 1000)
+
+# =============================================================================
+# Admin: background retraining (model/jobs.py)
+# =============================================================================
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+RETRAIN_SSE_KEEPALIVE_S = 15.0
+
+def _require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Admin endpoints are disabled without ADMIN_TOKEN and require a matching X-Admin-Token header."""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="admin endpoints are disabled (ADMIN_TOKEN not set)")
+    if not x_admin_token or not secrets.compare_digest(x_admin_token.encode("utf-8"), ADMIN_TOKEN.encode("utf-8")):
+        raise HTTPException(status_code=401, detail="invalid admin token")
+
+class RetrainRequest(BaseModel):
+    kind: Literal["pipeline", "forest", "online"] = "pipeline"
+    full: bool = False      # online only: rebuild from all records
+
+def _retrain_job(job_id: str):
+    job = retrain_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"unknown retrain job: {job_id}")
+    return job
+
+@app.post("/api/admin/retrain", status_code=202, dependencies=[Depends(_require_admin)])
+def api_retrain(req: RetrainRequest):
+    """Queue a retrain job; returns at once (an identical queued job is reused)."""
+    options = {"full": req.full} if req.kind == "online" else {}
+    return retrain_queue.submit(req.kind, options).info()
+
+@app.get("/api/admin/retrain", dependencies=[Depends(_require_admin)])
+def api_retrain_jobs():
+    return {**retrain_queue.metrics(), "history": retrain_queue.jobs()}
+
+@app.get("/api/admin/retrain/{job_id}", dependencies=[Depends(_require_admin)])
+def api_retrain_job(job_id: str):
+    return _retrain_job(job_id).info(log=True)
+
+@app.delete("/api/admin/retrain/{job_id}", dependencies=[Depends(_require_admin)])
+def api_retrain_cancel(job_id: str):
+    """Cancel a queued job or stop a running one (the served model stays as it is)."""
+    _retrain_job(job_id)
+    return retrain_queue.cancel(job_id).info()
+
+def _sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.get("/api/admin/retrain/{job_id}/events", dependencies=[Depends(_require_admin)])
+async def api_retrain_events(job_id: str):
+    """
+    Server-sent events: the current state and log, then "progress", "log"
+    and "status" events live; the stream ends with the final status.
+    """
+    _retrain_job(job_id)
+    queue = retrain_queue.subscribe(job_id)
+
+    async def stream():
+        try:
+            info = _retrain_job(job_id).info(log=True)
+            for line in info.pop("log"):
+                yield _sse("log", line)
+            yield _sse("status", info)
+            if info["status"] in RETRAIN_TERMINAL:
+                return
+            while True:
+                try:
+                    event, data = await asyncio.wait_for(queue.get(), RETRAIN_SSE_KEEPALIVE_S)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield _sse(event, data)
+                if event == "status" and data["status"] in RETRAIN_TERMINAL:
+                    return
+        finally:
+            retrain_queue.unsubscribe(job_id, queue)
+
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+# =============================================================================
+# Incident: all analyses of one transcript in one round-trip
+# =============================================================================
+
+INCIDENT_SECTION_TIMEOUT_MS = float(os.getenv("INCIDENT_SECTION_TIMEOUT_MS", "2000"))
+IncidentSection = Literal["score", "sensitivity", "sentiment", "recommendations", "scenarios"]
+
+class IncidentRequest(VersionedRequest):
+    transcript: str = Field(..., min_length=3)
+    top_n: int = Field(10, ge=1, le=30)
+    mode: AttributionMode = "perturbation"
+    sections: Optional[List[IncidentSection]] = None           # default: all
+    timeout_ms: Optional[float] = Field(None, gt=0, le=30000)  # per section; default INCIDENT_SECTION_TIMEOUT_MS
+
+class IncidentSectionResult(BaseModel):
+    status: Literal["ok", "timeout", "error", "skipped"]
+    ms: float
+    data: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+class IncidentResponse(BaseModel):
+    sections: Dict[str, IncidentSectionResult]
+    total_ms: float
+
+@app.post("/api/incident", response_model=IncidentResponse)
+async def api_incident(req: IncidentRequest, background_tasks: BackgroundTasks):
+    """
+    Score, sensitivity, sentiment, recommendations and scenarios run
+    concurrently on one TranscriptDoc; each section has its own timeout and
+    the response carries whatever finished (status + ms per section).
+    Recommendations and scenarios wait for the score instead of the client.
+    """
+    t0 = time.perf_counter()
+    timeout_ms = req.timeout_ms or INCIDENT_SECTION_TIMEOUT_MS
+    wanted = set(req.sections or IncidentSection.__args__)
+    doc = TranscriptDoc(req.transcript, req.model_version)
+    top = min(req.top_n, 20)
+
+    async def score():
+        s, source = await _score_cascade(doc, req.model_version, min(SCORE_DEADLINE_MS, timeout_ms))
+        score_sources[source] += 1
+        if not req.model_version and source != "fallback":
+            background_tasks.add_task(shadow_scorer.submit, req.transcript, float(s),
+                                      (time.perf_counter() - t0) * 1000, "incident")
+        return {"score": round(max(0.0, min(1.0, float(s))), 4), "source": source}
+
+    # Shared by every section that needs the score
+    needs_score = wanted & {"score", "recommendations", "scenarios"}
+    score_task = asyncio.ensure_future(score()) if needs_score else None
+
+    async def sensitivity():
+        rows, mode = await _cached(
+            "attribution", doc,
+            lambda: cpu_executor.run(run_attribution, doc, top, req.mode,
+                                     cost=_attribution_cost(req.mode)),
+            top, req.mode, pinned=req.model_version,
+        )
+        return {"results": _sensitivity_rows(rows), "mode": mode}
+
+    async def sentiment():
+        emo = await _cached("emotions", doc, lambda: cpu_executor.run(_score_emotions_nl, doc))
+        return {"emotions": emo}
+
+    async def recommendations():
+        s = (await asyncio.shield(score_task))["score"]
+        return {"actions": await asyncio.to_thread(_recommend_actions, doc, s)}
+
+    async def scenarios():
+        scored = await asyncio.shield(score_task)
+        return await asyncio.to_thread(_scenarios, doc, scored["score"], scored["source"])
+
+    runners = {
+        "score": lambda: asyncio.shield(score_task),
+        "sensitivity": sensitivity,
+        "sentiment": sentiment,
+        "recommendations": recommendations,
+        "scenarios": scenarios,
+    }
+
+    async def run(name: str) -> Dict[str, Any]:
+        s0 = time.perf_counter()
+        try:
+            data = await asyncio.wait_for(runners[name](), timeout_ms / 1000)
+            result = {"status": "ok", "data": data}
+        except asyncio.TimeoutError:
+            result = {"status": "timeout", "error": f"no result within {timeout_ms:.0f} ms"}
+        except ModelVersionNotFound as e:
+            result = {"status": "error", "error": f"unknown model version: {e}"}
+        except Exception as e:
+            logger.exception("/api/incident section %s failed: %s", name, e)
+            result = {"status": "error", "error": str(e)}
+        result["ms"] = round((time.perf_counter() - s0) * 1000, 1)
+        return result
+
+    names = [n for n in IncidentSection.__args__ if n in wanted]
+    results = await asyncio.gather(*(run(n) for n in names))
+    sections: Dict[str, Any] = dict(zip(names, results))
+    for n in IncidentSection.__args__:
+        sections.setdefault(n, {"status": "skipped", "ms": 0.0})
+    if score_task is not None and not score_task.done():
+        score_task.cancel()
+    total_ms = (time.perf_counter() - t0) * 1000
+    logger.info("/api/incident completed in %.1f ms (%s)", total_ms,
+                ", ".join(f"{n} {sections[n]['ms']:.0f}" for n in names))
+    return {"sections": sections, "total_ms": round(total_ms, 1)}
+
+# =============================================================================
+# Incident cards (single + bulk export for shift-end reports)
+# =============================================================================
+from card.card_generator import build_card, render_card
+from card.export import html_stream, zip_stream
+from model.db import SessionLocal
+from model.models import CallRecord
+
+CARD_EXPORT_CONCURRENCY = int(os.getenv("CARD_EXPORT_CONCURRENCY", "0")) or cpu_executor.workers * 2
+
+class CardExportRequest(BaseModel):
+    call_ids: List[int] = Field(..., min_length=1, max_length=1000)
+    format: Literal["zip", "html"] = "zip"
+    top_n: int = Field(10, ge=1, le=30)
+    mode: AttributionMode = "perturbation"
+
+def _fetch_call_records(call_ids: List[int]) -> List[Tuple[int, str, Optional[str]]]:
+    """(id, transcript, timestamp) in request order; only the needed columns."""
+    wanted = list(dict.fromkeys(call_ids))
+    found: Dict[int, Tuple[int, str, Optional[str]]] = {}
+    session = SessionLocal()
+    try:
+        for i in range(0, len(wanted), 500):  # stay below SQLite's bound-parameter limit
+            rows = (session.query(CallRecord.id, CallRecord.transcript, CallRecord.timestamp)
+                    .filter(CallRecord.id.in_(wanted[i:i + 500])).all())
+            for rid, transcript, ts in rows:
+                found[rid] = (rid, transcript or "", ts.strftime("%Y-%m-%d %H:%M") if ts else None)
+    finally:
+        session.close()
+    return [found[i] for i in wanted if i in found]
+
+async def _card(record: Tuple[int, str, Optional[str]], top: int, mode: str) -> str:
+    """One card; results already in the shared cache (score/attribution/sentences) are reused."""
+    call_id, transcript, ts = record
+    version = _model_version()
+    result_cache.observe_version(version)
+    keys = {
+        "score": result_cache.make_key("score", transcript, version),
+        "attribution": result_cache.make_key("attribution", transcript, version, top, mode),
+        # sentence rows echo the text: keyed on the raw transcript (see _cached(exact=True))
+        "sentences": result_cache.make_key("sentences", transcript, version, digest=normalized_hash(transcript)),
+    }
+    known = {name: v for name, key in keys.items() if (v := result_cache.get(key)) is not None}
+    if len(known) == len(keys):
+        rows, _ = known["attribution"]
+        return render_card(float(known["score"]), rows, known["sentences"][0], call_id, ts)
+    card, parts = await cpu_executor.run(build_card, transcript, top, mode, None, known, call_id, ts,
+                                         cost=_attribution_cost(mode) if "attribution" not in known else LIGHT)
+    if parts.get("model_version") == version:
+        for name, key in keys.items():
+            if name not in known:
+                result_cache.put(key, parts[name])
+    return card
+
+async def _cards(records, top: int, mode: str):
+    """
+    Yield (call_id, html, error) in order, keeping CARD_EXPORT_CONCURRENCY cards
+    in flight. A card that fails yields (call_id, None, message) so the export
+    streams on: the response headers have already gone out by then.
+    """
+    pending: Deque[Tuple[int, asyncio.Task]] = deque()
+    it = iter(records)
+    try:
+        for rec in it:
+            pending.append((rec[0], asyncio.ensure_future(_card(rec, top, mode))))
+            if len(pending) >= CARD_EXPORT_CONCURRENCY:
+                break
+        while pending:
+            call_id, task = pending.popleft()
+            card, error = None, None
+            try:
+                card = await task
+            except Exception as e:
+                logger.exception("/api/cards/export: card %s failed: %s", call_id, e)
+                error = str(e) or type(e).__name__
+            nxt = next(it, None)
+            if nxt is not None:
+                pending.append((nxt[0], asyncio.ensure_future(_card(nxt, top, mode))))
+            yield call_id, card, error
+    finally:
+        # Client went away: don't keep rendering for nobody
+        for _, task in pending:
+            task.cancel()
+
+@app.get("/api/cards/{call_id}", response_class=HTMLResponse)
+async def api_card(call_id: int, top_n: int = 10, mode: AttributionMode = "perturbation"):
+    records = await asyncio.to_thread(_fetch_call_records, [call_id])
+    if not records:
+        raise HTTPException(status_code=404, detail=f"call {call_id} not found")
+    try:
+        card = await _card(records[0], min(max(1, top_n), 20), mode)
+    except Exception as e:
+        logger.exception("/api/cards/%s failed: %s", call_id, e)
+        raise HTTPException(status_code=500, detail=f"card rendering failed: {e}")
+    return HTMLResponse(card)
+
+@app.post("/api/cards/export")
+async def api_cards_export(req: CardExportRequest):
+    t0 = time.perf_counter()
+    records = await asyncio.to_thread(_fetch_call_records, req.call_ids)
+    if not records:
+        raise HTTPException(status_code=404, detail="none of the requested calls were found")
+    found = {r[0] for r in records}
+    missing = [i for i in dict.fromkeys(req.call_ids) if i not in found]
+    logger.info("/api/cards/export: %d cards (%s, %d missing), lookup %.1f ms",
+                len(records), req.format, len(missing), (time.perf_counter() - t0) * 1000)
+    cards = _cards(records, min(req.top_n, 20), req.mode)
+    if req.format == "html":
+        return StreamingResponse(html_stream(cards, missing), media_type="text/html; charset=utf-8")
+    return StreamingResponse(
+        zip_stream(cards, missing),
+        media_type="application/zip",
+        headers={"Content-Disposition": 'attachment; filename="incidentkaarten.zip"'},
+    )
+
 # =============================================================================
 # MCP Agent (OpenAI compat: Responses first, then Chat Completions)
 # =============================================================================
@@ -399,6 +1179,7 @@ def _call_openai_with_compat(client, model: str, system_prompt: str, user_prompt
 
 @app.post("/mcp/query", response_model=MCPAnswer)
 async def mcp_query(payload: MCPChatQuery = Body(...)):
+    client = get_openai_client()
     if not client or not OPENAI_API_KEY:
         raise HTTPException(status_code=500, detail="OPENAI_API_KEY ontbreekt op de server.")
 
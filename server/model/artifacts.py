@@ -0,0 +1,58 @@
+# model/artifacts.py
+"""
+Publishing of model artifacts.
+
+A model is published by writing it to a temp file next to the target and
+os.replace()-ing it into place, so a reader (the scoring hot-reload
+watcher) never sees a half-written pickle.
+"""
+import hashlib
+import os
+import tempfile
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_MODEL_PATH = os.getenv("DANGER_MODEL_PATH", os.path.join(SERVER_DIR, "danger_score_model.pkl"))
+# NumPy export of the same model for the sklearn-free runtime (model/lite.py)
+DEFAULT_LITE_PATH = os.getenv("DANGER_LITE_MODEL_PATH", os.path.join(SERVER_DIR, "danger_score_model.npz"))
+
+
+def publish_model(obj: Any, path: str = DEFAULT_MODEL_PATH) -> str:
+    """Atomically write a model artifact; returns its version id."""
+    import joblib  # lazy: the lite (sklearn-free) runtime only reads artifacts
+
+    directory = os.path.dirname(os.path.abspath(path)) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", suffix=".pkl", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            joblib.dump(obj, fh)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return artifact_version(path)
+
+
+def artifact_stamp(path: str) -> Optional[tuple]:
+    """Cheap change marker (mtime, size, inode); None if the file is missing."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+def artifact_version(path: str) -> str:
+    """Version id: modification time + short content hash, e.g. 20250821T101500-1a2b3c4d."""
+    h = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(1 << 20), b""):
+            h.update(chunk)
+    mtime = datetime.fromtimestamp(os.path.getmtime(path), tz=timezone.utc)
+    return f"{mtime:%Y%m%dT%H%M%S}-{h.hexdigest()[:8]}"
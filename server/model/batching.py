@@ -0,0 +1,131 @@
+# model/batching.py
+"""
+In-process micro-batcher: concurrent requests are collected for a short
+window (or until max_batch_size) and handed to one vectorized call.
+Results are fanned back out to the waiting callers.
+"""
+import asyncio
+import threading
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+# Upper bounds of the batch-size histogram buckets
+_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+
+class MicroBatcher:
+    def __init__(
+        self,
+        batch_fn: Callable[[Sequence[Any]], List[Any]],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+    ):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be >= 1")
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max(0.0, max_wait_ms)
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+        self._batches = 0
+        self._items = 0
+        self._max_seen = 0
+        self._errors = 0
+        self._histogram = {str(b): 0 for b in _BUCKETS}
+        self._histogram[f">{_BUCKETS[-1]}"] = 0
+
+    async def submit(self, item: Any) -> Any:
+        """Queue one item and wait for its result from the next batch."""
+        self._ensure_worker()
+        fut = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, fut))
+        return await fut
+
+    async def stop(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+        self._worker = None
+        self._queue = None
+        self._loop = None
+
+    def _ensure_worker(self):
+        loop = asyncio.get_running_loop()
+        # (Re)start per event loop; the queue and task are bound to it
+        if self._worker is None or self._worker.done() or self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+
+    async def _collect(self) -> List[Tuple[Any, asyncio.Future]]:
+        batch = [await self._queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_wait_ms / 1000.0
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                # Window closed: still take whatever is already waiting
+                while len(batch) < self.max_batch_size and not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            items = [item for item, _ in batch]
+            try:
+                results = await asyncio.to_thread(self.batch_fn, items)
+                if len(results) != len(items):
+                    raise RuntimeError(f"batch_fn returned {len(results)} results for {len(items)} items")
+            except Exception as e:
+                self._record(len(items), failed=True)
+                for _, fut in batch:
+                    if not fut.done():
+                        fut.set_exception(e)
+                continue
+            self._record(len(items))
+            for (_, fut), res in zip(batch, results):
+                if fut.done():
+                    continue
+                # batch_fn may report per-item failures as exception instances
+                if isinstance(res, BaseException):
+                    fut.set_exception(res)
+                else:
+                    fut.set_result(res)
+
+    def _record(self, size: int, failed: bool = False):
+        with self._lock:
+            self._batches += 1
+            self._items += size
+            self._max_seen = max(self._max_seen, size)
+            if failed:
+                self._errors += 1
+            for b in _BUCKETS:
+                if size <= b:
+                    self._histogram[str(b)] += 1
+                    break
+            else:
+                self._histogram[f">{_BUCKETS[-1]}"] += 1
+
+    def metrics(self) -> Dict[str, Any]:
+        """Batch-size distribution (histogram keys are bucket upper bounds)."""
+        with self._lock:
+            return {
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait_ms,
+                "batches": self._batches,
+                "items": self._items,
+                "errors": self._errors,
+                "mean_batch_size": round(self._items / self._batches, 3) if self._batches else 0.0,
+                "max_seen_batch_size": self._max_seen,
+                "batch_size_histogram": dict(self._histogram),
+            }
@@ -0,0 +1,104 @@
+# model/cache.py
+"""
+Content-addressed result cache for the ML endpoints.
+
+Keys are a hash of the lower-cased transcript plus the endpoint namespace,
+its parameters and the active model version. Whitespace is kept: phrase
+and bigram matching in the cached analyses depends on it. Entries are bounded (LRU)
+and expire after a TTL; a model version change drops everything.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+
+def normalize_transcript(text: str) -> str:
+    """Case-insensitive form; all ML endpoints lower-case anyway."""
+    return text.lower()
+
+
+def transcript_hash(text: str) -> str:
+    return normalized_hash(normalize_transcript(text))
+
+
+def normalized_hash(normalized: str) -> str:
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    def __init__(self, max_entries: int = 2048, ttl_s: float = 900.0):
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_s = float(ttl_s)
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._version: Optional[str] = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def make_key(namespace: str, transcript: str, version: Optional[str], *params,
+                 digest: Optional[str] = None) -> str:
+        """digest: precomputed transcript_hash (e.g. TranscriptDoc.hash)."""
+        suffix = "|".join(str(p) for p in params)
+        return f"{namespace}:{version or '-'}:{digest or transcript_hash(transcript)}:{suffix}"
+
+    def observe_version(self, version: Optional[str]):
+        """Drop all entries when the active model version changes."""
+        with self._lock:
+            if version == self._version:
+                return
+            if self._data:
+                self.invalidations += 1
+            self._data.clear()
+            self._version = version
+
+    def get(self, key: str) -> Any:
+        """Cached value or None on a miss."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at < now:
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: str, value: Any):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl_s, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "max_entries": self.max_entries,
+                "ttl_s": self.ttl_s,
+                "model_version": self._version,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
@@ -0,0 +1,332 @@
+# model/dedup.py
+"""
+Near-duplicate detection of call transcripts (MinHash + LSH).
+
+Each transcript is normalized (lower case, accents stripped), split into
+word 3-gram shingles and summarized by a MinHash signature of NUM_PERM
+values; the share of equal values estimates the Jaccard similarity of
+two shingle sets. LSH splits the signature into BANDS bands: records
+that agree on a whole band are candidates, and a candidate is a near
+duplicate when its estimated similarity is at least DEDUP_THRESHOLD.
+
+- At ingest (seed scripts) MinHashIndex.find() checks a new transcript
+  against the indexed records before it is inserted.
+- Before training, training_duplicates() returns the labelled records
+  that repeat an earlier one; every trainer (train_pipeline, model.training,
+  model.online) keeps only the first of each group, so
+  repeated seed data neither skews the fit nor leaks across the
+  train/validation split.
+
+Signatures are computed once per CallRecord and kept in DEDUP_INDEX_PATH
+(ids + signatures, appended for ids above the stored watermark), together
+with a sorted per-band LSH index over the labelled records. The online
+trainer queries that index for its new records only (duplicates_after()).
+
+Run (vanuit server/):
+    python -m model.dedup               # rapport van bijna-duplicaten
+    python -m model.dedup --show 20 --threshold 0.7
+"""
+import os
+import re
+import tempfile
+import unicodedata
+import zlib
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from model.extract import TRAIN_CHUNK_SIZE, iter_chunks
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEDUP_INDEX_PATH = os.getenv("DEDUP_INDEX_PATH", os.path.join(SERVER_DIR, "dedup_index.npz"))
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.8"))
+# Trainers (train_pipeline, model.training, model.online) leave near duplicates out
+DEDUP_TRAINING = os.getenv("DEDUP_TRAINING", "1") != "0"
+NUM_PERM = 128
+BANDS = 16                  # 16 bands x 8 rows: candidates from a similarity of ~0.7
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 3            # words per shingle
+SEED = 1
+
+_PRIME = np.uint64(4294967291)          # largest prime below 2**32
+_rng = np.random.default_rng(SEED)
+# a*x + b stays below 2**64 for 32-bit x, so uint64 arithmetic is exact
+_A = _rng.integers(1, int(_PRIME), NUM_PERM, dtype=np.uint64)[:, None]
+_B = _rng.integers(0, int(_PRIME), NUM_PERM, dtype=np.uint64)[:, None]
+_EMPTY = np.full(NUM_PERM, np.iinfo(np.uint32).max, dtype=np.uint32)
+_BAND_MIX = _rng.integers(1, 2 ** 63, ROWS, dtype=np.uint64) | np.uint64(1)   # odd multipliers
+STORE_FORMAT = 2            # ids/signatures + labelled flags + LSH band index
+CONFIG = np.array([NUM_PERM, BANDS, SHINGLE_SIZE, SEED, STORE_FORMAT], dtype=np.int64)
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def shingles(text: str) -> np.ndarray:
+    """CRC32 hashes of the word SHINGLE_SIZE-grams of the normalized text."""
+    text = unicodedata.normalize("NFKD", (text or "").lower())
+    words = _WORD_RE.findall("".join(c for c in text if not unicodedata.combining(c)))
+    if not words:
+        return np.empty(0, dtype=np.uint64)
+    k = min(SHINGLE_SIZE, len(words))
+    grams = {" ".join(words[i:i + k]) for i in range(len(words) - k + 1)}
+    return np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.uint64, count=len(grams))
+
+
+def signature(text: str) -> np.ndarray:
+    """MinHash signature (NUM_PERM uint32 values)."""
+    h = shingles(text)
+    if h.size == 0:
+        return _EMPTY.copy()
+    return ((_A * h[None, :] + _B) % _PRIME).min(axis=1).astype(np.uint32)
+
+
+def signatures(texts: Iterable[str]) -> np.ndarray:
+    sigs = [signature(t) for t in texts]
+    return np.vstack(sigs) if sigs else np.empty((0, NUM_PERM), dtype=np.uint32)
+
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+    return float(np.mean(a == b))
+
+
+# =============================================================================
+# Ingest: in-memory LSH index
+# =============================================================================
+class MinHashIndex:
+    """LSH buckets over signatures; keys are CallRecord ids (or any hashable)."""
+
+    def __init__(self, threshold: float = DEDUP_THRESHOLD):
+        self.threshold = threshold
+        self._sigs: Dict[object, np.ndarray] = {}
+        self._buckets: List[Dict[bytes, List[object]]] = [{} for _ in range(BANDS)]
+
+    def __len__(self) -> int:
+        return len(self._sigs)
+
+    def add(self, key, sig: np.ndarray):
+        self._sigs[key] = sig
+        for band, bucket in enumerate(self._buckets):
+            bucket.setdefault(sig[band * ROWS:(band + 1) * ROWS].tobytes(), []).append(key)
+
+    def query(self, sig: np.ndarray) -> List[Tuple[object, float]]:
+        """Indexed keys with similarity >= threshold, most similar first."""
+        candidates = set()
+        for band, bucket in enumerate(self._buckets):
+            candidates.update(bucket.get(sig[band * ROWS:(band + 1) * ROWS].tobytes(), ()))
+        hits = [(key, similarity(sig, self._sigs[key])) for key in candidates]
+        return sorted((h for h in hits if h[1] >= self.threshold), key=lambda h: h[1], reverse=True)
+
+    def find(self, text: str) -> Optional[Tuple[object, float]]:
+        """(key, similarity) of the closest near duplicate of text, or None."""
+        hits = self.query(signature(text))
+        return hits[0] if hits else None
+
+
+# =============================================================================
+# Persisted signatures per CallRecord
+# =============================================================================
+# Besides ids + signatures the file holds an LSH index over the labelled
+# records: per band the band keys in sorted order (band_keys) and the row
+# each key belongs to (band_rows; ascending within equal keys, so the first
+# row of a run is the earliest labelled record with that band).
+def _empty_store() -> Dict[str, np.ndarray]:
+    return {
+        "ids": np.empty(0, dtype=np.int64),
+        "signatures": np.empty((0, NUM_PERM), dtype=np.uint32),
+        "labelled": np.empty(0, dtype=bool),
+        "band_keys": np.empty((BANDS, 0), dtype=np.uint64),
+        "band_rows": np.empty((BANDS, 0), dtype=np.int64),
+    }
+
+
+def _band_keys(sigs: np.ndarray) -> np.ndarray:
+    """(n, BANDS) 64-bit key per band (collisions only add candidates)."""
+    blocks = sigs.reshape(len(sigs), BANDS, ROWS).astype(np.uint64)
+    return (blocks * _BAND_MIX).sum(axis=2, dtype=np.uint64)
+
+
+def _load_store(path: str) -> Dict[str, np.ndarray]:
+    if os.path.exists(path):
+        with np.load(path) as data:
+            if "config" in data and np.array_equal(data["config"], CONFIG):
+                return {name: data[name] for name in _empty_store()}
+    return _empty_store()
+
+
+def _update_store(path: str, chunk_size: int) -> Tuple[Dict[str, np.ndarray], int]:
+    """Add records above the watermark; returns (store, first new row)."""
+    store = _load_store(path)
+    ids = store["ids"]
+    first_new = len(ids)
+    new_ids, new_sigs, new_labelled = [], [], []
+    after_id = int(ids[-1]) if ids.size else 0
+    for chunk in iter_chunks(("id", "transcript", "danger_score"), chunk_size, after_id=after_id,
+                             labelled=False):
+        new_ids.extend(record_id for record_id, _, _ in chunk)
+        new_sigs.append(signatures(text for _, text, _ in chunk))
+        # same rule as iter_chunks(labelled=True): a score and a non-blank transcript
+        new_labelled.extend(score is not None and bool((text or "").strip(" ")) for _, text, score in chunk)
+    if not new_ids:
+        return store, first_new
+
+    sigs = np.vstack(new_sigs)
+    labelled = np.asarray(new_labelled, dtype=bool)
+    rows = np.flatnonzero(labelled) + first_new
+    keys = _band_keys(sigs[labelled])
+    band_keys, band_rows = [], []
+    for band in range(BANDS):
+        order = np.argsort(keys[:, band], kind="stable")
+        k, r = keys[order, band], rows[order]
+        # new rows come after every stored row, so they go after equal keys
+        at = np.searchsorted(store["band_keys"][band], k, side="right")
+        band_keys.append(np.insert(store["band_keys"][band], at, k))
+        band_rows.append(np.insert(store["band_rows"][band], at, r))
+    store = {
+        "ids": np.concatenate([ids, np.asarray(new_ids, dtype=np.int64)]),
+        "signatures": np.vstack([store["signatures"], sigs]),
+        "labelled": np.concatenate([store["labelled"], labelled]),
+        "band_keys": np.vstack(band_keys),
+        "band_rows": np.vstack(band_rows),
+    }
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", suffix=".npz", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            np.savez(fh, config=CONFIG, **store)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return store, first_new
+
+
+def load_signatures(path: str = DEDUP_INDEX_PATH) -> Tuple[np.ndarray, np.ndarray]:
+    """(ids ascending, signatures); empty when missing or built with other settings."""
+    store = _load_store(path)
+    return store["ids"], store["signatures"]
+
+
+def update_signatures(path: str = DEDUP_INDEX_PATH,
+                      chunk_size: int = TRAIN_CHUNK_SIZE) -> Tuple[np.ndarray, np.ndarray]:
+    """Add the signatures of records above the watermark; returns all (ids, signatures)."""
+    store, _ = _update_store(path, chunk_size)
+    return store["ids"], store["signatures"]
+
+
+def duplicates_after(after_id: int, threshold: float = DEDUP_THRESHOLD, path: str = DEDUP_INDEX_PATH,
+                     chunk_size: int = TRAIN_CHUNK_SIZE) -> Dict[int, int]:
+    """
+    {duplicate id: earlier id} for the labelled records with an id above
+    after_id, looked up in the persisted LSH index: signatures are only
+    computed for records not stored yet, and each record is compared with
+    the earliest labelled record sharing one of its bands (as in
+    near_duplicates), so the cost grows with the new records only.
+    Labels are taken as they were when a record was first indexed.
+    """
+    store, _ = _update_store(path, chunk_size)
+    ids, sigs = store["ids"], store["signatures"]
+    start = int(np.searchsorted(ids, after_id, side="right"))
+    rows = np.flatnonzero(store["labelled"][start:]) + start
+    if rows.size == 0:
+        return {}
+    keys = _band_keys(sigs[rows])
+    dup_of = np.full(len(rows), -1, dtype=np.int64)
+    for band in range(BANDS):
+        band_keys = store["band_keys"][band]
+        first = store["band_rows"][band][np.searchsorted(band_keys, keys[:, band], side="left")]
+        cand = np.flatnonzero((first < rows) & (dup_of < 0))
+        if cand.size == 0:
+            continue
+        sim = (sigs[rows[cand]] == sigs[first[cand]]).mean(axis=1)
+        hit = cand[sim >= threshold]
+        dup_of[hit] = first[hit]
+    dups = np.flatnonzero(dup_of >= 0)
+    return {int(ids[rows[i]]): int(ids[dup_of[i]]) for i in dups}
+
+
+def index_from_db(threshold: float = DEDUP_THRESHOLD, path: str = DEDUP_INDEX_PATH) -> MinHashIndex:
+    """MinHashIndex over every CallRecord (signatures updated first)."""
+    index = MinHashIndex(threshold)
+    for record_id, sig in zip(*update_signatures(path)):
+        index.add(int(record_id), sig)
+    return index
+
+
+# =============================================================================
+# Before training: vectorized duplicate detection
+# =============================================================================
+def near_duplicates(ids: np.ndarray, sigs: np.ndarray,
+                    threshold: float = DEDUP_THRESHOLD) -> Dict[int, int]:
+    """
+    {duplicate id: earlier id it repeats} for ids in ascending order.
+    Per band, rows with the same band values are grouped (np.unique) and
+    compared with the first row of their group.
+    """
+    n = len(ids)
+    dup_of = np.full(n, -1, dtype=np.int64)
+    rows = np.arange(n)
+    for band in range(BANDS):
+        block = np.ascontiguousarray(sigs[:, band * ROWS:(band + 1) * ROWS])
+        keys = block.view(np.dtype((np.void, block.dtype.itemsize * ROWS))).ravel()
+        _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        rep = first[inverse.ravel()]
+        cand = np.flatnonzero((rep != rows) & (dup_of < 0))
+        if cand.size == 0:
+            continue
+        sim = (sigs[cand] == sigs[rep[cand]]).mean(axis=1)
+        hit = cand[sim >= threshold]
+        dup_of[hit] = rep[hit]
+    dups = np.flatnonzero(dup_of >= 0)
+    return {int(ids[i]): int(ids[dup_of[i]]) for i in dups}
+
+
+def duplicate_ids(ids: Optional[Sequence[int]] = None, threshold: float = DEDUP_THRESHOLD,
+                  path: str = DEDUP_INDEX_PATH) -> Dict[int, int]:
+    """
+    near_duplicates() over the stored signatures (updated first), limited to
+    ids when given (e.g. the labelled records of a training run).
+    """
+    all_ids, sigs = update_signatures(path)
+    if ids is not None:
+        keep = np.isin(all_ids, np.asarray(list(ids), dtype=np.int64))
+        all_ids, sigs = all_ids[keep], sigs[keep]
+    return near_duplicates(all_ids, sigs, threshold)
+
+
+def training_duplicates(chunk_size: int = TRAIN_CHUNK_SIZE) -> Dict[int, int]:
+    """duplicate_ids() over the labelled records, i.e. the ones a trainer sees."""
+    ids = [record_id for chunk in iter_chunks(("id",), chunk_size) for record_id, in chunk]
+    return duplicate_ids(ids)
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Rapport van bijna-dubbele transcripts (MinHash/LSH).")
+    parser.add_argument("--threshold", type=float, default=DEDUP_THRESHOLD)
+    parser.add_argument("--show", type=int, default=10, help="aantal voorbeelden")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    dups = duplicate_ids(threshold=args.threshold)
+    ids, _ = load_signatures()
+    print(f"🔁 {len(dups)} van {len(ids)} records zijn bijna-duplicaten "
+          f"(Jaccard ≥ {args.threshold}) — {time.perf_counter() - t0:.1f} s")
+    if dups and args.show:
+        from model.db import SessionLocal
+        from model.models import CallRecord
+
+        sample = list(dups.items())[:args.show]
+        wanted = {i for pair in sample for i in pair}
+        session = SessionLocal()
+        try:
+            texts = dict(session.query(CallRecord.id, CallRecord.transcript).filter(CallRecord.id.in_(wanted)))
+        finally:
+            session.close()
+        for dup, orig in sample:
+            print(f"  #{dup} ≈ #{orig}: {texts.get(dup, '')[:70]!r}")
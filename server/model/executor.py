@@ -0,0 +1,111 @@
+# model/executor.py
+"""
+Cost-routed execution of CPU-bound analysis work.
+
+Tokenizing, regex work and perturbation scoring hold the GIL, so a thread
+pool keeps one uvicorn worker on one core. With backend="process", heavy
+tasks (perturbation sensitivity) go to a process pool whose children
+pre-load the danger model; light tasks stay on asyncio.to_thread. If the
+pool breaks, work falls back to threads.
+"""
+import asyncio
+import importlib
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger("model.executor")
+
+HEAVY = "heavy"
+LIGHT = "light"
+
+
+def _init_worker(reload_interval_s: float):
+    """Pool child: load the model + analysis modules once, keep hot reload."""
+    from model import scoring
+
+    for module in ("analysis.analyzer", "analysis.emotions"):   # pay their import cost up front
+        importlib.import_module(module)
+
+    scoring.start_model_watcher(reload_interval_s)
+    if scoring.get_active_model() is not None:
+        scoring.score_transcript(scoring.WARMUP_TRANSCRIPT)
+
+
+def _ping(_: int = 0) -> int:
+    return os.getpid()
+
+
+class CpuExecutor:
+    def __init__(self, backend: str = "thread", workers: Optional[int] = None,
+                 reload_interval_s: float = 5.0, start_method: str = "spawn"):
+        if backend not in ("thread", "process"):
+            raise ValueError(f"Unknown executor backend: {backend!r}")
+        self.backend = backend
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.reload_interval_s = reload_interval_s
+        self.start_method = start_method
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._counts = {"process": 0, "thread": 0, "fallback": 0, "errors": 0}
+
+    def start(self):
+        """Create the process pool and spawn + warm up every child."""
+        if self.backend != "process" or self._pool is not None:
+            return
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context(self.start_method),
+            initializer=_init_worker,
+            initargs=(self.reload_interval_s,),
+        )
+        try:
+            pids = set(self._pool.map(_ping, range(self.workers * 2)))
+        except Exception as e:
+            logger.error("Process pool failed to start, using threads: %s", e)
+            self._bump("fallback")
+            self.shutdown()
+            return
+        logger.info("Process pool ready: %d workers (%s)", len(pids), self.start_method)
+
+    def shutdown(self):
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _bump(self, key: str):
+        with self._lock:
+            self._counts[key] += 1
+
+    async def run(self, fn: Callable, *args, cost: str = LIGHT) -> Any:
+        """Run fn(*args) off the event loop; heavy work goes to the process pool."""
+        pool = self._pool
+        try:
+            if cost == HEAVY and pool is not None:
+                try:
+                    result = await asyncio.get_running_loop().run_in_executor(pool, fn, *args)
+                    self._bump("process")
+                    return result
+                except BrokenProcessPool as e:
+                    logger.error("Process pool broken, falling back to threads: %s", e)
+                    self._bump("fallback")
+                    self.shutdown()
+            result = await asyncio.to_thread(fn, *args)
+            self._bump("thread")
+            return result
+        except Exception:
+            self._bump("errors")
+            raise
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "backend": self.backend,
+                "process_pool_active": self._pool is not None,
+                "workers": self.workers if self.backend == "process" else None,
+                "tasks": dict(self._counts),
+            }
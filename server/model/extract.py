@@ -0,0 +1,80 @@
+# model/extract.py
+"""
+Streaming extraction of training data from the call log.
+
+Selects only the requested CallRecord columns (no ORM objects) and reads
+them with a server-side cursor in chunks of `chunk_size` rows
+(yield_per), so no step holds the whole table: trainers feed the rows to
+the vectorizer through a generator and memory for raw rows is bounded by
+the chunk size.
+"""
+import os
+from array import array
+from typing import Iterable, Iterator, List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import func, select
+
+from model.db import SessionLocal
+from model.models import CallRecord
+
+TRAIN_CHUNK_SIZE = int(os.getenv("TRAIN_CHUNK_SIZE", "5000"))
+# Deterministic train/validation split in SQL: every VAL_EVERY-th id is validation
+VAL_EVERY = 5
+
+
+def is_validation():
+    return CallRecord.id % VAL_EVERY == 0
+
+
+def is_training():
+    return CallRecord.id % VAL_EVERY != 0
+
+
+def iter_chunks(columns: Sequence[str] = ("transcript", "danger_score"),
+                chunk_size: int = TRAIN_CHUNK_SIZE, after_id: Optional[int] = None,
+                where: Iterable = (), labelled: bool = True) -> Iterator[List[tuple]]:
+    """
+    Row tuples of `columns`, chunk_size rows per chunk. labelled: only rows with a
+    danger_score and a non-blank transcript. after_id: only newer rows, in id order.
+    """
+    stmt = select(*(getattr(CallRecord, c) for c in columns))
+    if labelled:
+        stmt = stmt.where(CallRecord.danger_score.isnot(None),
+                          func.length(func.trim(CallRecord.transcript)) > 0)
+    if after_id is not None:
+        stmt = stmt.where(CallRecord.id > after_id).order_by(CallRecord.id)
+    for clause in where:
+        stmt = stmt.where(clause)
+
+    session = SessionLocal()
+    try:
+        result = session.execute(stmt.execution_options(yield_per=chunk_size))
+        for part in result.partitions():
+            yield [tuple(row) for row in part]
+    finally:
+        session.close()
+
+
+class LabelledStream:
+    """
+    Iterable of transcripts for vectorizer.fit_transform(); each row's label
+    (clipped to [0, 1]) is collected alongside, so .labels() lines up with
+    the rows of the resulting matrix. Iterate once.
+    """
+
+    def __init__(self, chunks: Iterable[List[tuple]]):
+        self._chunks = chunks
+        self._y = array("d")
+
+    def __iter__(self) -> Iterator[str]:
+        for chunk in self._chunks:
+            for text, score, *_ in chunk:
+                self._y.append(min(max(float(score), 0.0), 1.0))
+                yield text
+
+    def __len__(self) -> int:
+        return len(self._y)
+
+    def labels(self) -> np.ndarray:
+        return np.frombuffer(self._y, dtype=np.float64)
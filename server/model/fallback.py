@@ -1,21 +1,13 @@
-def danger_score(transcript: str) -> float:
+from analysis.lexicon import FALLBACK_FORMS, FALLBACK_WEIGHTS, lexicon_hits
+
+
+def danger_score(transcript) -> float:
     """
     Heuristic fallback danger score based on keyword weights.
+    Used when the ML model is unavailable or misses its deadline, so it
+    covers the Dutch terms of live 112 calls as well as the English ones.
+    transcript: str or TranscriptDoc.
     """
-    score = 0
-    features = {
-        'knife': 0.2,
-        'cutting herself': 0.2,
-        'stab': 0.2,
-        'flee': 0.15,
-        'run': 0.1,
-        'police': 0.05,
-        'abused': 0.05,
-        'crazy': 0.05,
-        'dangerous': 0.05
-    }
-    transcript_lower = transcript.lower()
-    for keyword, weight in features.items():
-        if keyword in transcript_lower:
-            score += weight
+    present = {FALLBACK_FORMS[form] for form in lexicon_hits(transcript)["fallback"]}
+    score = sum(weight for keyword, weight in FALLBACK_WEIGHTS.items() if keyword in present)
     return min(score, 1.0)
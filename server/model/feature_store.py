@@ -0,0 +1,386 @@
+# model/feature_store.py
+"""
+Persistent n-gram count store for the call corpus.
+
+Transcripts never change once recorded, yet every retrain re-tokenized
+all of them. The store tokenizes each CallRecord once (with the
+train_pipeline analyzer: Dutch stop words, unicode accents stripped,
+1-2-grams) and keeps its raw term counts as CSR rows keyed by
+CallRecord.id. New records are appended as new shards (update() only
+reads ids above the watermark), so text processing per retrain is
+proportional to the new records.
+
+Layout of FEATURE_STORE_DIR:
+    meta.json                 config, watermark, shard list (written last, atomically)
+    shard-000001/ids.npy      CallRecord ids (ascending)
+                 indptr.npy   CSR arrays of the raw counts
+                 indices.npy  (column = global term id)
+                 data.npy
+                 terms.txt    terms first seen in this shard, in id order
+
+Shards are uncompressed .npy so they are memory-mapped on load; a shard
+directory is complete before meta.json lists it. The vocabulary is
+append-only: a term keeps its column for the life of the store, and the
+global vocabulary is the concatenation of the shards' terms.txt.
+
+fit_tfidf() turns the counts of any set of ids into exactly what
+TfidfVectorizer(...).fit_transform() would produce on those transcripts
+(same vocabulary order, max_features/min_df pruning and idf), including
+a fitted, picklable TfidfVectorizer for serving.
+
+Run (vanuit server/):
+    python -m model.feature_store            # nieuwe records toevoegen
+    python -m model.feature_store --rebuild  # opnieuw opbouwen
+    python -m model.feature_store --status
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from model.extract import TRAIN_CHUNK_SIZE, iter_chunks
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FEATURE_STORE_DIR = os.getenv("FEATURE_STORE_DIR", os.path.join(SERVER_DIR, "feature_store"))
+# Merge all shards into one once there are more than this many
+MAX_SHARDS = int(os.getenv("FEATURE_STORE_MAX_SHARDS", "64"))
+META_NAME = "meta.json"
+IntArray = Union[Sequence[int], np.ndarray]
+
+# Analyzer settings of train_pipeline._build_pipeline (tokenization only)
+ANALYZER_DEFAULTS = {"ngram_range": (1, 2), "lowercase": True, "strip_accents": "unicode"}
+
+
+def kept_columns(X_counts, max_features: Optional[int], min_df: int) -> np.ndarray:
+    """
+    Columns TfidfVectorizer keeps after pruning (same rule as
+    CountVectorizer._limit_features); columns must be in sorted-term order.
+    """
+    dfs = np.bincount(X_counts.indices, minlength=X_counts.shape[1])
+    mask = dfs >= min_df
+    if max_features is not None and mask.sum() > max_features:
+        tfs = np.asarray(X_counts.sum(axis=0)).ravel()
+        keep = np.zeros(len(dfs), dtype=bool)
+        keep[np.where(mask)[0][(-tfs[mask]).argsort()[:max_features]]] = True
+        mask = keep
+    return np.flatnonzero(mask)
+
+
+def _stop_words() -> List[str]:
+    from analysis.document import DUTCH_STOP_WORDS
+
+    return sorted(DUTCH_STOP_WORDS)
+
+
+def analyzer_config(vectorizer=None) -> Dict[str, Any]:
+    """The tokenization settings of a (Tfidf/Count)Vectorizer, or the store defaults."""
+    if vectorizer is None:
+        params = dict(ANALYZER_DEFAULTS, stop_words=_stop_words())
+    else:
+        params = vectorizer.get_params()
+    stop = params.get("stop_words")
+    return {
+        "analyzer": params.get("analyzer", "word"),
+        "ngram_range": list(params["ngram_range"]),
+        "lowercase": bool(params["lowercase"]),
+        "strip_accents": params["strip_accents"],
+        "token_pattern": params.get("token_pattern", r"(?u)\b\w\w+\b"),
+        "stop_words": hashlib.sha256("\n".join(sorted(stop)).encode()).hexdigest()[:16]
+        if isinstance(stop, (list, set, frozenset, tuple)) else stop,
+    }
+
+
+class FeatureStore:
+    def __init__(self, directory: str = FEATURE_STORE_DIR):
+        self.directory = directory
+        self._meta: Optional[Dict[str, Any]] = None
+        self._terms: Optional[List[str]] = None
+        self._vocab: Optional[Dict[str, int]] = None
+
+    # ---- metadata ----------------------------------------------------------------
+    @property
+    def meta(self) -> Dict[str, Any]:
+        if self._meta is None:
+            path = os.path.join(self.directory, META_NAME)
+            if os.path.exists(path):
+                with open(path, "r", encoding="utf-8") as fh:
+                    self._meta = json.load(fh)
+            else:
+                self._meta = {"config": analyzer_config(), "watermark": 0, "n_rows": 0,
+                              "n_terms": 0, "shards": [], "next_shard": 1}
+        return self._meta
+
+    @property
+    def watermark(self) -> int:
+        return int(self.meta["watermark"])
+
+    def supports(self, vectorizer) -> bool:
+        """True when vectorizer tokenizes like the store (use its counts after update())."""
+        return analyzer_config(vectorizer) == analyzer_config()
+
+    def _write_meta(self, meta: Dict[str, Any]):
+        fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", suffix=".json", dir=self.directory)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as fh:
+                json.dump(meta, fh, indent=2)
+                fh.flush()
+                os.fsync(fh.fileno())
+            os.replace(tmp_path, os.path.join(self.directory, META_NAME))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self._meta = meta
+
+    def status(self) -> Dict[str, Any]:
+        meta = self.meta
+        return {"directory": self.directory, "watermark": meta["watermark"], "n_rows": meta["n_rows"],
+                "n_terms": meta["n_terms"], "n_shards": len(meta["shards"])}
+
+    # ---- vocabulary ------------------------------------------------------------
+    def terms(self) -> List[str]:
+        if self._terms is None:
+            terms: List[str] = []
+            for shard in self.meta["shards"]:
+                with open(os.path.join(self.directory, shard["name"], "terms.txt"), "r", encoding="utf-8") as fh:
+                    terms.extend(fh.read().splitlines())
+            if len(terms) != self.meta["n_terms"]:
+                raise RuntimeError(f"feature store vocabulary is inconsistent "
+                                   f"({len(terms)} terms, meta says {self.meta['n_terms']}); rebuild it")
+            self._terms = terms
+        return self._terms
+
+    def _vocabulary(self) -> Dict[str, int]:
+        if self._vocab is None:
+            self._vocab = {t: i for i, t in enumerate(self.terms())}
+        return self._vocab
+
+    # ---- writing ---------------------------------------------------------------
+    def _analyzer(self):
+        from sklearn.feature_extraction.text import CountVectorizer
+
+        cfg = self.meta["config"]
+        if cfg != analyzer_config():
+            raise ValueError("feature store was built with other analyzer settings; rebuild it")
+        return CountVectorizer(stop_words=_stop_words(), ngram_range=tuple(cfg["ngram_range"]),
+                               lowercase=cfg["lowercase"], strip_accents=cfg["strip_accents"]).build_analyzer()
+
+    def _write_shard(self, meta: Dict[str, Any], ids: IntArray, indptr: IntArray, indices: IntArray,
+                     data: IntArray, new_terms: List[str]) -> Dict[str, Any]:
+        """ids/indptr/indices/data: lists (update) or ndarrays (compact, saved without a copy)."""
+        name = f"shard-{meta['next_shard']:06d}"
+        final = os.path.join(self.directory, name)
+        staging = os.path.join(self.directory, f".staging-{name}")
+        for path in (staging, final):   # leftovers of an interrupted run (not in meta)
+            if os.path.exists(path):
+                shutil.rmtree(path)
+        os.makedirs(staging)
+        np.save(os.path.join(staging, "ids.npy"), np.asarray(ids, dtype=np.int64))
+        np.save(os.path.join(staging, "indptr.npy"), np.asarray(indptr, dtype=np.int64))
+        np.save(os.path.join(staging, "indices.npy"), np.asarray(indices, dtype=np.int32))
+        np.save(os.path.join(staging, "data.npy"), np.asarray(data, dtype=np.int32))
+        with open(os.path.join(staging, "terms.txt"), "w", encoding="utf-8") as fh:
+            fh.write("".join(f"{t}\n" for t in new_terms))
+        os.replace(staging, final)
+        meta["next_shard"] += 1
+        return {"name": name, "n_rows": len(ids), "min_id": int(ids[0]), "max_id": int(ids[-1]),
+                "n_terms": len(new_terms)}
+
+    def update(self, chunk_size: int = TRAIN_CHUNK_SIZE) -> Dict[str, Any]:
+        """
+        Tokenize and append the records with an id above the watermark (one
+        shard per chunk). A store built with other analyzer settings is rebuilt.
+        """
+        if self.meta["shards"] and self.meta["config"] != analyzer_config():
+            return self.rebuild(chunk_size)
+        t0 = time.perf_counter()
+        os.makedirs(self.directory, exist_ok=True)
+        meta = json.loads(json.dumps(self.meta))
+        analyze = self._analyzer()
+        vocab = self._vocabulary()
+        terms = self.terms()
+        try:
+            n_new = self._append(meta, analyze, vocab, terms, chunk_size)
+        except BaseException:
+            # The in-memory vocabulary may hold terms of an unwritten shard
+            self._meta = self._terms = self._vocab = None
+            raise
+        if len(meta["shards"]) > MAX_SHARDS:
+            self.compact()
+        return {"new_records": n_new, **self.status(), "ms": round((time.perf_counter() - t0) * 1000, 1)}
+
+    def _append(self, meta: Dict[str, Any], analyze, vocab: Dict[str, int], terms: List[str],
+                chunk_size: int) -> int:
+        n_new = 0
+        for chunk in iter_chunks(("id", "transcript"), chunk_size, after_id=meta["watermark"], labelled=False):
+            ids, indptr, indices, data, new_terms = [], [0], [], [], []
+            for record_id, text in chunk:
+                counts: Counter = Counter()
+                for term in analyze(text or ""):
+                    col = vocab.get(term)
+                    if col is None:
+                        col = vocab[term] = len(vocab)
+                        new_terms.append(term)
+                    counts[col] += 1
+                ids.append(record_id)
+                cols = sorted(counts)
+                indices.extend(cols)
+                data.extend(counts[c] for c in cols)
+                indptr.append(len(indices))
+            meta["shards"].append(self._write_shard(meta, ids, indptr, indices, data, new_terms))
+            terms.extend(new_terms)
+            meta.update(watermark=int(ids[-1]), n_rows=meta["n_rows"] + len(ids), n_terms=len(terms))
+            self._write_meta(meta)
+            n_new += len(ids)
+        return n_new
+
+    def compact(self):
+        """Merge all shards into one (same rows, same columns)."""
+        if len(self.meta["shards"]) <= 1:
+            return
+        import scipy.sparse as sp
+
+        ids, X = self.matrix()
+        meta = json.loads(json.dumps(self.meta))
+        old = [s["name"] for s in meta["shards"]]
+        X = sp.csr_matrix(X)
+        shard = self._write_shard(meta, ids, X.indptr, X.indices, X.data, self.terms())
+        meta["shards"] = [shard]
+        self._write_meta(meta)
+        for name in old:
+            shutil.rmtree(os.path.join(self.directory, name), ignore_errors=True)
+
+    def rebuild(self, chunk_size: int = TRAIN_CHUNK_SIZE) -> Dict[str, Any]:
+        """Drop all shards and tokenize every record again (e.g. after an analyzer change)."""
+        if os.path.isdir(self.directory):
+            shutil.rmtree(self.directory)
+        self._meta = self._terms = self._vocab = None
+        return self.update(chunk_size)
+
+    # ---- reading ---------------------------------------------------------------
+    def _shard(self, shard: Dict[str, Any], n_terms: int):
+        import scipy.sparse as sp
+
+        path = os.path.join(self.directory, shard["name"])
+        load = lambda name: np.load(os.path.join(path, name), mmap_mode="r")
+        X = sp.csr_matrix((load("data.npy"), load("indices.npy"), load("indptr.npy")),
+                          shape=(shard["n_rows"], n_terms), copy=False)
+        return load("ids.npy"), X
+
+    def matrix(self, ids: Optional[Iterable[int]] = None) -> Tuple[np.ndarray, Any]:
+        """
+        (ids, raw count CSR matrix with one column per term). ids: the rows to
+        return, in that order (KeyError for ids not in the store); None = all.
+        """
+        import scipy.sparse as sp
+
+        n_terms = self.meta["n_terms"]
+        parts = [self._shard(s, n_terms) for s in self.meta["shards"]]
+        if ids is None:
+            if not parts:
+                return np.empty(0, dtype=np.int64), sp.csr_matrix((0, n_terms), dtype=np.float64)
+            all_ids = np.concatenate([p[0] for p in parts])
+            return all_ids, sp.vstack([p[1] for p in parts], format="csr", dtype=np.float64)
+
+        wanted = np.asarray(list(ids), dtype=np.int64)
+        rows, found = [], np.zeros(len(wanted), dtype=bool)
+        order = np.empty(0, dtype=np.int64)
+        for shard_ids, X in parts:
+            pos = np.searchsorted(shard_ids, wanted)
+            hit = (pos < len(shard_ids)) & (shard_ids[np.minimum(pos, len(shard_ids) - 1)] == wanted)
+            if hit.any():
+                rows.append(X[pos[hit]])
+                order = np.concatenate([order, np.flatnonzero(hit)])
+                found |= hit
+        if not found.all():
+            raise KeyError(f"{int((~found).sum())} ids not in the feature store "
+                           f"(e.g. {int(wanted[~found][0])}); run update()")
+        if not rows:
+            return wanted, sp.csr_matrix((0, n_terms), dtype=np.float64)
+        X = sp.vstack(rows, format="csr", dtype=np.float64)
+        return wanted, X[np.argsort(order, kind="stable")]
+
+    def labels(self, where: Iterable = (), chunk_size: int = TRAIN_CHUNK_SIZE) -> Tuple[np.ndarray, np.ndarray]:
+        """(ids, danger_score clipped to [0, 1]) of the labelled records in the store."""
+        from array import array
+
+        from model.models import CallRecord
+
+        ids, y = array("q"), array("d")
+        for chunk in iter_chunks(("id", "danger_score"), chunk_size,
+                                 where=[CallRecord.id <= self.watermark, *where]):
+            for record_id, score in chunk:
+                ids.append(record_id)
+                y.append(min(max(float(score), 0.0), 1.0))
+        return np.frombuffer(ids, dtype=np.int64), np.frombuffer(y, dtype=np.float64)
+
+    # ---- TF-IDF ----------------------------------------------------------------
+    def fit_tfidf(self, vectorizer, ids: Sequence[int]):
+        """
+        Fit `vectorizer` (an unfitted TfidfVectorizer with the store's
+        tokenization) on the records `ids` from their stored counts; returns
+        X exactly as vectorizer.fit_transform(their transcripts) would.
+        """
+        from sklearn.feature_extraction.text import TfidfTransformer
+
+        if analyzer_config(vectorizer) != self.meta["config"]:
+            raise ValueError("vectorizer tokenization differs from the feature store")
+        params = vectorizer.get_params()
+        if params.get("vocabulary") is not None or params.get("max_df", 1.0) != 1.0:
+            raise ValueError("fit_tfidf supports max_features/min_df pruning only")
+
+        _, counts = self.matrix(ids)
+        present = np.flatnonzero(np.bincount(counts.indices, minlength=counts.shape[1]))
+        if present.size == 0:
+            raise ValueError("empty vocabulary; perhaps the documents only contain stop words")
+        # sklearn orders the vocabulary alphabetically before pruning
+        terms = np.asarray(self.terms(), dtype=object)
+        present = present[np.argsort(terms[present].astype(str), kind="stable")]
+        X = counts[:, present]
+        cols = kept_columns(X, params["max_features"], params["min_df"])
+        if cols.size == 0:
+            raise ValueError("After pruning, no terms remain. Try a lower min_df or a higher max_df.")
+        X = X[:, cols]
+
+        tfidf = TfidfTransformer(norm=params["norm"], use_idf=params["use_idf"],
+                                 smooth_idf=params["smooth_idf"], sublinear_tf=params["sublinear_tf"])
+        X = tfidf.fit_transform(X)
+        vectorizer.vocabulary_ = {str(t): i for i, t in enumerate(terms[present[cols]])}
+        vectorizer.fixed_vocabulary_ = False
+        vectorizer._tfidf = tfidf
+        return X
+
+    def transform(self, vectorizer, ids: Sequence[int]):
+        """vectorizer.transform(transcripts of ids) from the stored counts (after fit_tfidf)."""
+        columns = self._columns_for(vectorizer)
+        _, counts = self.matrix(ids)
+        return vectorizer._tfidf.transform(counts[:, columns])
+
+    def _columns_for(self, vectorizer) -> np.ndarray:
+        vocab = self._vocabulary()
+        terms = sorted(vectorizer.vocabulary_.items(), key=lambda kv: kv[1])
+        return np.array([vocab[t] for t, _ in terms], dtype=np.int64)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Feature store van n-gram tellingen per CallRecord.")
+    parser.add_argument("--rebuild", action="store_true", help="alle shards opnieuw opbouwen")
+    parser.add_argument("--status", action="store_true", help="toon watermark en omvang")
+    args = parser.parse_args()
+
+    store = FeatureStore()
+    if args.status:
+        print(store.status())
+    else:
+        result = store.rebuild() if args.rebuild else store.update()
+        print(f"✅ Feature store bijgewerkt: {result['new_records']} nieuwe records, "
+              f"{result['n_rows']} records, {result['n_terms']} termen in {result['n_shards']} shard(s), "
+              f"watermark {result['watermark']} ({result['ms']:.0f} ms)")
@@ -0,0 +1,140 @@
+# model/incremental.py
+"""
+Incremental danger scoring for live, growing transcripts.
+
+Speech-to-text appends text every few seconds. Instead of re-tokenizing
+and re-scoring the whole transcript, IncrementalScorer keeps per-call
+feature state (n-gram counts plus the running dot product and squared
+norm of the TF-IDF vector) and only analyzes the new chunk. For the
+linear TF-IDF model the score after each chunk is
+
+    intercept + Σ c_j·idf_j·coef_j / sqrt(Σ (c_j·idf_j)²)
+
+so each update costs O(len(chunk)). Non-linear models fall back to
+scoring the accumulated text.
+"""
+import math
+import re
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from model.lite import LiteModel
+from model.scoring import LoadedModel, get_active_model
+
+# Text after the last non-word character may be a word that continues in
+# the next chunk; it is held back until a boundary arrives.
+_LAST_BOUNDARY_RE = re.compile(r"\W(?=\w*$)")
+
+
+class IncrementalScorer:
+    def __init__(self):
+        self.text_parts: List[str] = []
+        self.chunks = 0
+        self._model: Optional[LoadedModel] = None
+        self._lite: Optional[LiteModel] = None
+        self._reset_state()
+
+    def _reset_state(self):
+        self._pending = ""
+        self._context: List[str] = []   # last (max_n - 1) tokens, for n-grams across chunks
+        self._counts: Dict[int, int] = {}
+        self._dot = 0.0
+        self._sq = 0.0
+        self.tokens = 0
+
+    @property
+    def mode(self) -> str:
+        return "incremental" if self._lite is not None else "full"
+
+    @property
+    def model_version(self) -> Optional[str]:
+        return self._model.version if self._model else None
+
+    def _bind_model(self) -> LoadedModel:
+        m = get_active_model()
+        if m is None:
+            raise RuntimeError("Model not loaded. Retrain using train_pipeline.py first.")
+        if m is not self._model:
+            # New call or hot-swapped model: rebuild the state once from the full text
+            self._model = m
+            self._lite = m.linear_view()
+            self._reset_state()
+            if self._lite is not None and self.text_parts:
+                self._consume("".join(self.text_parts))
+        return m
+
+    def _terms(self, tokens: List[str]) -> List[str]:
+        """N-grams over context + tokens that include at least one new token."""
+        min_n, max_n = self._lite.ngram_range
+        combined = self._context + tokens
+        start = len(self._context)
+        terms: List[str] = []
+        for n in range(min_n, max_n + 1):
+            first = max(0, start - n + 1)
+            terms.extend(" ".join(combined[i:i + n]) for i in range(first, len(combined) - n + 1))
+        return terms
+
+    def _apply(self, terms: List[str], sign: int = 1):
+        vocab, idf, coef = self._lite.vocabulary, self._lite.idf, self._lite.coef
+        for term in terms:
+            j = vocab.get(term)
+            if j is None:
+                continue
+            c = self._counts.get(j, 0)
+            # (c ± 1)² - c² = ±(2c ± 1)
+            self._sq += idf[j] * idf[j] * (2 * c + 1 if sign > 0 else -(2 * c - 1))
+            self._dot += sign * idf[j] * coef[j]
+            if c + sign:
+                self._counts[j] = c + sign
+            else:
+                del self._counts[j]
+
+    def _consume(self, chunk: str):
+        text = self._pending + chunk
+        m = _LAST_BOUNDARY_RE.search(text)
+        if m is None:
+            self._pending = text
+            return
+        ready, self._pending = text[:m.end()], text[m.end():]
+        tokens = self._lite.tokenize(ready)
+        if not tokens:
+            return
+        self.tokens += len(tokens)
+        self._apply(self._terms(tokens))
+        max_n = self._lite.ngram_range[1]
+        self._context = (self._context + tokens)[-(max_n - 1):] if max_n > 1 else []
+
+    def _score(self) -> float:
+        lite = self._lite
+        if lite.plain_l2:
+            return float(lite.output(lite.intercept + (self._dot / math.sqrt(self._sq) if self._sq > 0 else 0.0)))
+        # Other TF-IDF settings: re-weight the stored counts (still no re-tokenizing)
+        idx = np.fromiter(self._counts.keys(), dtype=np.int64, count=len(self._counts))
+        counts = np.fromiter(self._counts.values(), dtype=np.float64, count=len(self._counts))
+        return float(lite.output(float(np.dot(lite.weights(idx, counts), lite.coef[idx])) + lite.intercept))
+
+    def append(self, chunk: str) -> float:
+        """Add a transcript delta and return the updated (unrounded) score."""
+        m = self._bind_model()
+        self.text_parts.append(chunk)
+        self.chunks += 1
+        if self._lite is None:
+            return float(m.predict(["".join(self.text_parts)])[0])
+
+        self._consume(chunk)
+        if not self._pending:
+            return self._score()
+        # Score as if the held-back word were complete, then undo it
+        provisional = self._terms(self._lite.tokenize(self._pending))
+        self._apply(provisional)
+        score = self._score()
+        self._apply(provisional, sign=-1)
+        return score
+
+    def reset(self):
+        self.text_parts = []
+        self.chunks = 0
+        self._model = None
+        self._lite = None
+        self._reset_state()
@@ -0,0 +1,379 @@
+# model/jobs.py
+"""
+Background retraining jobs for the admin endpoints.
+
+A fit must never run on the serving process: it would hold the GIL (and
+the cores) for its whole duration. Jobs are queued here and executed one
+at a time by a dispatcher thread, each in a fresh spawned process with a
+lower CPU priority (RETRAIN_NICE) and single-threaded BLAS, so request
+handling keeps its cores. Memory of the fit is returned to the OS when
+the child exits.
+
+Only one retrain runs per host: besides the in-process queue, the child
+holds an exclusive file lock in the registry directory, which also
+serialises jobs submitted to different uvicorn workers. The trainers
+publish through model.artifacts / model.registry (temp file + os.replace),
+so the served model only changes once the new artifact is complete; the
+model watcher then hot-reloads it. Cancelling a running job terminates
+the child and leaves the current model in place.
+
+Job state (queue, history, logs) lives in the serving process only, so
+the admin endpoints need a single uvicorn worker: another worker does not
+know the job id and answers 404. The file lock merely keeps fits from
+separate processes (e.g. a CLI run) from overlapping.
+
+The child reports its progress (stage, fraction), log lines and result
+over a multiprocessing queue; subscribers (the SSE endpoint) receive the
+same events through an asyncio.Queue on their own event loop.
+"""
+import asyncio
+import io
+import logging
+import multiprocessing
+import os
+import sys
+import threading
+import time
+import traceback
+import uuid
+from collections import deque
+from contextlib import redirect_stdout
+from datetime import datetime, timezone
+from typing import Any, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger("model.jobs")
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RETRAIN_NICE = int(os.getenv("RETRAIN_NICE", "10"))
+RETRAIN_THREADS = os.getenv("RETRAIN_THREADS", "1")
+RETRAIN_HISTORY = int(os.getenv("RETRAIN_HISTORY", "50"))
+LOG_LINES = 200
+
+QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED = "queued", "running", "succeeded", "failed", "cancelled"
+TERMINAL = (SUCCEEDED, FAILED, CANCELLED)
+
+
+def _lock_path() -> str:
+    from model.registry import REGISTRY_DIR
+
+    os.makedirs(REGISTRY_DIR, exist_ok=True)
+    return os.path.join(REGISTRY_DIR, ".retrain.lock")
+
+
+# =============================================================================
+# Trainers (run in the child process)
+# =============================================================================
+def _train_pipeline(options: Dict[str, Any], progress: Callable[[str, float], None]) -> Dict[str, Any]:
+    # train_pipeline.py lives in the project root, next to server/
+    root = os.path.dirname(SERVER_DIR)
+    if root not in sys.path:
+        sys.path.append(root)
+    from train_pipeline import train_model_from_db
+
+    _, metrics = train_model_from_db(progress=progress)
+    return metrics
+
+
+def _train_forest(options: Dict[str, Any], progress: Callable[[str, float], None]) -> Dict[str, Any]:
+    from model.training import retrain_model_from_db
+
+    progress("fit", 0.1)
+    version = retrain_model_from_db()
+    if version is None:
+        raise ValueError("No call records found in DB.")
+    return {"registry_version": version}
+
+
+def _train_online(options: Dict[str, Any], progress: Callable[[str, float], None]) -> Dict[str, Any]:
+    from model.online import train_online
+
+    return train_online(full=bool(options.get("full")), activate=options.get("activate", True),
+                        progress=progress)
+
+
+TRAINERS = {
+    "pipeline": _train_pipeline,   # TF-IDF + Ridge (train_pipeline.py)
+    "forest": _train_forest,       # TF-IDF + RandomForest (model/training.py)
+    "online": _train_online,       # hashed features + SGD (model/online.py)
+}
+
+
+class _LineWriter(io.TextIOBase):
+    """stdout of the trainer -> one "log" event per line."""
+
+    def __init__(self, emit: Callable[[str], None]):
+        self._emit = emit
+        self._buf = ""
+
+    def write(self, s: str) -> int:
+        self._buf += s
+        *lines, self._buf = self._buf.split("\n")
+        for line in lines:
+            if line.strip():
+                self._emit(line)
+        return len(s)
+
+    def flush(self):
+        if self._buf.strip():
+            self._emit(self._buf)
+        self._buf = ""
+
+
+def _run_job(kind: str, options: Dict[str, Any], events) -> None:
+    """Child process entry point: lower priority, take the host lock, train, report."""
+    for var in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ[var] = RETRAIN_THREADS
+    try:
+        os.nice(RETRAIN_NICE)
+    except (AttributeError, OSError):
+        pass
+
+    def progress(stage: str, fraction: float):
+        events.put(("progress", {"stage": stage, "progress": round(min(max(fraction, 0.0), 1.0), 3)}))
+
+    writer = _LineWriter(lambda line: events.put(("log", line)))
+    try:
+        with open(_lock_path(), "w") as lock_file:
+            try:
+                import fcntl
+            except ImportError:   # no flock (Windows): the in-process queue still serialises
+                fcntl = None
+            if fcntl is not None:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    progress("waiting for lock", 0.0)
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+            progress("started", 0.0)
+            with redirect_stdout(writer):
+                result = TRAINERS[kind](options, progress)
+                writer.flush()
+        events.put(("result", result or {}))
+    except BaseException as e:
+        writer.flush()
+        events.put(("error", f"{type(e).__name__}: {e}\n{traceback.format_exc(limit=5)}"))
+
+
+# =============================================================================
+# Queue (serving process)
+# =============================================================================
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class RetrainJob:
+    def __init__(self, kind: str, options: Dict[str, Any]):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.options = options
+        self.status = QUEUED
+        self.stage: Optional[str] = None
+        self.progress = 0.0
+        self.submitted_at = _now()
+        self.started_at: Optional[str] = None
+        self.finished_at: Optional[str] = None
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.pid: Optional[int] = None
+        self.log: Deque[str] = deque(maxlen=LOG_LINES)
+        self.cancel_requested = False
+
+    def info(self, log: bool = False) -> Dict[str, Any]:
+        out = {
+            "id": self.id, "kind": self.kind, "options": self.options, "status": self.status,
+            "stage": self.stage, "progress": self.progress, "submitted_at": self.submitted_at,
+            "started_at": self.started_at, "finished_at": self.finished_at,
+            "result": self.result, "error": self.error, "pid": self.pid,
+        }
+        if log:
+            out["log"] = list(self.log)
+        return out
+
+
+class RetrainQueue:
+    def __init__(self, start_method: str = "spawn", history: int = RETRAIN_HISTORY):
+        self._ctx = multiprocessing.get_context(start_method)
+        self._history = history
+        self._jobs: Dict[str, RetrainJob] = {}
+        self._pending: Deque[RetrainJob] = deque()
+        self._current: Optional[Tuple[RetrainJob, Any]] = None
+        self._cond = threading.Condition()
+        self._subscribers: Dict[str, Set[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]]] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+
+    # ---- lifecycle -----------------------------------------------------------
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopping = False
+        self._thread = threading.Thread(target=self._dispatch, name="retrain-dispatcher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Stop dispatching; a running child is terminated (the served model is untouched)."""
+        with self._cond:
+            self._stopping = True
+            current = self._current
+            self._cond.notify_all()
+        if current is not None:
+            current[0].cancel_requested = True
+            current[1].terminate()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+        self._thread = None
+
+    # ---- API -----------------------------------------------------------------
+    def submit(self, kind: str, options: Optional[Dict[str, Any]] = None) -> RetrainJob:
+        """Queue a job; an identical job that is still queued is returned instead."""
+        if kind not in TRAINERS:
+            raise ValueError(f"Unknown retrain kind: {kind!r}")
+        options = options or {}
+        with self._cond:
+            for job in self._pending:
+                if job.kind == kind and job.options == options:
+                    return job
+            job = RetrainJob(kind, options)
+            self._jobs[job.id] = job
+            self._pending.append(job)
+            self._trim()
+            self._cond.notify_all()
+        self._emit(job, "status", job.info())
+        return job
+
+    def get(self, job_id: str) -> Optional[RetrainJob]:
+        with self._cond:
+            return self._jobs.get(job_id)
+
+    def jobs(self) -> List[Dict[str, Any]]:
+        with self._cond:
+            return [job.info() for job in reversed(list(self._jobs.values()))]
+
+    def cancel(self, job_id: str) -> Optional[RetrainJob]:
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None or job.status in TERMINAL:
+                return job
+            if job.status == QUEUED:
+                self._pending.remove(job)
+                self._finish(job, CANCELLED)
+                return job
+            job.cancel_requested = True
+            current = self._current
+        if current is not None and current[0] is job:
+            current[1].terminate()
+        return job
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._cond:
+            counts: Dict[str, int] = {}
+            for job in self._jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+            return {
+                "running": self._current[0].id if self._current else None,
+                "queued": len(self._pending),
+                "jobs": counts,
+            }
+
+    # ---- subscribers (SSE) -----------------------------------------------------
+    def subscribe(self, job_id: str) -> asyncio.Queue:
+        """Events of job_id on the caller's event loop: (event, data) tuples."""
+        queue: asyncio.Queue = asyncio.Queue()
+        with self._cond:
+            self._subscribers.setdefault(job_id, set()).add((asyncio.get_running_loop(), queue))
+        return queue
+
+    def unsubscribe(self, job_id: str, queue: asyncio.Queue):
+        with self._cond:
+            subs = self._subscribers.get(job_id, set())
+            for entry in [s for s in subs if s[1] is queue]:
+                subs.discard(entry)
+            if not subs:
+                self._subscribers.pop(job_id, None)
+
+    def _emit(self, job: RetrainJob, event: str, data: Any):
+        with self._cond:
+            subs = list(self._subscribers.get(job.id, ()))
+        for loop, queue in subs:
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, (event, data))
+            except RuntimeError:   # loop closed
+                self.unsubscribe(job.id, queue)
+
+    # ---- dispatcher ------------------------------------------------------------
+    def _trim(self):
+        finished = [j for j in self._jobs.values() if j.status in TERMINAL]
+        for job in finished[:max(0, len(self._jobs) - self._history)]:
+            del self._jobs[job.id]
+
+    def _finish(self, job: RetrainJob, status: str, error: Optional[str] = None):
+        job.status, job.finished_at = status, _now()
+        if error:
+            job.error = error
+        if status == SUCCEEDED:
+            job.progress, job.stage = 1.0, "done"
+        self._emit(job, "status", job.info())
+
+    def _dispatch(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._stopping:
+                    self._cond.wait()
+                if self._stopping:
+                    return
+                job = self._pending.popleft()
+                job.status, job.started_at = RUNNING, _now()
+                events = self._ctx.Queue()
+                proc = self._ctx.Process(target=_run_job, args=(job.kind, job.options, events),
+                                         name=f"retrain-{job.id}", daemon=True)
+                self._current = (job, proc)
+            try:
+                self._run(job, proc, events)
+            except Exception as e:
+                logger.exception("Retrain job %s failed: %s", job.id, e)
+                with self._cond:
+                    self._finish(job, FAILED, str(e))
+            finally:
+                with self._cond:
+                    self._current = None
+                    self._trim()
+
+    def _run(self, job: RetrainJob, proc, events):
+        t0 = time.perf_counter()
+        proc.start()
+        job.pid = proc.pid
+        self._emit(job, "status", job.info())
+        logger.info("Retrain job %s (%s) started in pid %s", job.id, job.kind, proc.pid)
+
+        outcome: Optional[Tuple[str, Any]] = None
+        while outcome is None:
+            try:
+                event, data = events.get(timeout=0.5)
+            except Exception:   # queue.Empty
+                if not proc.is_alive():
+                    break
+                continue
+            if event == "progress":
+                job.stage, job.progress = data["stage"], data["progress"]
+                self._emit(job, "progress", data)
+            elif event == "log":
+                job.log.append(data)
+                self._emit(job, "log", data)
+            else:
+                outcome = (event, data)
+        proc.join(timeout=10)
+        if proc.is_alive():
+            proc.terminate()
+            proc.join()
+
+        with self._cond:
+            if job.cancel_requested:
+                self._finish(job, CANCELLED)
+            elif outcome is None:
+                self._finish(job, FAILED, f"retrain process exited with code {proc.exitcode}")
+            elif outcome[0] == "error":
+                self._finish(job, FAILED, outcome[1])
+            else:
+                job.result = outcome[1]
+                self._finish(job, SUCCEEDED)
+        logger.info("Retrain job %s %s in %.1f s", job.id, job.status, time.perf_counter() - t0)
@@ -0,0 +1,322 @@
+# model/lite.py
+"""
+Sklearn-free inference runtime for the linear TF-IDF danger model.
+
+export_lite_model() turns a fitted TfidfVectorizer + linear regressor
+(the train_pipeline Ridge) into a compact .npz: vocabulary, IDF weights,
+coefficients, intercept and the analyzer settings. LiteModel loads that
+file with NumPy only and reproduces the sklearn scores. A binary logistic
+classifier is exported with a logistic link, so LiteModel.predict matches
+predict_proba(...)[:, 1].
+
+Run (vanuit server/):
+    python -m model.lite                # exporteer danger_score_model.pkl -> .npz
+    python -m model.lite --check        # alleen pariteit controleren
+"""
+import json
+import os
+import re
+import tempfile
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from model.artifacts import DEFAULT_LITE_PATH
+
+LITE_FORMAT_VERSION = 1
+
+# Parity probes: accents, bigrams, stop words, out-of-vocabulary text
+PARITY_TRANSCRIPTS = [
+    "Mijn partner bedreigt mij met een mes. Ik ben bang voor mijn leven.",
+    "Er is een man in mijn huis met een pistool. Ik verstop me in de kast.",
+    "Ze heeft zichzelf gesneden, er is bloed. Kom snel!",
+    "Hij zegt dat hij het huis gaat aansteken, één moment, café brandt.",
+    "Mijn kat is vast komen te zitten in de boom.",
+    "De straatverlichting is kapot, kunt u dit melden?",
+    "",
+    "xyz qqq",
+]
+
+
+def _strip_accents_unicode(s: str) -> str:
+    # Same semantics as sklearn.feature_extraction.text.strip_accents_unicode
+    try:
+        s.encode("ASCII", errors="strict")
+        return s
+    except UnicodeEncodeError:
+        normalized = unicodedata.normalize("NFKD", s)
+        return "".join(c for c in normalized if not unicodedata.combining(c))
+
+
+def _strip_accents_ascii(s: str) -> str:
+    nkfd_form = unicodedata.normalize("NFKD", s)
+    return nkfd_form.encode("ASCII", "ignore").decode("ASCII")
+
+
+class LiteModel:
+    """Pure-NumPy TF-IDF + linear model scorer (identity or logistic link)."""
+
+    def __init__(self, terms: Sequence[str], idf: np.ndarray, coef: np.ndarray,
+                 intercept: float, config: Dict):
+        self.terms = np.asarray(terms, dtype=str)
+        self.idf = np.asarray(idf, dtype=np.float64)
+        self.coef = np.asarray(coef, dtype=np.float64)
+        self.intercept = float(intercept)
+        self.config = dict(config)
+        self.vocabulary = {t: i for i, t in enumerate(self.terms.tolist())}
+
+        self._lowercase = bool(config.get("lowercase", True))
+        self._strip = {"unicode": _strip_accents_unicode,
+                       "ascii": _strip_accents_ascii}.get(config.get("strip_accents"))
+        self._token_re = re.compile(config.get("token_pattern", r"(?u)\b\w\w+\b"))
+        self._stop_words = frozenset(config.get("stop_words") or ())
+        self._ngram_range = tuple(config.get("ngram_range", (1, 1)))
+        self._norm = config.get("norm", "l2")
+        self._sublinear_tf = bool(config.get("sublinear_tf", False))
+        self._binary = bool(config.get("binary", False))
+        self.link = config.get("link", "identity")
+        if self.link not in ("identity", "logistic"):
+            raise ValueError(f"Unsupported link: {self.link}")
+
+    # ---- construction / persistence -----------------------------------------
+    @classmethod
+    def from_sklearn(cls, vectorizer, regressor) -> "LiteModel":
+        """Build from a fitted TfidfVectorizer + linear regressor (coef_) or binary logistic classifier."""
+        if getattr(vectorizer, "analyzer", None) != "word" or vectorizer.tokenizer or vectorizer.preprocessor:
+            raise ValueError("Only word analyzers with the default tokenizer/preprocessor are supported")
+        if callable(vectorizer.strip_accents):
+            raise ValueError("Custom strip_accents callables are not supported")
+        coef = np.asarray(getattr(regressor, "coef_", None) if regressor is not None else None)
+        if coef.ndim == 2 and coef.shape[0] == 1:
+            coef = coef[0]
+        if coef.ndim != 1:
+            raise ValueError("Regressor is not a single-output linear model")
+
+        vocab = vectorizer.vocabulary_
+        terms = [None] * len(vocab)
+        for term, idx in vocab.items():
+            terms[idx] = term
+        idf = vectorizer.idf_ if vectorizer.use_idf else np.ones(len(terms))
+        stop_words = vectorizer.get_stop_words()
+        config = {
+            "lowercase": bool(vectorizer.lowercase),
+            "strip_accents": vectorizer.strip_accents,
+            "token_pattern": vectorizer.token_pattern,
+            "stop_words": sorted(stop_words) if stop_words else [],
+            "ngram_range": list(vectorizer.ngram_range),
+            "norm": vectorizer.norm,
+            "sublinear_tf": bool(vectorizer.sublinear_tf),
+            "binary": bool(vectorizer.binary),
+            "link": _link(regressor),
+        }
+        intercept = np.ravel(getattr(regressor, "intercept_", 0.0))
+        return cls(terms, idf, coef, float(intercept[0]) if intercept.size else 0.0, config)
+
+    @classmethod
+    def load(cls, path: str) -> "LiteModel":
+        with np.load(path, allow_pickle=False) as data:
+            config = json.loads(str(data["config"]))
+            if config.get("format_version") != LITE_FORMAT_VERSION:
+                raise ValueError(f"Unsupported lite model format: {config.get('format_version')}")
+            return cls(data["terms"], data["idf"], data["coef"], float(data["intercept"]), config)
+
+    def save(self, path: str):
+        """Atomic write (temp file + os.replace), like artifacts.publish_model."""
+        directory = os.path.dirname(os.path.abspath(path)) or "."
+        config = dict(self.config, format_version=LITE_FORMAT_VERSION)
+        fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", suffix=".npz", dir=directory)
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                np.savez_compressed(
+                    fh,
+                    terms=self.terms,
+                    idf=self.idf,
+                    coef=self.coef,
+                    intercept=np.float64(self.intercept),
+                    config=np.array(json.dumps(config)),
+                )
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    # ---- analysis -----------------------------------------------------------
+    @property
+    def ngram_range(self) -> Tuple[int, int]:
+        return self._ngram_range
+
+    @property
+    def plain_l2(self) -> bool:
+        """Raw counts × IDF with L2 norm (allows running-sum updates)."""
+        return self._norm == "l2" and not self._sublinear_tf and not self._binary
+
+    def preprocess(self, text: str) -> str:
+        if self._lowercase:
+            text = text.lower()
+        if self._strip is not None:
+            text = self._strip(text)
+        return text
+
+    def tokenize(self, text: str) -> List[str]:
+        """Preprocessed, stop-word-filtered tokens (input for n-grams)."""
+        tokens = self._token_re.findall(self.preprocess(text))
+        if self._stop_words:
+            tokens = [t for t in tokens if t not in self._stop_words]
+        return tokens
+
+    def ngrams(self, tokens: Sequence[str]) -> List[str]:
+        min_n, max_n = self._ngram_range
+        out = list(tokens) if min_n == 1 else []
+        for n in range(max(min_n, 2), max_n + 1):
+            out.extend(" ".join(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+        return out
+
+    def analyze(self, text: str) -> List[str]:
+        return self.ngrams(self.tokenize(text))
+
+    def term_counts(self, terms: Iterable[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """(feature indices, raw counts) for the in-vocabulary terms."""
+        vocab = self.vocabulary
+        idx = np.fromiter((vocab[t] for t in terms if t in vocab), dtype=np.int64)
+        if idx.size == 0:
+            return idx, np.zeros(0, dtype=np.float64)
+        uniq, counts = np.unique(idx, return_counts=True)
+        return uniq, counts.astype(np.float64)
+
+    def weights(self, idx: np.ndarray, counts: np.ndarray) -> np.ndarray:
+        """Normalized TF-IDF weights for the given raw counts."""
+        tf = np.ones_like(counts) if self._binary else counts
+        if self._sublinear_tf:
+            tf = np.log(tf) + 1.0
+        w = tf * self.idf[idx]
+        if self._norm == "l2":
+            n = np.sqrt(np.dot(w, w))
+        elif self._norm == "l1":
+            n = np.abs(w).sum()
+        else:
+            n = 0.0
+        return w / n if n > 0 else w
+
+    def features(self, text: str) -> Tuple[np.ndarray, np.ndarray]:
+        idx, counts = self.term_counts(self.analyze(text))
+        return idx, self.weights(idx, counts)
+
+    # ---- scoring ------------------------------------------------------------
+    def output(self, z):
+        """Decision value(s) x · coef + intercept -> score (sigmoid for a logistic link)."""
+        if self.link == "logistic":
+            return 1.0 / (1.0 + np.exp(-z))
+        return z
+
+    def predict(self, texts: Sequence[str]) -> np.ndarray:
+        out = np.empty(len(texts), dtype=np.float64)
+        for i, text in enumerate(texts):
+            idx, w = self.features(text)
+            out[i] = np.dot(w, self.coef[idx]) + self.intercept
+        return self.output(out)
+
+    def removal_deltas(self, idx: np.ndarray, w: np.ndarray) -> np.ndarray:
+        """
+        Exact score change when each feature of one row (idx, normalized
+        weights w) is dropped and the row is re-normalized: the other
+        weights grow by 1/sqrt(1 - w_j²) (L2) or 1/(1 - |w_j|) (L1).
+        """
+        coef = self.coef[idx]
+        contrib = w * coef
+        total = contrib.sum()
+        if self._norm == "l2":
+            rest = 1.0 - w * w
+        elif self._norm == "l1":
+            rest = 1.0 - np.abs(w)
+        else:
+            rest = np.ones_like(w)
+        rest = np.clip(rest, 0.0, None)
+        scale = np.sqrt(rest) if self._norm == "l2" else rest
+        with np.errstate(divide="ignore", invalid="ignore"):
+            # a feature that is the whole row leaves an empty row (intercept only)
+            without = np.where(scale > 1e-12, (total - contrib) / scale, 0.0)
+        base = self.output(self.intercept + total)
+        return self.output(self.intercept + without) - base
+
+    def contributions(self, text: str) -> Tuple[List[str], np.ndarray]:
+        """Per-term linear contributions x_j · coef_j (closed-form attribution; log-odds for a logistic link)."""
+        idx, w = self.features(text)
+        return self.terms[idx].tolist(), w * self.coef[idx]
+
+
+def _link(regressor) -> str:
+    """"logistic" for a binary classifier with predict_proba (scores = P(class 1)), else "identity"."""
+    if hasattr(regressor, "predict_proba") and hasattr(regressor, "classes_"):
+        if len(regressor.classes_) != 2:
+            raise ValueError("Only binary classifiers are supported")
+        return "logistic"
+    return "identity"
+
+
+def _sklearn_scores(regressor, X) -> np.ndarray:
+    """What LiteModel.predict reproduces: predict(), or P(class 1) for a classifier."""
+    if _link(regressor) == "logistic":
+        return regressor.predict_proba(X)[:, 1]
+    return regressor.predict(X)
+
+
+def _split_pipeline(obj):
+    """(vectorizer, regressor) from a Pipeline or a (vectorizer, model) tuple."""
+    if hasattr(obj, "named_steps"):
+        steps = [step for _, step in obj.steps]
+        return steps[0], steps[-1]
+    vectorizer, regressor = obj
+    return vectorizer, regressor
+
+
+def check_parity(obj, lite: LiteModel, transcripts: Optional[Sequence[str]] = None,
+                 atol: float = 1e-9) -> float:
+    """Compare lite scores with the sklearn pipeline; raises on mismatch."""
+    vectorizer, regressor = _split_pipeline(obj)
+    texts = list(transcripts) if transcripts else PARITY_TRANSCRIPTS
+    expected = _sklearn_scores(regressor, vectorizer.transform(texts))
+    got = lite.predict(texts)
+    max_diff = float(np.max(np.abs(expected - got))) if texts else 0.0
+    if max_diff > atol:
+        worst = int(np.argmax(np.abs(expected - got)))
+        raise ValueError(
+            f"Lite model parity failed: max |Δ| {max_diff:.3g} on {texts[worst]!r} "
+            f"(sklearn {expected[worst]:.6f}, lite {got[worst]:.6f})"
+        )
+    if not np.array_equal(np.round(expected, 2), np.round(got, 2)):
+        raise ValueError("Lite model parity failed: rounded scores differ")
+    return max_diff
+
+
+def export_lite_model(obj, path: str = DEFAULT_LITE_PATH,
+                      transcripts: Optional[Sequence[str]] = None) -> LiteModel:
+    """Export a fitted pipeline to .npz after verifying score parity."""
+    lite = LiteModel.from_sklearn(*_split_pipeline(obj))
+    check_parity(obj, lite, transcripts)
+    lite.save(path)
+    return lite
+
+
+if __name__ == "__main__":
+    import argparse
+
+    import joblib
+
+    from model.artifacts import DEFAULT_MODEL_PATH
+
+    parser = argparse.ArgumentParser(description="Exporteer het gevaarscoremodel naar NumPy-arrays.")
+    parser.add_argument("--pkl", default=DEFAULT_MODEL_PATH)
+    parser.add_argument("--out", default=DEFAULT_LITE_PATH)
+    parser.add_argument("--check", action="store_true", help="Alleen pariteit controleren, niet schrijven")
+    args = parser.parse_args()
+
+    pipe = joblib.load(args.pkl)
+    lite = LiteModel.from_sklearn(*_split_pipeline(pipe))
+    diff = check_parity(pipe, lite)
+    print(f"✅ Pariteit OK — max |Δ| {diff:.2e} over {len(PARITY_TRANSCRIPTS)} transcripts")
+    if not args.check:
+        lite.save(args.out)
+        print(f"💾 Lite model ({len(lite.terms)} features) opgeslagen naar: {args.out}")
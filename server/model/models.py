@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float, Enum, Text, ForeignKey, DateTime, JSON
+from sqlalchemy import Column, Integer, String, Float, Enum, Text, ForeignKey, DateTime, JSON
 from sqlalchemy.orm import declarative_base, relationship
 from datetime import datetime
 import enum
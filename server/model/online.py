@@ -0,0 +1,240 @@
+# model/online.py
+"""
+Incremental (online) training of the danger model.
+
+The TF-IDF models in train_pipeline.py / training.py are refit on every
+CallRecord on each retrain, so retraining gets slower as the call log
+grows. This trainer uses a stateless hashed feature space
+(HashingVectorizer: no vocabulary to refit) and an SGDRegressor that is
+updated with partial_fit. Each update only reads records with an id above
+the stored watermark, so its cost grows with the new data only.
+
+State (pipeline + watermark) lives in one file under ONLINE_STATE_DIR. It
+is written atomically before the model is registered, so the published
+model always matches a saved state. A full rebuild (fresh model, several
+epochs over all records) is still available for drift, and runs
+automatically every ONLINE_FULL_REBUILD_EVERY updates or when the
+feature configuration has changed.
+
+Run (vanuit server/):
+    python -m model.online            # alleen nieuwe records
+    python -m model.online --full     # volledige herbouw
+    python -m model.online --status
+"""
+import os
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from model.dedup import DEDUP_TRAINING, duplicates_after
+from model.extract import iter_chunks
+from model.registry import REGISTRY_DIR, register_model
+
+ONLINE_STATE_DIR = os.getenv("ONLINE_STATE_DIR", os.path.join(REGISTRY_DIR, "online"))
+STATE_NAME = "state.joblib"
+N_FEATURES = int(os.getenv("ONLINE_N_FEATURES", str(2 ** 18)))
+FULL_REBUILD_EVERY = int(os.getenv("ONLINE_FULL_REBUILD_EVERY", "50"))   # updates; 0 = never
+FULL_REBUILD_EPOCHS = int(os.getenv("ONLINE_FULL_REBUILD_EPOCHS", "20"))
+UPDATE_EPOCHS = int(os.getenv("ONLINE_UPDATE_EPOCHS", "3"))
+CHUNK_SIZE = 1000
+RANDOM_STATE = 42
+
+# Everything that changes the meaning of a hashed feature or of the model
+FEATURE_CONFIG = {"n_features": N_FEATURES, "ngram_range": (1, 2), "norm": "l2",
+                  "alternate_sign": False, "strip_accents": "unicode"}
+
+
+def build_pipeline():
+    """Fresh HashingVectorizer (1,2-grams) + SGDRegressor pipeline."""
+    from sklearn.feature_extraction.text import HashingVectorizer
+    from sklearn.linear_model import SGDRegressor
+    from sklearn.pipeline import Pipeline
+
+    from analysis.document import DUTCH_STOP_WORDS
+
+    vectorizer = HashingVectorizer(
+        stop_words=sorted(DUTCH_STOP_WORDS),
+        lowercase=True,
+        **FEATURE_CONFIG,
+    )
+    reg = SGDRegressor(loss="squared_error", penalty="l2", alpha=1e-5,
+                       learning_rate="invscaling", eta0=0.5, random_state=RANDOM_STATE)
+    return Pipeline([("hash", vectorizer), ("reg", reg)])
+
+
+# =============================================================================
+# State
+# =============================================================================
+def state_path(state_dir: str = ONLINE_STATE_DIR) -> str:
+    return os.path.join(state_dir, STATE_NAME)
+
+
+def load_state(state_dir: str = ONLINE_STATE_DIR) -> Optional[Dict[str, Any]]:
+    path = state_path(state_dir)
+    if not os.path.exists(path):
+        return None
+    import joblib
+
+    return joblib.load(path)
+
+
+def _save_state(state: Dict[str, Any], state_dir: str):
+    import joblib
+
+    os.makedirs(state_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", suffix=".joblib", dir=state_dir)
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            joblib.dump(state, fh)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp_path, state_path(state_dir))
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+# =============================================================================
+# Data
+# =============================================================================
+def _records_after(after_id: int, chunk_size: int = CHUNK_SIZE) -> Iterator[List[Tuple[int, str, float]]]:
+    """Labelled (id, transcript, danger_score) rows with id > after_id, in id order, per chunk."""
+    return iter_chunks(("id", "transcript", "danger_score"), chunk_size, after_id=after_id)
+
+
+# =============================================================================
+# Training
+# =============================================================================
+def _fit_chunk(pipe, texts: List[str], y: np.ndarray, epochs: int,
+               rng: np.random.Generator) -> Tuple[float, int]:
+    """
+    partial_fit one chunk. Returns (sum of absolute errors, n) of the model
+    *before* it saw the chunk (progressive validation); (0, 0) for a fresh model.
+    """
+    X = pipe.named_steps["hash"].transform(texts)
+    reg = pipe.named_steps["reg"]
+    abs_err, n_eval = 0.0, 0
+    if hasattr(reg, "coef_"):
+        abs_err, n_eval = float(np.abs(np.clip(reg.predict(X), 0, 1) - y).sum()), len(y)
+    for _ in range(max(1, epochs)):
+        order = rng.permutation(len(y))
+        reg.partial_fit(X[order], y[order])
+    return abs_err, n_eval
+
+
+def train_online(full: bool = False, activate: bool = True, state_dir: str = ONLINE_STATE_DIR,
+                 chunk_size: int = CHUNK_SIZE,
+                 progress: Optional[Callable[[str, float], None]] = None,
+                 dedup: bool = DEDUP_TRAINING) -> Dict[str, Any]:
+    """
+    Update the online model with the records after the watermark (or rebuild
+    it from all records) and register the result. Returns a summary;
+    "version" is None when there was nothing new. progress(stage, fraction)
+    is called after every pass and before registering. dedup: records that
+    repeat an earlier one (model/dedup.py) are not trained on; the watermark
+    still moves past them.
+    """
+    t0 = time.perf_counter()
+    state = None if full else load_state(state_dir)
+    reason = "requested" if full else None
+    if state is not None and state.get("feature_config") != FEATURE_CONFIG:
+        state, reason = None, "feature config changed"
+    elif state is not None and FULL_REBUILD_EVERY and state.get("updates_since_rebuild", 0) >= FULL_REBUILD_EVERY:
+        state, reason = None, f"{FULL_REBUILD_EVERY} updates since last rebuild"
+    elif state is None and reason is None:
+        reason = "no state"
+    rebuild = state is None
+
+    if rebuild:
+        state = {
+            "pipeline": build_pipeline(),
+            "feature_config": FEATURE_CONFIG,
+            "watermark": 0,
+            "n_seen": 0,
+            "updates_since_rebuild": 0,
+            "rebuilt_at": datetime.now(timezone.utc).isoformat(),
+        }
+    pipe = state["pipeline"]
+    rng = np.random.default_rng(RANDOM_STATE + state["n_seen"])
+
+    # Rebuild: several passes over all records; update: only the new ones
+    passes, epochs = (FULL_REBUILD_EPOCHS, 1) if rebuild else (1, UPDATE_EPOCHS)
+    skip = set(duplicates_after(state["watermark"])) if dedup else set()
+    watermark, n_new, abs_err, n_eval = state["watermark"], 0, 0.0, 0
+    for p in range(max(1, passes)):
+        for batch in _records_after(state["watermark"], chunk_size):
+            rows = [r for r in batch if r[0] not in skip]
+            if rows:
+                texts = [t for _, t, _ in rows]
+                y = np.clip(np.array([s for _, _, s in rows], dtype=float), 0, 1)
+                err, n = _fit_chunk(pipe, texts, y, epochs, rng)
+            else:
+                err, n = 0.0, 0
+            if p == 0:
+                abs_err, n_eval = abs_err + err, n_eval + n
+                watermark, n_new = batch[-1][0], n_new + len(rows)
+        if progress:
+            progress("train", 0.9 * (p + 1) / max(1, passes))
+
+    summary = {"mode": "full" if rebuild else "incremental", "reason": reason if rebuild else None,
+               "new_records": n_new, "duplicates": len(skip), "watermark": watermark, "version": None}
+    if n_new == 0:
+        if watermark > state["watermark"]:
+            # only near duplicates: keep the model, but don't read them again
+            state.update(watermark=watermark, updated_at=datetime.now(timezone.utc).isoformat())
+            _save_state(state, state_dir)
+        summary["ms"] = round((time.perf_counter() - t0) * 1000, 1)
+        return summary
+
+    state.update(
+        watermark=watermark,
+        n_seen=state["n_seen"] + n_new,
+        updates_since_rebuild=0 if rebuild else state["updates_since_rebuild"] + 1,
+        updated_at=datetime.now(timezone.utc).isoformat(),
+    )
+    metrics = {"n_new": n_new, "n_seen": state["n_seen"], "watermark": watermark, "mode": summary["mode"]}
+    if n_eval:
+        metrics["progressive_mae"] = round(abs_err / n_eval, 4)
+    if progress:
+        progress("register", 0.95)
+    _save_state(state, state_dir)
+    version = register_model(pipe, metrics=metrics, n_rows=state["n_seen"], activate=activate,
+                             source=f"model.online ({summary['mode']})")
+    summary.update(metrics, version=version, ms=round((time.perf_counter() - t0) * 1000, 1))
+    return summary
+
+
+def status(state_dir: str = ONLINE_STATE_DIR) -> Optional[Dict[str, Any]]:
+    state = load_state(state_dir)
+    if state is None:
+        return None
+    return {k: v for k, v in state.items() if k != "pipeline"}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Incrementele training van het gevaarmodel (HashingVectorizer + SGD).")
+    parser.add_argument("--full", action="store_true", help="volledige herbouw over alle records")
+    parser.add_argument("--no-activate", action="store_true", help="registreren zonder actief te maken")
+    parser.add_argument("--status", action="store_true", help="toon watermark en status")
+    args = parser.parse_args()
+
+    if args.status:
+        st = status()
+        print(st if st is not None else "Nog geen online model (draai eerst zonder --status).")
+    else:
+        result = train_online(full=args.full, activate=not args.no_activate)
+        if result["version"] is None:
+            print(f"ℹ️ Geen nieuwe records na watermark {result['watermark']} — niets te doen.")
+        else:
+            print(f"✅ Online model bijgewerkt ({result['mode']}"
+                  f"{', ' + result['reason'] if result['reason'] else ''}): "
+                  f"{result['new_records']} nieuwe records, watermark {result['watermark']}, "
+                  f"versie {result['version']} ({result['ms']:.0f} ms)")
+            if "progressive_mae" in result:
+                print(f"📈 Progressieve MAE op nieuwe records: {result['progressive_mae']:.3f}")
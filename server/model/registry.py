@@ -0,0 +1,352 @@
+# model/registry.py
+"""
+Model registry: a directory of versioned danger-model artifacts plus a
+manifest.json describing each version (format, metrics, training rows,
+feature count) and which one is active.
+
+    models/
+      manifest.json
+      20250821T101500-1a2b3c4d.pkl
+      20250821T101500-1a2b3c4d.npz     # lite export (linear text models)
+
+Every format is loaded into a LoadedModel with the same predict(texts)
+interface, so the three training scripts can coexist:
+
+- "text-pipeline": TF-IDF → regressor Pipeline (train_pipeline.py)
+- "text-tuple":    (vectorizer, model) tuple (model/training.py)
+- "categorical":   one-hot RandomForest over categorical cues (train_danger_model.py)
+- "lite":          NumPy export (model/lite.py)
+
+Run (vanuit server/):
+    python -m model.registry list
+    python -m model.registry import danger_score_model.pkl [--activate]
+    python -m model.registry activate <version>
+"""
+import json
+import os
+import tempfile
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from analysis.lexicon import CATEGORICAL_CUES, scan as scan_lexicons
+from model.artifacts import SERVER_DIR, artifact_stamp, artifact_version
+from model.lite import LiteModel, check_parity
+
+REGISTRY_DIR = os.getenv("MODEL_REGISTRY_DIR", os.path.join(SERVER_DIR, "models"))
+MANIFEST_NAME = "manifest.json"
+
+FORMATS = ("text-pipeline", "text-tuple", "categorical", "lite")
+
+
+class ModelVersionNotFound(KeyError):
+    pass
+
+
+# =============================================================================
+# Common predict interface
+# =============================================================================
+_CATEGORICAL_DEFAULTS = {"weapon": "none", "action": "calm", "mental_state": "calm",
+                         "past_violence": "no", "police_history": "none", "threat": "none"}
+
+
+def categorical_features(text: str) -> Dict[str, str]:
+    """Map a free-text transcript onto the categorical model's input columns."""
+    hits = scan_lexicons(text)
+    row = dict(_CATEGORICAL_DEFAULTS)
+    # Keyword cues (English training vocabulary + Dutch) live in analysis/lexicon.py
+    for column, options in CATEGORICAL_CUES.items():
+        for value, _ in options:
+            if hits[f"categorical:{column}={value}"]:
+                row[column] = value
+                break
+    return row
+
+
+class LoadedModel:
+    """
+    Snapshot of one loaded artifact behind a common predict(texts) interface.
+    Scoring functions grab a snapshot once per call, so a hot swap never
+    mixes versions; in-flight calls finish on the old one.
+    """
+
+    def __init__(self, obj: Any, fmt: str, version: str, path: str, stamp=None,
+                 metadata: Optional[Dict[str, Any]] = None):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown model format: {fmt!r}")
+        self.format = fmt
+        self.version = version
+        self.path = path
+        self.stamp = stamp
+        self.metadata = metadata or {}
+        self.vectorizer = None
+        self.model = None
+        self.lite: Optional[LiteModel] = None
+        if fmt == "lite":
+            self.lite = obj
+        elif fmt == "categorical":
+            self.model = obj
+        elif fmt == "text-pipeline":
+            steps = [step for _, step in obj.steps]
+            self.vectorizer = obj[:-1] if len(steps) > 2 else steps[0]
+            self.model = steps[-1]
+        else:
+            self.vectorizer, self.model = obj
+        self.runtime = "lite" if fmt == "lite" else "sklearn"
+        self.load_ms = 0.0
+        self.loaded_at = datetime.now(timezone.utc)
+        self._lite_checked = fmt in ("lite", "categorical")
+
+    def featurize(self, transcripts: Sequence[str]) -> Any:
+        """Model input for the texts: sparse TF-IDF rows, lite (idx, weights) pairs or a DataFrame."""
+        if self.format == "lite":
+            return [self.lite.features(t) for t in transcripts]
+        if self.format == "categorical":
+            import pandas as pd
+
+            return pd.DataFrame([categorical_features(t) for t in transcripts])
+        return self.vectorizer.transform(list(transcripts))
+
+    def predict_features(self, X: Any) -> np.ndarray:
+        if self.format == "lite":
+            lite = self.lite
+            return lite.output(np.array([np.dot(w, lite.coef[idx]) + lite.intercept for idx, w in X],
+                                        dtype=np.float64))
+        return self.model.predict(X)
+
+    def predict(self, transcripts: Sequence[str]) -> np.ndarray:
+        if self.format == "lite":
+            return self.lite.predict(transcripts)
+        return self.predict_features(self.featurize(transcripts))
+
+    def contributions(self, X: Any, row: int = 0) -> Optional[Tuple[List[str], np.ndarray]]:
+        """Per-term x_j · coef_j of one featurized row; None for non-linear models."""
+        lite = self.linear_view()
+        if lite is None:
+            return None
+        if self.format == "lite":
+            idx, w = X[row]
+        else:
+            x = X[row]
+            idx, w = x.indices, x.data
+        return lite.terms[idx].tolist(), w * lite.coef[idx]
+
+    def removal_deltas(self, X: Any, row: int = 0) -> Optional[Tuple[List[str], np.ndarray]]:
+        """Per-term exact score change of dropping that feature (re-normalized); None for non-linear models."""
+        lite = self.linear_view()
+        if lite is None:
+            return None
+        if self.format == "lite":
+            idx, w = X[row]
+        else:
+            x = X[row]
+            idx, w = x.indices, x.data
+        return lite.terms[idx].tolist(), lite.removal_deltas(idx, w)
+
+    def linear_view(self) -> Optional[LiteModel]:
+        """LiteModel view of a linear TF-IDF model (built once), else None."""
+        if not self._lite_checked:
+            try:
+                self.lite = LiteModel.from_sklearn(self.vectorizer, self.model)
+            except (AttributeError, TypeError, ValueError):
+                self.lite = None
+            if self.lite is not None and self.lite.link != "identity":
+                self.lite = None    # classifier: the sklearn runtime serves predict(), not P(class 1)
+            self._lite_checked = True
+        return self.lite
+
+    def info(self) -> dict:
+        return {
+            "version": self.version,
+            "format": self.format,
+            "runtime": self.runtime,
+            "path": self.path,
+            "loaded_at": self.loaded_at.isoformat(),
+            "load_ms": round(self.load_ms, 1),
+        }
+
+
+def detect_format(obj: Any) -> str:
+    if isinstance(obj, LiteModel):
+        return "lite"
+    if hasattr(obj, "named_steps"):
+        first = obj.steps[0][1]
+        if hasattr(first, "transformers"):
+            return "categorical"
+        return "text-pipeline"
+    if isinstance(obj, (tuple, list)) and len(obj) == 2:
+        return "text-tuple"
+    raise ValueError(f"Unrecognized model artifact of type {type(obj).__name__}")
+
+
+def load_artifact(path: str, fmt: Optional[str] = None, version: Optional[str] = None,
+                  metadata: Optional[Dict[str, Any]] = None) -> LoadedModel:
+    """Load any supported artifact file (no warm-up)."""
+    stamp = artifact_stamp(path)
+    if path.endswith(".npz"):
+        obj = LiteModel.load(path)
+    else:
+        import joblib  # lazy: not needed by the lite runtime
+
+        obj = joblib.load(path)
+    fmt = fmt or detect_format(obj)
+    return LoadedModel(obj, fmt, version or artifact_version(path), path, stamp, metadata)
+
+
+# =============================================================================
+# Manifest
+# =============================================================================
+_manifest_lock = threading.Lock()
+
+
+def manifest_path(registry_dir: str = REGISTRY_DIR) -> str:
+    return os.path.join(registry_dir, MANIFEST_NAME)
+
+
+def read_manifest(registry_dir: str = REGISTRY_DIR) -> Dict[str, Any]:
+    path = manifest_path(registry_dir)
+    if not os.path.exists(path):
+        return {"active": None, "versions": {}}
+    with open(path, "r", encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def _write_manifest(manifest: Dict[str, Any], registry_dir: str):
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", suffix=".json", dir=registry_dir)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as fh:
+            json.dump(manifest, fh, indent=2, sort_keys=True)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, manifest_path(registry_dir))
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _n_features(obj: Any, fmt: str) -> Optional[int]:
+    try:
+        if fmt == "lite":
+            return int(len(obj.terms))
+        if fmt == "categorical":
+            return int(len(obj.steps[0][1].get_feature_names_out()))
+        vectorizer = obj.steps[0][1] if fmt == "text-pipeline" else obj[0]
+        return int(len(vectorizer.vocabulary_)) if hasattr(vectorizer, "vocabulary_") \
+            else int(getattr(vectorizer, "n_features", 0)) or None
+    except Exception:
+        return None
+
+
+def register_model(obj: Any, fmt: Optional[str] = None, metrics: Optional[Dict[str, Any]] = None,
+                   n_rows: Optional[int] = None, activate: bool = True, source: Optional[str] = None,
+                   lite_parity_texts: Optional[Sequence[str]] = None,
+                   registry_dir: str = REGISTRY_DIR) -> str:
+    """
+    Write a new versioned artifact + manifest entry; returns the version.
+    Linear text models also get a parity-checked lite (.npz) export.
+    """
+    from model.artifacts import publish_model
+
+    fmt = fmt or detect_format(obj)
+    os.makedirs(registry_dir, exist_ok=True)
+    if fmt == "lite":
+        staging = os.path.join(registry_dir, f".staging-{os.getpid()}.npz")
+        obj.save(staging)
+        version = artifact_version(staging)
+        filename = f"{version}.npz"
+        os.replace(staging, os.path.join(registry_dir, filename))
+    else:
+        staging = os.path.join(registry_dir, f".staging-{os.getpid()}.pkl")
+        version = publish_model(obj, staging)
+        filename = f"{version}.pkl"
+        os.replace(staging, os.path.join(registry_dir, filename))
+
+    entry: Dict[str, Any] = {
+        "file": filename,
+        "format": fmt,
+        "metrics": metrics or {},
+        "n_rows": n_rows,
+        "n_features": _n_features(obj, fmt),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "source": source,
+    }
+    if fmt in ("text-pipeline", "text-tuple"):
+        try:
+            loaded = LoadedModel(obj, fmt, version, filename)
+            lite = loaded.linear_view()
+            if lite is not None:
+                check_parity(obj, lite, lite_parity_texts)
+                lite.save(os.path.join(registry_dir, f"{version}.npz"))
+                entry["lite_file"] = f"{version}.npz"
+        except ValueError as e:
+            entry["lite_error"] = str(e)
+
+    with _manifest_lock:
+        manifest = read_manifest(registry_dir)
+        manifest["versions"][version] = entry
+        if activate:
+            manifest["active"] = version
+        _write_manifest(manifest, registry_dir)
+    return version
+
+
+def activate_version(version: str, registry_dir: str = REGISTRY_DIR):
+    with _manifest_lock:
+        manifest = read_manifest(registry_dir)
+        if version not in manifest["versions"]:
+            raise ModelVersionNotFound(version)
+        manifest["active"] = version
+        _write_manifest(manifest, registry_dir)
+
+
+def list_versions(registry_dir: str = REGISTRY_DIR) -> List[Dict[str, Any]]:
+    manifest = read_manifest(registry_dir)
+    out = []
+    for version, entry in sorted(manifest["versions"].items(), key=lambda kv: kv[1].get("created_at", "")):
+        out.append(dict(entry, version=version, active=version == manifest.get("active")))
+    return out
+
+
+def load_version(version: str, prefer_lite: bool = False,
+                 registry_dir: str = REGISTRY_DIR) -> LoadedModel:
+    manifest = read_manifest(registry_dir)
+    entry = manifest["versions"].get(version)
+    if entry is None:
+        raise ModelVersionNotFound(version)
+    if prefer_lite and entry.get("lite_file"):
+        path, fmt = os.path.join(registry_dir, entry["lite_file"]), "lite"
+    else:
+        path, fmt = os.path.join(registry_dir, entry["file"]), entry["format"]
+    return load_artifact(path, fmt, version, entry)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    import joblib
+
+    parser = argparse.ArgumentParser(description="Beheer het modelregister.")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("list")
+    p_imp = sub.add_parser("import", help="Registreer een bestaand .pkl/.npz-artefact")
+    p_imp.add_argument("path")
+    p_imp.add_argument("--format", choices=FORMATS)
+    p_imp.add_argument("--activate", action="store_true")
+    p_act = sub.add_parser("activate")
+    p_act.add_argument("version")
+    args = parser.parse_args()
+
+    if args.cmd == "list":
+        for v in list_versions():
+            print(f"{'*' if v['active'] else ' '} {v['version']}  {v['format']:<13} "
+                  f"rows={v.get('n_rows')} features={v.get('n_features')} metrics={v.get('metrics')}")
+    elif args.cmd == "import":
+        obj = LiteModel.load(args.path) if args.path.endswith(".npz") else joblib.load(args.path)
+        version = register_model(obj, fmt=args.format, activate=args.activate,
+                                 source=os.path.basename(args.path))
+        print(f"✅ Geregistreerd als {version}{' (actief)' if args.activate else ''}")
+    elif args.cmd == "activate":
+        activate_version(args.version)
+        print(f"✅ Actieve versie: {args.version}")
@@ -1,20 +1,30 @@
 from model.scoring import score_transcript
 from model.fallback import danger_score as fallback_score
-from typing import List
+from analysis.lexicon import lexicon_hits
+from typing import Any, Dict, List, Optional
 
-def generate_worst_case_scenario(transcript: str) -> str:
+import numpy as np
+
+def _score(transcript) -> float:
+    try:
+        if isinstance(transcript, str):
+            return score_transcript(transcript)
+        return transcript.score  # TranscriptDoc: shared base score
+    except:
+        return fallback_score(transcript)
+
+
+def generate_worst_case_scenario(transcript, score: Optional[float] = None) -> str:
     """
     Describes the worst plausible outcome based on ML danger score and known risk cues.
+    transcript: str or TranscriptDoc; pass `score` when the caller already has it.
     """
-    score = 0.0
-    try:
-        score = score_transcript(transcript)
-    except:
-        score = fallback_score(transcript)
+    if score is None:
+        score = _score(transcript)
 
-    has_weapon = 'knife' in transcript.lower() or 'stab' in transcript.lower()
-    has_self_harm = 'cutting herself' in transcript.lower()
-    has_history = 'police' in transcript.lower() or 'abused' in transcript.lower()
+    cues = risk_cues(transcript)
+    has_weapon = cues["weapon"]
+    has_self_harm = cues["self_harm"]
 
     if score > 0.7 and has_weapon:
         return (
@@ -35,27 +45,90 @@ def generate_worst_case_scenario(transcript: str) -> str:
         )
 
 
-def generate_branching_scenarios(transcript: str) -> List[str]:
+def generate_branching_scenarios(transcript, score: Optional[float] = None) -> List[str]:
     """
-    Provides alternative outcome paths with estimated probabilities adjusted by danger score.
+    Alternative outcome paths with simulated probabilities (see simulate_scenarios).
     """
-    try:
-        score = score_transcript(transcript)
-    except:
-        score = fallback_score(transcript)
-
-    base_paths = [
-        ("🚔 Police arrive and de-escalate: Subject cooperates peacefully.", 0.2),
-        ("🧠 Crisis team intervenes: Subject stabilized and hospitalized.", 0.2),
-        ("⚠️ Subject attacks with weapon: Use of force required.", 0.2),
-        ("⏳ Delay in response: Subject harms self or others.", 0.2),
-        ("👤 Family member intervenes: De-escalation succeeds or escalates.", 0.2),
+    if score is None:
+        score = _score(transcript)
+
+    sim = simulate_scenarios(score, risk_cues(transcript))
+    return [
+        f"{b['description']} (Est. Prob: {b['probability']:.2f}, 95%: {b['ci_low']:.2f}–{b['ci_high']:.2f})"
+        for b in sim["branches"]
     ]
 
-    # Danger score adjusts perceived probabilities
-    adjusted_paths = [(desc, round(prob * (1 + score), 2)) for desc, prob in base_paths]
-    total = sum(prob for _, prob in adjusted_paths)
-    normalized = [(desc, round(prob / total, 2)) for desc, prob in adjusted_paths]
 
-    return [f"{desc} (Est. Prob: {prob})" for desc, prob in normalized]
+# =============================================================================
+# Monte Carlo scenario engine
+# =============================================================================
+# Risk cues: the English scenario cues plus the Dutch weapon/self-harm lexicons
+_CUE_LEXICONS = {
+    "weapon": ("scenario:weapon", "weapon"),
+    "self_harm": ("scenario:self_harm", "self_harm"),
+    "history": ("scenario:history", "categorical:police_history=frequent", "categorical:past_violence=yes"),
+}
+CUES = tuple(_CUE_LEXICONS)
+
+# Outcome branches with heuristic logit weights (expert-set, not fitted):
+# bias + danger score + one weight per risk cue (same order as CUES).
+BRANCHES = [
+    # description                                                       bias  score  weapon self_harm history
+    ("🚔 Police arrive and de-escalate: Subject cooperates peacefully.",  1.0, -2.0,  -0.8,  -0.3,    -0.4),
+    ("🧠 Crisis team intervenes: Subject stabilized and hospitalized.",   0.2,  0.3,  -0.4,   1.6,     0.1),
+    ("⚠️ Subject attacks with weapon: Use of force required.",          -1.6,  2.5,   1.6,  -0.4,     0.5),
+    ("⏳ Delay in response: Subject harms self or others.",             -1.0,  1.5,   0.3,   1.0,     0.3),
+    ("👤 Family member intervenes: De-escalation succeeds or escalates.", 0.3, -0.6,  -0.2,   0.0,     0.2),
+]
+_WEIGHTS = np.array([b[1:] for b in BRANCHES], dtype=float)  # (branches, 2 + cues)
 
+DEFAULT_SAMPLES = 5000
+# Beta concentration of the latent risk around the score: how much the
+# score is trusted. The keyword fallback is much less certain than the model.
+MODEL_CONCENTRATION = 20.0
+FALLBACK_CONCENTRATION = 5.0
+
+
+def risk_cues(transcript) -> Dict[str, bool]:
+    """Risk cues present in the transcript (str or TranscriptDoc)."""
+    hits = lexicon_hits(transcript)
+    return {cue: any(hits[name] for name in names) for cue, names in _CUE_LEXICONS.items()}
+
+
+def simulate_scenarios(score: float, cues: Dict[str, bool], n_samples: int = DEFAULT_SAMPLES,
+                       seed: Optional[int] = 0,
+                       concentration: float = MODEL_CONCENTRATION) -> Dict[str, Any]:
+    """
+    Sample n_samples outcome paths at once:
+      1. latent risk r ~ Beta around the danger score (concentration = trust),
+      2. branch probabilities softmax(bias + w_score·r + w_cues·cues) per path,
+      3. one outcome per path drawn from those probabilities.
+    probability = share of paths ending in a branch; ci_low/ci_high = the
+    2.5/97.5 percentiles of that branch's probability over the sampled
+    risk levels. Deterministic for a given seed.
+    """
+    score = min(max(float(score), 0.0), 1.0)
+    rng = np.random.default_rng(seed)
+    r = rng.beta(score * concentration + 1.0, (1.0 - score) * concentration + 1.0, size=n_samples)
+
+    cue_vec = np.array([1.0 if cues.get(c) else 0.0 for c in CUES])
+    bias = _WEIGHTS[:, 0] + _WEIGHTS[:, 2:] @ cue_vec             # (branches,)
+    logits = bias + np.outer(r, _WEIGHTS[:, 1])                    # (samples, branches)
+    logits -= logits.max(axis=1, keepdims=True)
+    probs = np.exp(logits)
+    probs /= probs.sum(axis=1, keepdims=True)
+
+    # Inverse-CDF draw of one outcome per path
+    u = rng.random(n_samples)[:, None]
+    outcome = np.minimum((probs.cumsum(axis=1) < u).sum(axis=1), len(BRANCHES) - 1)
+    share = np.bincount(outcome, minlength=len(BRANCHES)) / n_samples
+    low, high = np.percentile(probs, [2.5, 97.5], axis=0)
+
+    branches = [
+        {"description": desc, "probability": round(float(p), 3),
+         "ci_low": round(float(lo), 3), "ci_high": round(float(hi), 3)}
+        for (desc, *_), p, lo, hi in zip(BRANCHES, share, low, high)
+    ]
+    branches.sort(key=lambda b: b["probability"], reverse=True)
+    return {"score": score, "cues": {c: bool(cues.get(c)) for c in CUES},
+            "n_samples": n_samples, "branches": branches}
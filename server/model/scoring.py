@@ -1,22 +1,214 @@
 # model/scoring.py
-import joblib
+import logging
 import os
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional, Sequence, Tuple
 
-model_path = "danger_score_model.pkl"
-vectorizer = None
-model = None
+import numpy as np
 
-# Load model and vectorizer at module load
-if os.path.exists(model_path):
-    vectorizer, model = joblib.load(model_path)
+from model.artifacts import DEFAULT_LITE_PATH, DEFAULT_MODEL_PATH, artifact_stamp
+from model.registry import (
+    LoadedModel,
+    load_artifact,
+    load_version,
+    manifest_path,
+    read_manifest,
+)
+
+logger = logging.getLogger("model.scoring")
+
+# "sklearn" unpickles the full pipeline; "lite" serves the NumPy export
+# (model/lite.py) and never imports scikit-learn.
+MODEL_RUNTIME = os.getenv("DANGER_MODEL_RUNTIME", "sklearn").lower()
+# Legacy single-file artifact, used when the registry (model/registry.py) is empty
+model_path = DEFAULT_LITE_PATH if MODEL_RUNTIME == "lite" else DEFAULT_MODEL_PATH
+# Registry versions kept in memory for per-request pinning / fast switching
+MAX_RESIDENT_MODELS = int(os.getenv("MODEL_RESIDENT_MAX", "4"))
+WARMUP_TRANSCRIPT = "Mijn partner bedreigt mij met een mes. Ik ben bang, kom snel."
+
+_active: Optional[LoadedModel] = None
+_active_stamp = None
+_swap_lock = threading.Lock()
+_resident: "OrderedDict[str, LoadedModel]" = OrderedDict()
+_resident_lock = threading.Lock()
+_watcher: Optional[threading.Thread] = None
+_watcher_stop = threading.Event()
+
+
+def _registry_active_version() -> Optional[str]:
+    if not os.path.exists(manifest_path()):
+        return None
+    return read_manifest().get("active")
+
+
+def _source_stamp():
+    """Change marker of what decides the active model: manifest, else legacy file."""
+    stamp = artifact_stamp(manifest_path())
+    return stamp if stamp is not None else artifact_stamp(model_path)
+
+
+def _warm(loaded: LoadedModel, t0: float) -> LoadedModel:
+    # Warm up before going live (first predict pays lazy-init costs)
+    loaded.predict([WARMUP_TRANSCRIPT])
+    loaded.load_ms = (time.perf_counter() - t0) * 1000
+    return loaded
+
+
+def _remember(loaded: LoadedModel):
+    with _resident_lock:
+        _resident[loaded.version] = loaded
+        _resident.move_to_end(loaded.version)
+        while len(_resident) > MAX_RESIDENT_MODELS:
+            _resident.popitem(last=False)
+
+
+def _get_or_load_version(version: str) -> LoadedModel:
+    with _resident_lock:
+        loaded = _resident.get(version)
+        if loaded is not None:
+            _resident.move_to_end(version)
+            return loaded
+    t0 = time.perf_counter()
+    loaded = _warm(load_version(version, prefer_lite=MODEL_RUNTIME == "lite"), t0)
+    _remember(loaded)
+    return loaded
+
+
+def load_model(path: Optional[str] = None) -> LoadedModel:
+    """
+    Load, warm up and atomically activate the registry's active version
+    (or the legacy artifact at `path` when there is no registry).
+    """
+    global _active, _active_stamp
+    stamp = _source_stamp()
+    version = None if path else _registry_active_version()
+    if version:
+        loaded = _get_or_load_version(version)
+    else:
+        t0 = time.perf_counter()
+        loaded = _warm(load_artifact(path or model_path), t0)
+    with _swap_lock:
+        previous = _active
+        _active, _active_stamp = loaded, stamp
+    logger.info("Danger model %s active (%s, %.0f ms load, previous: %s)",
+                loaded.version, loaded.format, loaded.load_ms, previous.version if previous else None)
+    return loaded
+
+
+def get_active_model() -> Optional[LoadedModel]:
+    return _active
+
+
+def get_model(version: Optional[str] = None) -> LoadedModel:
+    """Active model, or a pinned registry version (loaded once, kept resident)."""
+    m = _active
+    if version is None or (m is not None and m.version == version):
+        if m is None:
+            raise RuntimeError("Model not loaded. Retrain using train_pipeline.py first.")
+        return m
+    return _get_or_load_version(version)
+
+
+def resident_versions() -> List[str]:
+    with _resident_lock:
+        return list(_resident.keys())
+
+
+def reload_if_changed() -> bool:
+    """Reload when the manifest (or legacy artifact) changed since activation."""
+    stamp = _source_stamp()
+    if stamp is None or stamp == _active_stamp:
+        return False
+    try:
+        load_model()
+        return True
+    except Exception as e:
+        # Keep serving the old version; retried on the next poll
+        logger.exception("Hot reload failed: %s", e)
+        return False
+
+
+def _watch(interval_s: float):
+    while not _watcher_stop.wait(interval_s):
+        reload_if_changed()
+
+
+def start_model_watcher(interval_s: float = 5.0):
+    """Poll the artifact in a background thread and hot-swap new versions."""
+    global _watcher
+    if interval_s <= 0 or (_watcher is not None and _watcher.is_alive()):
+        return
+    _watcher_stop.clear()
+    _watcher = threading.Thread(target=_watch, args=(interval_s,), name="model-watcher", daemon=True)
+    _watcher.start()
+
+
+def stop_model_watcher():
+    global _watcher
+    _watcher_stop.set()
+    if _watcher is not None:
+        _watcher.join(timeout=5)
+    _watcher = None
+
+
+# Load the active model at module load
+if _source_stamp() is not None:
+    try:
+        load_model()
+    except Exception as e:
+        logger.exception("Loading the danger model failed: %s", e)
 else:
     print("⚠️ danger_score_model.pkl not found. Please train the model first.")
 
-def score_transcript(transcript: str) -> float:
-    global vectorizer, model
-    if not model or not vectorizer:
-        raise RuntimeError("Model not loaded. Retrain using train_pipeline.py first.")
-    
-    X = vectorizer.transform([transcript])
-    prediction = model.predict(X)[0]
+def score_transcript(transcript: str, version: Optional[str] = None) -> float:
+    m = get_model(version)
+    prediction = m.predict([transcript])[0]
     return round(float(prediction), 2)
+
+def score_transcripts(transcripts: Sequence[str], version: Optional[str] = None) -> List[float]:
+    """
+    Batched variant of score_transcript: one sparse transform + one predict
+    for all texts. Rows are independent, so each score equals the
+    single-text result.
+    """
+    return score_with(get_model(version), transcripts)
+
+def score_with(m: LoadedModel, transcripts: Sequence[str]) -> List[float]:
+    """score_transcripts on an already-resolved model snapshot."""
+    if not transcripts:
+        return []
+
+    predictions = m.predict(transcripts)
+    return [round(float(p), 2) for p in predictions]
+
+def score_requests(items: Sequence[Tuple[str, Optional[str]]]) -> List[object]:
+    """
+    Score (transcript, version) pairs; one batched call per model version.
+    A failing group yields its exception in place of the scores.
+    """
+    out: List[object] = [None] * len(items)
+    groups = {}
+    for i, (_, version) in enumerate(items):
+        groups.setdefault(version, []).append(i)
+    for version, idxs in groups.items():
+        try:
+            scores = score_transcripts([items[i][0] for i in idxs], version)
+        except Exception as e:
+            # e.g. an unknown pinned version only fails its own requests
+            scores = [e] * len(idxs)
+        for i, s in zip(idxs, scores):
+            out[i] = s
+    return out
+
+def term_contributions(transcript: str, version: Optional[str] = None) -> Optional[Tuple[List[str], np.ndarray]]:
+    """
+    Per-term contributions x_j · coef_j when the model is linear in the
+    TF-IDF features (the train_pipeline Ridge or its lite export);
+    None for non-linear models.
+    """
+    m = get_model(version)
+    if m.linear_view() is None:
+        return None
+    return m.contributions(m.featurize([transcript]))
@@ -0,0 +1,176 @@
+# model/shadow.py
+"""
+Shadow-mode scoring of a candidate model on live traffic.
+
+Endpoints hand (transcript, production score, production latency) to
+ShadowScorer.submit() from a background task, i.e. after the response has
+been sent. A single worker thread re-scores the transcript with the
+candidate version and records the score delta and latency. The queue is
+bounded: when it is full, work is dropped (and counted) instead of
+slowing down the production path.
+"""
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger("model.shadow")
+
+# |Δ| above this counts as a disagreement in the aggregate report
+DIVERGENCE_THRESHOLD = 0.1
+
+
+class ShadowScorer:
+    def __init__(self, score_fn: Callable[[str, Optional[str]], float],
+                 candidate: Optional[str] = None, max_queue: int = 256,
+                 sample_size: int = 1024):
+        self.score_fn = score_fn
+        self.max_queue = max(1, int(max_queue))
+        self._candidate = candidate or None
+        self._queue: "queue.Queue[Optional[Tuple]]" = queue.Queue(maxsize=self.max_queue)
+        self._samples: Deque[Tuple[str, float, float, float]] = deque(maxlen=max(1, int(sample_size)))
+        self._lock = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self.submitted = 0
+        self.processed = 0
+        self.dropped = 0
+        self.errors = 0
+        self.last_error: Optional[str] = None
+        self._sum_delta = 0.0
+        self._sum_abs = 0.0
+        self._sum_sq = 0.0
+        self._max_abs = 0.0
+        self._diverged = 0
+        self._by_endpoint: Dict[str, int] = {}
+        self._samples.clear()
+
+    # ---- lifecycle ----------------------------------------------------------
+    def start(self):
+        if self._worker is not None and self._worker.is_alive():
+            return
+        self._worker = threading.Thread(target=self._run, name="shadow-scorer", daemon=True)
+        self._worker.start()
+
+    def stop(self):
+        worker, self._worker = self._worker, None
+        if worker is None:
+            return
+        while True:
+            # Discard pending work so the stop sentinel always fits
+            try:
+                self._queue.put_nowait(None)
+                break
+            except queue.Full:
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    pass
+        worker.join(timeout=5)
+
+    @property
+    def candidate(self) -> Optional[str]:
+        return self._candidate
+
+    def set_candidate(self, version: Optional[str]):
+        """Switch (or disable, with None) the candidate; statistics start over."""
+        with self._lock:
+            self._candidate = version or None
+            self._reset_stats()
+
+    # ---- request path -------------------------------------------------------
+    def submit(self, transcript: str, prod_score: float, prod_ms: float, endpoint: str) -> bool:
+        """Queue a shadow comparison; never blocks. False if disabled or dropped."""
+        candidate = self._candidate
+        if candidate is None or self._worker is None:
+            return False
+        try:
+            self._queue.put_nowait((candidate, transcript, float(prod_score), float(prod_ms), endpoint))
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+        with self._lock:
+            self.submitted += 1
+        return True
+
+    # ---- worker -------------------------------------------------------------
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            candidate, transcript, prod_score, prod_ms, endpoint = item
+            if candidate != self._candidate:
+                continue  # queued before a candidate switch
+            t0 = time.perf_counter()
+            try:
+                score = float(self.score_fn(transcript, candidate))
+            except Exception as e:
+                with self._lock:
+                    self.errors += 1
+                    self.last_error = f"{type(e).__name__}: {e}"
+                continue
+            shadow_ms = (time.perf_counter() - t0) * 1000
+            self._record(endpoint, score - prod_score, shadow_ms, prod_ms)
+
+    def _record(self, endpoint: str, delta: float, shadow_ms: float, prod_ms: float):
+        with self._lock:
+            self.processed += 1
+            self._sum_delta += delta
+            self._sum_abs += abs(delta)
+            self._sum_sq += delta * delta
+            self._max_abs = max(self._max_abs, abs(delta))
+            if abs(delta) > DIVERGENCE_THRESHOLD:
+                self._diverged += 1
+            self._by_endpoint[endpoint] = self._by_endpoint.get(endpoint, 0) + 1
+            self._samples.append((endpoint, delta, shadow_ms, prod_ms))
+
+    # ---- reporting ----------------------------------------------------------
+    @staticmethod
+    def _percentiles(values) -> Dict[str, Optional[float]]:
+        if not len(values):
+            return {"p50": None, "p95": None, "max": None}
+        p50, p95 = np.percentile(values, [50, 95])
+        return {"p50": round(float(p50), 3), "p95": round(float(p95), 3),
+                "max": round(float(np.max(values)), 3)}
+
+    def metrics(self, recent: int = 10) -> Dict[str, Any]:
+        with self._lock:
+            n = self.processed
+            samples = list(self._samples)
+            out: Dict[str, Any] = {
+                "candidate": self._candidate,
+                "queue_depth": self._queue.qsize(),
+                "max_queue": self.max_queue,
+                "submitted": self.submitted,
+                "processed": n,
+                "dropped": self.dropped,
+                "errors": self.errors,
+                "last_error": self.last_error,
+                "by_endpoint": dict(self._by_endpoint),
+                "divergence": {
+                    "mean_delta": round(self._sum_delta / n, 6) if n else None,
+                    "mean_abs_delta": round(self._sum_abs / n, 6) if n else None,
+                    "rmse": round(float(np.sqrt(self._sum_sq / n)), 6) if n else None,
+                    "max_abs_delta": round(self._max_abs, 6) if n else None,
+                    "threshold": DIVERGENCE_THRESHOLD,
+                    "share_above_threshold": round(self._diverged / n, 4) if n else None,
+                },
+            }
+        out["latency_ms"] = {
+            "window": len(samples),
+            "shadow": self._percentiles([s[2] for s in samples]),
+            "production": self._percentiles([s[3] for s in samples]),
+        }
+        out["recent"] = [
+            {"endpoint": e, "delta": round(d, 6), "shadow_ms": round(sm, 3), "prod_ms": round(pm, 3)}
+            for e, d, sm, pm in samples[-recent:]
+        ] if recent > 0 else []
+        return out
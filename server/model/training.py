@@ -1,42 +1,43 @@
-import os
-import joblib
-import pandas as pd
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.ensemble import RandomForestRegressor
-from model.db import SessionLocal
-from model.models import CallRecord
-
-def retrain_model_from_db():
-    # Step 1: Pull all call records from DB
-    db = SessionLocal()
-    records = db.query(CallRecord).all()
-    db.close()
-
-    if not records:
-        print("❌ No call records found in DB.")
-        return
-
-    # Step 2: Convert records to DataFrame
-    data = [{
-        "text": record.transcript,
-        "danger_score": record.danger_score,
-        "threat_type": record.threat_type or ""
-    } for record in records]
-
-    df = pd.DataFrame(data)
-
-    # Step 3: Combine threat_type with transcript text for better feature representation
-    df["combined_text"] = df["threat_type"] + " " + df["text"]
-
-    # Step 4: Vectorize using TF-IDF on combined text
+from model.artifacts import publish_model
+from model.dedup import DEDUP_TRAINING, training_duplicates
+from model.extract import LabelledStream, iter_chunks
+from model.registry import register_model
+
+def retrain_model_from_db(dedup: bool = DEDUP_TRAINING):
+    # Step 1: Stream threat_type + transcript per chunk (column-only, no ORM objects)
+    #         and combine them for better feature representation; near-duplicates
+    #         of an earlier record are left out (model/dedup.py)
+    skip = set(training_duplicates()) if dedup else set()
+    if skip:
+        print(f"🔁 Skipping {len(skip)} near-duplicate records")
+    rows = LabelledStream(
+        [(f"{threat_type or ''} {text}", score)
+         for record_id, text, score, threat_type in chunk if record_id not in skip]
+        for chunk in iter_chunks(("id", "transcript", "danger_score", "threat_type"))
+    )
+
+    # Step 2: Vectorize using TF-IDF on the combined text, fed by the generator
     vectorizer = TfidfVectorizer()
-    X = vectorizer.fit_transform(df["combined_text"])
-    y = df["danger_score"]
-
-    # Step 5: Train model
+    try:
+        X = vectorizer.fit_transform(rows)
+    except ValueError:
+        if len(rows) == 0:
+            print("❌ No call records found in DB.")
+            return None
+        raise
+    y = rows.labels()
+
+    # Step 3: Train model
     model = RandomForestRegressor()
     model.fit(X, y)
 
-    # Step 6: Save model and vectorizer
-    joblib.dump((vectorizer, model), "danger_score_model.pkl")
-    print("✅ New danger scoring model saved to danger_score_model.pkl")
+    # Step 4: Publish model and vectorizer (atomic; running servers hot-reload it)
+    version = publish_model((vectorizer, model))
+    print(f"✅ New danger scoring model published (version {version})")
+
+    # Step 5: Record it in the model registry (becomes the active version)
+    reg_version = register_model((vectorizer, model), n_rows=int(X.shape[0]), source="model.training")
+    print(f"📚 Registered as {reg_version}")
+    return reg_version
@@ -0,0 +1,294 @@
+# model/tuning.py
+"""
+Cross-validated hyperparameter search for the danger model.
+
+Searches the TF-IDF settings (ngram_range, max_features, min_df,
+sublinear_tf) together with Ridge (alpha) and RandomForest (n_estimators,
+max_depth) over K folds, and ranks the candidates by accuracy (MAE, R²)
+against single-transcript inference latency.
+
+Vectorizer output is cached per fold: each ngram_range is tokenized and
+counted once per fold (CountVectorizer, in parallel). Every TF-IDF
+variant is derived from those counts by the same pruning rule as
+TfidfVectorizer (min_df, then the max_features most frequent terms) and
+a TfidfTransformer, so no corpus is re-tokenized per setting. The
+estimator fits run in parallel per (vectorizer setting, fold) with
+joblib across all cores.
+
+The best candidates (plus the current train_pipeline.py setting) are
+then refit on all data with a real TfidfVectorizer and timed one
+transcript at a time, as the API scores them.
+
+Run (vanuit server/):
+    python -m model.tuning
+    python -m model.tuning --folds 3 --top 5 --budget-ms 2 --out leaderboard.json
+"""
+import itertools
+import json
+import os
+import pickle
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from model.extract import LabelledStream, iter_chunks
+from model.feature_store import kept_columns
+
+N_JOBS = int(os.getenv("TUNING_N_JOBS", "-1"))
+RANDOM_STATE = 42
+DEFAULT_FOLDS = 5
+LATENCY_SAMPLES = 200
+
+# Search space. ngram_range is the tokenization config (fitted once per fold);
+# the other vectorizer settings are derived from its cached counts.
+VECTORIZER_GRID = {
+    "ngram_range": [(1, 1), (1, 2), (1, 3)],
+    "max_features": [2000, 5000, 20000],
+    "min_df": [1, 2],
+    "sublinear_tf": [False, True],
+}
+ESTIMATOR_GRID = [
+    ("ridge", {"alpha": [0.1, 0.3, 1.0, 3.0, 10.0]}),
+    ("random_forest", {"n_estimators": [100, 300], "max_depth": [None, 20]}),
+]
+# What train_pipeline.py trains today
+CURRENT = ({"ngram_range": (1, 2), "max_features": 5000, "min_df": 1, "sublinear_tf": False},
+           "ridge", {"alpha": 1.0})
+
+
+def _grid(space: Dict[str, Sequence]) -> List[Dict[str, Any]]:
+    keys = list(space)
+    return [dict(zip(keys, values)) for values in itertools.product(*(space[k] for k in keys))]
+
+
+def _stop_words() -> List[str]:
+    from analysis.document import DUTCH_STOP_WORDS
+
+    return sorted(DUTCH_STOP_WORDS)
+
+
+def build_vectorizer(ngram_range=(1, 2), max_features=5000, min_df=1, sublinear_tf=False):
+    """TfidfVectorizer as in train_pipeline.py, with the tunable settings."""
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    return TfidfVectorizer(stop_words=_stop_words(), ngram_range=tuple(ngram_range),
+                           max_features=max_features, min_df=min_df, sublinear_tf=sublinear_tf,
+                           lowercase=True, strip_accents="unicode")
+
+
+def build_estimator(kind: str, **params):
+    if kind == "ridge":
+        from sklearn.linear_model import Ridge
+
+        return Ridge(random_state=RANDOM_STATE, **params)
+    if kind == "random_forest":
+        from sklearn.ensemble import RandomForestRegressor
+
+        # n_jobs=1: the search itself already uses every core
+        return RandomForestRegressor(random_state=RANDOM_STATE, n_jobs=1, **params)
+    raise ValueError(f"Unknown estimator: {kind!r}")
+
+
+def build_pipeline(vectorizer: Dict[str, Any], kind: str, params: Dict[str, Any]):
+    from sklearn.pipeline import Pipeline
+
+    return Pipeline([("tfidf", build_vectorizer(**vectorizer)), ("reg", build_estimator(kind, **params))])
+
+
+# =============================================================================
+# Cached fold features
+# =============================================================================
+def _count_fold(texts: Sequence[str], train_idx: np.ndarray, test_idx: np.ndarray, ngram_range):
+    """Tokenize + count one fold: (train counts, test counts), columns in vocabulary order."""
+    from sklearn.feature_extraction.text import CountVectorizer
+
+    cv = CountVectorizer(stop_words=_stop_words(), ngram_range=tuple(ngram_range), lowercase=True,
+                         strip_accents="unicode", dtype=np.float64)
+    X_train = cv.fit_transform([texts[i] for i in train_idx])
+    return X_train.tocsr(), cv.transform([texts[i] for i in test_idx]).tocsr()
+
+
+def derive_features(counts: Tuple[Any, Any], max_features: Optional[int], min_df: int, sublinear_tf: bool):
+    """TF-IDF (train, test) matrices for one vectorizer setting from a fold's cached counts."""
+    from sklearn.feature_extraction.text import TfidfTransformer
+
+    X_train, X_test = counts
+    cols = kept_columns(X_train, max_features, min_df)
+    if cols.size == 0:
+        return None
+    tfidf = TfidfTransformer(sublinear_tf=sublinear_tf)
+    return tfidf.fit_transform(X_train[:, cols]), tfidf.transform(X_test[:, cols])
+
+
+def _fit_fold(counts, vectorizer: Dict[str, Any], estimators: List[Tuple[str, Dict[str, Any]]],
+              y_train: np.ndarray, y_test: np.ndarray) -> List[Optional[Tuple[float, float, float]]]:
+    """Every estimator on one (vectorizer setting, fold): [(mae, r2, fit_seconds)] or None when pruned empty."""
+    from sklearn.metrics import mean_absolute_error, r2_score
+
+    features = derive_features(counts, vectorizer["max_features"], vectorizer["min_df"], vectorizer["sublinear_tf"])
+    if features is None:
+        return [None] * len(estimators)
+    X_train, X_test = features
+    out = []
+    for kind, params in estimators:
+        t0 = time.perf_counter()
+        reg = build_estimator(kind, **params).fit(X_train, y_train)
+        fit_s = time.perf_counter() - t0
+        pred = np.clip(reg.predict(X_test), 0.0, 1.0)
+        r2 = float(r2_score(y_test, pred)) if len(y_test) >= 2 else float("nan")
+        out.append((float(mean_absolute_error(y_test, pred)), r2, fit_s))
+    return out
+
+
+# =============================================================================
+# Search
+# =============================================================================
+def load_corpus() -> Tuple[List[str], np.ndarray]:
+    rows = LabelledStream(iter_chunks())
+    texts = list(rows)
+    return texts, rows.labels()
+
+
+def cross_validate(texts: Sequence[str], y: np.ndarray, folds: int = DEFAULT_FOLDS,
+                   vectorizer_grid: Dict[str, Sequence] = VECTORIZER_GRID,
+                   estimator_grid=ESTIMATOR_GRID, n_jobs: int = N_JOBS) -> List[Dict[str, Any]]:
+    """CV scores for every (vectorizer, estimator) combination: one dict per candidate."""
+    from joblib import Parallel, delayed
+    from sklearn.model_selection import KFold
+
+    splits = list(KFold(n_splits=folds, shuffle=True, random_state=RANDOM_STATE).split(texts))
+    vectorizers = _grid(vectorizer_grid)
+    estimators = [(kind, params) for kind, space in estimator_grid for params in _grid(space)]
+    ngrams = sorted({tuple(v["ngram_range"]) for v in vectorizers})
+
+    # 1) Tokenize/count once per (ngram_range, fold)
+    counted = Parallel(n_jobs=n_jobs)(
+        delayed(_count_fold)(texts, train_idx, test_idx, ngram)
+        for ngram in ngrams for train_idx, test_idx in splits
+    )
+    counts = {(ngram, f): counted[i * folds + f] for i, ngram in enumerate(ngrams) for f in range(folds)}
+
+    # 2) All estimators per (vectorizer setting, fold) on the derived TF-IDF features
+    tasks = [(v, f) for v in range(len(vectorizers)) for f in range(folds)]
+    fold_scores = Parallel(n_jobs=n_jobs)(
+        delayed(_fit_fold)(counts[(tuple(vectorizers[v]["ngram_range"]), f)], vectorizers[v], estimators,
+                           y[splits[f][0]], y[splits[f][1]])
+        for v, f in tasks
+    )
+
+    candidates = []
+    for v, vec in enumerate(vectorizers):
+        per_fold = [fold_scores[v * folds + f] for f in range(folds)]
+        for e, (kind, params) in enumerate(estimators):
+            scores = [fold[e] for fold in per_fold]
+            if any(s is None for s in scores):
+                continue
+            mae, r2, fit_s = (np.array(col) for col in zip(*scores))
+            candidates.append({
+                "vectorizer": {**vec, "ngram_range": list(vec["ngram_range"])},
+                "estimator": kind,
+                "params": params,
+                "mae": round(float(mae.mean()), 4),
+                "mae_std": round(float(mae.std()), 4),
+                "r2": round(float(np.nanmean(r2)), 4) if not np.isnan(r2).all() else None,
+                "fit_ms": round(float(fit_s.mean()) * 1000, 1),
+                "current": (vec, kind, params) == CURRENT,
+            })
+    candidates.sort(key=lambda c: c["mae"])
+    return candidates
+
+
+def _fit_full(texts: Sequence[str], y: np.ndarray, candidate: Dict[str, Any]):
+    return build_pipeline(candidate["vectorizer"], candidate["estimator"], candidate["params"]).fit(texts, y)
+
+
+def measure_latency(pipe, texts: Sequence[str], samples: int = LATENCY_SAMPLES) -> Dict[str, float]:
+    """p50/p95 of predict() on one transcript at a time (as the API scores), in ms."""
+    sample = [texts[i % len(texts)] for i in range(samples)]
+    pipe.predict(sample[:1])   # warm-up
+    timings = np.empty(len(sample))
+    for i, text in enumerate(sample):
+        t0 = time.perf_counter()
+        pipe.predict([text])
+        timings[i] = time.perf_counter() - t0
+    return {"p50_ms": round(float(np.percentile(timings, 50)) * 1000, 3),
+            "p95_ms": round(float(np.percentile(timings, 95)) * 1000, 3)}
+
+
+def leaderboard(texts: Sequence[str], y: np.ndarray, folds: int = DEFAULT_FOLDS, top: int = 10,
+                n_jobs: int = N_JOBS, latency_samples: int = LATENCY_SAMPLES,
+                budget_ms: Optional[float] = None) -> List[Dict[str, Any]]:
+    """
+    CV search, then refit + latency for the `top` best candidates and the
+    current setting. Rows are sorted by MAE; "pareto" marks rows no other
+    row beats on both MAE and p95 latency, "within_budget" rows whose p95
+    fits budget_ms.
+    """
+    from joblib import Parallel, delayed
+
+    if len(texts) < folds:
+        raise ValueError(f"Te weinig gelabelde records ({len(texts)}) voor {folds}-voudige CV.")
+    candidates = cross_validate(texts, y, folds, n_jobs=n_jobs)
+    rows = candidates[:top] + [c for c in candidates[top:] if c["current"]]
+
+    pipes = Parallel(n_jobs=n_jobs)(delayed(_fit_full)(texts, y, c) for c in rows)
+    # Timed serially after the parallel fits, so runs don't compete for cores
+    for row, pipe in zip(rows, pipes):
+        row.update(measure_latency(pipe, texts, latency_samples))
+        row["size_kb"] = round(len(pickle.dumps(pipe, protocol=pickle.HIGHEST_PROTOCOL)) / 1024, 1)
+
+    for row in rows:
+        row["pareto"] = not any(o["mae"] <= row["mae"] and o["p95_ms"] <= row["p95_ms"]
+                                and (o["mae"], o["p95_ms"]) != (row["mae"], row["p95_ms"]) for o in rows)
+        if budget_ms is not None:
+            row["within_budget"] = row["p95_ms"] <= budget_ms
+    return rows
+
+
+def _describe(row: Dict[str, Any]) -> str:
+    vec = row["vectorizer"]
+    params = ", ".join(f"{k}={v}" for k, v in row["params"].items())
+    return (f"ngram={tuple(vec['ngram_range'])} max_feat={vec['max_features']} min_df={vec['min_df']} "
+            f"sublin={'j' if vec['sublinear_tf'] else 'n'} | {row['estimator']}({params})")
+
+
+def print_leaderboard(rows: List[Dict[str, Any]], budget_ms: Optional[float] = None):
+    print(f"{'#':>3} {'MAE':>7} {'±':>6} {'R²':>7} {'p50 ms':>8} {'p95 ms':>8} {'KB':>8}  kandidaat")
+    for i, row in enumerate(rows, 1):
+        flags = ("*" if row["pareto"] else " ") + ("H" if row["current"] else " ")
+        r2 = f"{row['r2']:7.3f}" if row["r2"] is not None else f"{'-':>7}"
+        print(f"{i:>3} {row['mae']:7.4f} {row['mae_std']:6.3f} {r2} {row['p50_ms']:8.3f} "
+              f"{row['p95_ms']:8.3f} {row['size_kb']:8.0f} {flags} {_describe(row)}")
+    print("\n* = Pareto-optimaal (nauwkeurigheid vs. p95-latentie), H = huidige train_pipeline-instelling")
+    if budget_ms is not None:
+        fits = [r for r in rows if r.get("within_budget")]
+        if fits:
+            print(f"🏁 Beste binnen {budget_ms} ms (p95): {_describe(fits[0])} — MAE {fits[0]['mae']:.4f}")
+        else:
+            print(f"⚠️ Geen kandidaat binnen {budget_ms} ms (p95).")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Hyperparameter-zoektocht (CV) voor het gevaarmodel met latentie-leaderboard.")
+    parser.add_argument("--folds", type=int, default=DEFAULT_FOLDS)
+    parser.add_argument("--top", type=int, default=10, help="aantal kandidaten voor refit + latentiemeting")
+    parser.add_argument("--n-jobs", type=int, default=N_JOBS, help="parallelle workers (-1 = alle cores)")
+    parser.add_argument("--latency-samples", type=int, default=LATENCY_SAMPLES)
+    parser.add_argument("--budget-ms", type=float, default=None, help="latentiebudget (p95, ms per transcript)")
+    parser.add_argument("--out", default=None, help="schrijf het leaderboard als JSON")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    texts, y = load_corpus()
+    n_candidates = len(_grid(VECTORIZER_GRID)) * sum(len(_grid(space)) for _, space in ESTIMATOR_GRID)
+    print(f"🔎 {n_candidates} kandidaten, {args.folds}-voudige CV op {len(texts)} records...")
+    rows = leaderboard(texts, y, args.folds, args.top, args.n_jobs, args.latency_samples, args.budget_ms)
+    print_leaderboard(rows, args.budget_ms)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as fh:
+            json.dump(rows, fh, indent=2)
+        print(f"💾 Leaderboard opgeslagen naar: {args.out}")
+    print(f"⏱️ Klaar in {time.perf_counter() - t0:.1f} s")
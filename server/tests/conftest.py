@@ -0,0 +1,9 @@
+# tests/conftest.py
+# The server modules import each other as top-level packages (model.*, analysis.*),
+# the same way uvicorn runs them from server/.
+import os
+import sys
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if SERVER_DIR not in sys.path:
+    sys.path.insert(0, SERVER_DIR)
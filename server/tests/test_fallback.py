@@ -0,0 +1,24 @@
+# tests/test_fallback.py
+import pytest
+
+from model.fallback import danger_score
+
+
+@pytest.mark.parametrize("transcript, expected", [
+    # stab + flee + run + police (+ knife via "knives")
+    ("He stabbed her with knives and is fleeing, running from the policeman", 0.7),
+    ("She was stabbing and cutting herself", 0.4),
+    ("Hij heeft twee messen en er is overal bloed", 0.3),
+    ("Hij schoot op de politieagent", 0.2),
+])
+def test_inflected_forms_score(transcript, expected):
+    assert danger_score(transcript) == pytest.approx(expected)
+
+
+def test_keyword_counts_once_across_its_forms():
+    assert danger_score("een mes, nog een mes en twee messen") == pytest.approx(0.2)
+
+
+def test_whole_words_only():
+    assert danger_score("een mespunt zout") == 0.0
+    assert danger_score("Rustig gesprek zonder incidenten") == 0.0
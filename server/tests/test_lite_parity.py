@@ -0,0 +1,70 @@
+# tests/test_lite_parity.py
+import numpy as np
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression, Ridge
+from sklearn.pipeline import Pipeline
+
+from model.lite import PARITY_TRANSCRIPTS, LiteModel, export_lite_model
+
+TRAIN = [
+    ("Mijn partner bedreigt mij met een mes. Ik ben bang voor mijn leven.", 1),
+    ("Er is een man in mijn huis met een pistool.", 1),
+    ("Ze heeft zichzelf gesneden, er is overal bloed.", 1),
+    ("Hij slaat de deur in en schreeuwt dat hij me gaat vermoorden.", 1),
+    ("Mijn kat zit vast in de boom.", 0),
+    ("De straatverlichting in onze straat is kapot.", 0),
+    ("Er staat een auto verkeerd geparkeerd voor de deur.", 0),
+    ("Ik wil een gevonden portemonnee afgeven.", 0),
+]
+PROBES = PARITY_TRANSCRIPTS + [
+    "",                                  # empty
+    "   ",                               # whitespace only
+    "qwerty zxcv asdfgh",                # out of vocabulary
+    "Café één: hij dreigt met een MES!",  # accents, case, partly in vocabulary
+]
+
+
+def _pipeline(estimator):
+    vectorizer = TfidfVectorizer(ngram_range=(1, 2), lowercase=True, strip_accents="unicode")
+    pipe = Pipeline([("tfidf", vectorizer), ("clf", estimator)])
+    texts, labels = zip(*TRAIN)
+    return pipe.fit(list(texts), np.array(labels))
+
+
+def test_logistic_regression_matches_predict_proba(tmp_path):
+    pipe = _pipeline(LogisticRegression(C=10.0))
+    path = str(tmp_path / "model.npz")
+    export_lite_model(pipe, path, PROBES)
+
+    lite = LiteModel.load(path)
+    assert lite.link == "logistic"
+    expected = pipe.predict_proba(PROBES)[:, 1]
+    np.testing.assert_allclose(lite.predict(PROBES), expected, rtol=0, atol=1e-12)
+    # no features: only the intercept is left
+    assert lite.predict([""])[0] == pytest.approx(expected[PROBES.index("")], abs=1e-12)
+
+
+def test_ridge_matches_predict(tmp_path):
+    pipe = _pipeline(Ridge(alpha=1.0))
+    path = str(tmp_path / "model.npz")
+    export_lite_model(pipe, path, PROBES)
+
+    lite = LiteModel.load(path)
+    assert lite.link == "identity"
+    np.testing.assert_allclose(lite.predict(PROBES), pipe.predict(PROBES), rtol=0, atol=1e-12)
+
+
+def test_removal_deltas_match_rescoring():
+    pipe = _pipeline(Ridge(alpha=1.0))
+    lite = LiteModel.from_sklearn(pipe.named_steps["tfidf"], pipe.named_steps["clf"])
+    idx, w = lite.features(TRAIN[0][0])
+    base = lite.intercept + np.dot(w, lite.coef[idx])
+
+    deltas = lite.removal_deltas(idx, w)
+    for k in range(len(idx)):
+        rest = np.delete(w, k)
+        rescored = lite.intercept + np.dot(rest / np.linalg.norm(rest), np.delete(lite.coef[idx], k))
+        assert deltas[k] == pytest.approx(rescored - base, abs=1e-12)
+    # not the plain linear contribution once the row is re-normalized
+    assert not np.allclose(deltas, -w * lite.coef[idx])
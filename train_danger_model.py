@@ -6,7 +6,11 @@ from sklearn.preprocessing import OneHotEncoder
 from sklearn.pipeline import Pipeline
 from sklearn.compose import ColumnTransformer
 from sklearn.metrics import mean_squared_error
-import joblib
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "server"))
+from model.registry import register_model
 
 # Simulate 911 dataset
 def simulate_911_data_with_threat(num_samples=500):
@@ -83,6 +87,8 @@ preds = pipeline.predict(X_test)
 mse = mean_squared_error(y_test, preds)
 print(f"Model trained. MSE: {mse:.4f}")
 
-# Save model
-joblib.dump(pipeline, "danger_score_model.pkl")
-print("Model saved as danger_score_model.pkl")
+# Register model (not activated: it scores structured fields, not transcripts;
+# select it per request with model_version or via `python -m model.registry activate`)
+version = register_model(pipeline, fmt="categorical", metrics={"mse": float(mse)},
+                         n_rows=len(df), activate=False, source="train_danger_model")
+print(f"Model registered as {version}")
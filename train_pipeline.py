@@ -1,10 +1,13 @@
 # model/train_pipeline.py
 """
 Trainingspipeline voor 112-gevaarscore:
-- Leest data uit DB (CallRecord)
+- Streamt data uit DB (CallRecord: alleen transcript + danger_score, in chunks)
+- n-gram tellingen uit de feature store (alleen nieuwe records worden getokenized)
+- Bijna-duplicaten (MinHash/LSH) worden overgeslagen
 - TF-IDF (nl stopwoorden, ngram_range=(1,2))
 - Ridge-regressie voor score 0..1
-- Slaat model op als model/danger_score_model.pkl
+- Slaat model op als server/danger_score_model.pkl (+ NumPy-export .npz)
+- Registreert de versie in het modelregister (server/models/)
 
 Run:
     python -m model.train_pipeline
@@ -13,58 +16,50 @@ of:
 """
 
 import os
-import joblib
+from typing import Callable, List, Optional, Set, Tuple
+
 import numpy as np
-import pandas as pd
-from typing import Tuple, List
 
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.linear_model import Ridge
 from sklearn.pipeline import Pipeline
-from sklearn.model_selection import train_test_split
 from sklearn.metrics import r2_score, mean_absolute_error
 
 # Project imports
-from model.db import SessionLocal
-from model.models import CallRecord
-
-# NLTK stopwoorden NL
-import nltk
-from nltk.corpus import stopwords
-nltk.download('stopwords', quiet=True)
-DUTCH_STOP = set(stopwords.words('dutch'))
-
-MODEL_PATH = os.path.join(os.path.dirname(__file__), "danger_score_model.pkl")
-
-
-def _fetch_data_from_db() -> pd.DataFrame:
-    """Haal alle transcripts + danger_score op uit de DB."""
-    session = SessionLocal()
-    try:
-        rows = session.query(CallRecord).all()
-        data = [{
-            "transcript": r.transcript or "",
-            "danger_score": float(r.danger_score) if r.danger_score is not None else np.nan
-        } for r in rows]
-    finally:
-        session.close()
-    df = pd.DataFrame(data)
-    # Alleen rijen met geldige transcript + danger_score
-    df = df.dropna(subset=["transcript", "danger_score"])
-    df = df[df["transcript"].str.strip().astype(bool)]
-    return df
-
-
-def _build_pipeline() -> Pipeline:
-    """Bouw de ML pipeline: TF-IDF (1,2-grams) + Ridge regression."""
+from model.artifacts import DEFAULT_LITE_PATH, DEFAULT_MODEL_PATH, publish_model
+from model.lite import export_lite_model
+from model.registry import register_model
+from model.extract import TRAIN_CHUNK_SIZE, LabelledStream, is_training, is_validation, iter_chunks
+from model.feature_store import FeatureStore
+from model.dedup import DEDUP_TRAINING, training_duplicates
+
+# NLTK stopwoorden NL (uit server/.nltk_data, geen download; anders ingebouwde lijst)
+from analysis.document import DUTCH_STOP_WORDS as DUTCH_STOP
+
+# Same path the API server serves (and hot-reloads) from
+MODEL_PATH = DEFAULT_MODEL_PATH
+# Validatieteksten voor de pariteitscheck van de lite export
+PARITY_SAMPLE = 500
+# Features uit de feature store (model/feature_store.py) i.p.v. opnieuw tokenizen
+USE_FEATURE_STORE = os.getenv("FEATURE_STORE", "1") != "0"
+
+
+def _build_pipeline(ngram_range=(1, 2), max_features=5000, min_df=1,
+                    sublinear_tf=False, alpha=1.0) -> Pipeline:
+    """
+    Bouw de ML pipeline: TF-IDF (standaard 1,2-grams) + Ridge regression.
+    Andere instellingen: zie het leaderboard van `python -m model.tuning`.
+    """
     vectorizer = TfidfVectorizer(
         stop_words=list(DUTCH_STOP),
-        ngram_range=(1, 2),
-        max_features=5000,
+        ngram_range=tuple(ngram_range),
+        max_features=max_features,
+        min_df=min_df,
+        sublinear_tf=sublinear_tf,
         lowercase=True,
         strip_accents="unicode"
     )
-    model = Ridge(alpha=1.0, random_state=42)
+    model = Ridge(alpha=alpha, random_state=42)
     pipe = Pipeline([
         ("tfidf", vectorizer),
         ("reg", model)
@@ -85,41 +80,135 @@ def _print_vocab_presence(pipe: Pipeline, terms: List[str]):
         print(f"⚠️ Kon vocab niet controleren: {e}")
 
 
-def train_model_from_db(save_path: str = MODEL_PATH) -> Tuple[Pipeline, dict]:
-    """Train het model op DB-data en sla op."""
-    df = _fetch_data_from_db()
-    if df.empty:
+def _fit_from_store(pipe: Pipeline, store: FeatureStore, chunk_size: int,
+                    skip: Set[int]) -> Tuple[int, List[float], List[float], List[str]]:
+    """Fit op de opgeslagen n-gram tellingen; alleen nieuwe records worden getokenized."""
+    vectorizer, reg = pipe.named_steps["tfidf"], pipe.named_steps["reg"]
+    added = store.update(chunk_size)
+    print(f"🗃️ Feature store: {added['new_records']} nieuwe records getokenized "
+          f"({added['n_rows']} totaal, {added['n_terms']} termen)")
+
+    train_ids, y_train = _without(store.labels([is_training()], chunk_size), skip)
+    if len(train_ids) == 0:
         raise ValueError("Geen trainingsdata gevonden in de database.")
+    reg.fit(store.fit_tfidf(vectorizer, train_ids), y_train)
 
-    X = df["transcript"].tolist()
-    y = df["danger_score"].astype(float).clip(0, 1).values
+    val_ids, y_val = _without(store.labels([is_validation()], chunk_size), skip)
+    y_pred = reg.predict(store.transform(vectorizer, val_ids)).tolist() if len(val_ids) else []
+    # Steekproef voor de lite-pariteitscheck (teksten zelf zitten niet in de store)
+    chunks = iter_chunks(("transcript",), PARITY_SAMPLE, where=[is_validation()])
+    try:
+        parity_texts = [text for text, in next(chunks, [])]
+    finally:
+        chunks.close()
+    return len(train_ids), y_val.tolist(), y_pred, parity_texts
 
-    # Train/val-split
-    X_train, X_val, y_train, y_val = train_test_split(
-        X, y, test_size=0.2, random_state=42, shuffle=True
-    )
 
+def _without(labelled: Tuple[np.ndarray, np.ndarray], skip: Set[int]) -> Tuple[np.ndarray, np.ndarray]:
+    ids, y = labelled
+    if not skip:
+        return ids, y
+    keep = ~np.isin(ids, np.fromiter(skip, dtype=np.int64, count=len(skip)))
+    return ids[keep], y[keep]
+
+
+def _rows(where, chunk_size: int, skip: Set[int]):
+    """(transcript, danger_score, id) chunks zonder de ids in skip."""
+    for chunk in iter_chunks(("transcript", "danger_score", "id"), chunk_size, where=where):
+        yield [row for row in chunk if row[2] not in skip] if skip else chunk
+
+
+def _fit_from_text(pipe: Pipeline, chunk_size: int,
+                   skip: Set[int]) -> Tuple[int, List[float], List[float], List[str]]:
+    """Fit op de ruwe transcripts, in chunks uit de DB gestreamd."""
+    vectorizer, reg = pipe.named_steps["tfidf"], pipe.named_steps["reg"]
+    train_rows = LabelledStream(_rows([is_training()], chunk_size, skip))
+    try:
+        X_train = vectorizer.fit_transform(train_rows)
+    except ValueError:
+        if len(train_rows) == 0:
+            raise ValueError("Geen trainingsdata gevonden in de database.")
+        raise
+    reg.fit(X_train, train_rows.labels())
+    n_train = int(X_train.shape[0])
+    del X_train
+
+    # Evaluatie: validatierijen chunk voor chunk
+    y_val, y_pred, parity_texts = [], [], []
+    for chunk in _rows([is_validation()], chunk_size, skip):
+        texts = [text for text, _, _ in chunk]
+        y_val.extend(min(max(float(score), 0.0), 1.0) for _, score, _ in chunk)
+        y_pred.extend(pipe.predict(texts))
+        # Steekproef voor de lite-pariteitscheck
+        parity_texts.extend(texts[:max(0, PARITY_SAMPLE - len(parity_texts))])
+    return n_train, y_val, y_pred, parity_texts
+
+
+def train_model_from_db(save_path: str = MODEL_PATH,
+                        chunk_size: int = TRAIN_CHUNK_SIZE,
+                        progress: Optional[Callable[[str, float], None]] = None,
+                        use_store: bool = USE_FEATURE_STORE,
+                        dedup: bool = DEDUP_TRAINING) -> Tuple[Pipeline, dict]:
+    """
+    Train het model op DB-data en sla op.
+    Standaard komen de features uit de feature store: alleen records die
+    nieuw zijn sinds de vorige run worden getokenized, daarna wordt alleen
+    TF-IDF + Ridge gefit (identiek aan fit op de ruwe teksten). Zonder store
+    (use_store=False of afwijkende tokenizer-instellingen) worden de
+    transcripts in chunks uit de DB gestreamd en via een generator aan de
+    vectorizer gevoerd.
+    Train/val-split: elke VAL_EVERY-de id is validatie (model/extract.py).
+    dedup: bijna-duplicaten van een eerder record tellen niet mee (model/dedup.py).
+    progress(stap, fractie): optionele voortgangsmelding (model/jobs.py).
+    """
+    report = progress or (lambda stage, fraction: None)
     pipe = _build_pipeline()
-    pipe.fit(X_train, y_train)
-
-    # Evaluatie
-    y_pred = pipe.predict(X_val)
-    metrics = {
-        "r2": float(r2_score(y_val, y_pred)),
-        "mae": float(mean_absolute_error(y_val, y_pred)),
-        "n_train": int(len(X_train)),
-        "n_val": int(len(X_val))
-    }
-    print(f"✅ Model getraind — R²: {metrics['r2']:.3f}, MAE: {metrics['mae']:.3f} "
-          f"(train {metrics['n_train']}, val {metrics['n_val']})")
+    store = FeatureStore()
+
+    duplicates = training_duplicates(chunk_size) if dedup else {}
+    if duplicates:
+        print(f"🔁 {len(duplicates)} bijna-dubbele records overgeslagen")
+    skip = set(duplicates)
+
+    report("vectorize", 0.05)
+    if use_store and store.supports(pipe.named_steps["tfidf"]):
+        n_train, y_val, y_pred, X_val = _fit_from_store(pipe, store, chunk_size, skip)
+    else:
+        n_train, y_val, y_pred, X_val = _fit_from_text(pipe, chunk_size, skip)
+    report("evaluate", 0.6)
+    metrics = {"n_train": n_train, "n_val": len(y_val), "n_duplicates": len(duplicates)}
+    if len(y_val) >= 2:
+        metrics["r2"] = float(r2_score(y_val, y_pred))
+        metrics["mae"] = float(mean_absolute_error(y_val, y_pred))
+        print(f"✅ Model getraind — R²: {metrics['r2']:.3f}, MAE: {metrics['mae']:.3f} "
+              f"(train {metrics['n_train']}, val {metrics['n_val']})")
+    else:
+        print(f"✅ Model getraind op {n_train} rijen (te weinig validatierijen voor metrics)")
 
     # Controleer vocab op kerntermen (ook bigram)
     vocab_terms = ["mes", "bedreigt", "snijdt", "met een mes", "bedreigt iedereen"]
     _print_vocab_presence(pipe, vocab_terms)
 
-    # Opslaan
-    joblib.dump(pipe, save_path)
-    print(f"💾 Opgeslagen naar: {save_path}")
+    # Opslaan (atomisch, zodat draaiende servers het nieuwe model hot-reloaden)
+    report("publish", 0.75)
+    version = publish_model(pipe, save_path)
+    metrics["version"] = version
+    print(f"💾 Opgeslagen naar: {save_path} (versie {version})")
+
+    # Lite export (NumPy-arrays, sklearn-vrije runtime); pariteit op de validatieset
+    if save_path == MODEL_PATH:
+        try:
+            export_lite_model(pipe, DEFAULT_LITE_PATH, X_val)
+            print(f"💾 Lite model opgeslagen naar: {DEFAULT_LITE_PATH}")
+        except ValueError as e:
+            print(f"⚠️ Lite export overgeslagen: {e}")
+
+        # Modelregister: nieuwe versie + actief maken (oude versies blijven opvraagbaar)
+        report("register", 0.9)
+        reg_version = register_model(pipe, metrics=metrics, n_rows=n_train + len(y_val),
+                                     source="train_pipeline", lite_parity_texts=X_val)
+        metrics["registry_version"] = reg_version
+        print(f"📚 Geregistreerd in modelregister als {reg_version} (actief)")
 
     return pipe, metrics
 